@@ -49,38 +49,15 @@ Randy ,,81224424542.0,r.prasidha@yahoo.com,,26/07/24 10:18,76,27,26 Jul 2024,14.
   }
 }
 
-// Download Excel function
-async function downloadExcel() {
-  try {
-    showNotification('Preparing Excel download...', 'info');
-
-    // Use embedded data to avoid fetch issues
-    let csvText = localStorage.getItem('customerProfilesCSV');
-    if (!csvText) {
-      // Fallback embedded data
-      csvText = `CustomerName,MobileCode,Mobile,Email,DateOfBirth,JoinedDate,Completed,Cancelled,Date joined,Days since last class,Days since package purchase,Days since membership purchase,Profile Total Spent,Profile Total Attended,Average Revenue
-Tri Wulandari,62.0,811709799.0,wulandari1995.tw@gmail.com,,04/11/24 10:22,75,25,,,,,17947750.0,75,239303.33
-Jonathan Edward,62.0,87878461661.0,jonathanedwardtobing98@gmail.com,12 Nov 1998,08/09/24 09:26,2,1,08 Sep 2024,380.0,258.0,,515000.0,2,257500.0
-Lingkan S,62.0,81287561090.0,lsngantung@gmail.com,16 Nov 1985,20/08/24 14:58,11,1,20 Aug 2024,10.0,290.0,,1545000.0,11,140454.55
-Helena S,62.0,8119187117.0,helenafelicea@yahoo.com,,20/08/24 14:52,174,137,20 Aug 2024,4.0,87.0,28.0,23952650.0,174,137658.91
-Lucky Suryadi,62.0,87886678158.0,Luckysuryadi@gmail.com,16 Nov 1989,06/08/24 23:07,62,7,06 Aug 2024,27.0,42.0,,0.0,0,0.0
-guntur mallarangeng,62.0,8111888764.0,gunturmallarangeng@gmail.com,14 Feb 1993,02/08/24 16:19,76,10,02 Aug 2024,59.0,77.0,,15656000.0,76,206000.0
-Angie Giovanni,62.0,8111592727.0,angie.giovanni2@gmail.com,27 Jul 1993,29/07/24 20:53,27,3,29 Jul 2024,10.0,50.0,,6651225.0,27,246341.67
-Randy ,,81224424542.0,r.prasidha@yahoo.com,,26/07/24 10:18,76,27,26 Jul 2024,14.0,59.0,,13160825.0,76,173168.75
-,62.0,8111747788.0,elvirakwijaya@gmail.com,,17/07/24 13:42,41,12,17 Jul 2024,2.0,4.0,,1339000.0,41,32658.54`;
-    }
+// Workbook written next to the report CSV by the report scripts (python simplify_profile_report.py)
+const EXCEL_REPORT_PATH = 'report/simplified_customer_profiles.xlsx';
 
-    // Create Excel-compatible format
-    const excelContent = convertCSVToExcel(csvText);
-
-    // Create and download file
-    const blob = new Blob([excelContent], {
-      type: 'application/vnd.ms-excel;charset=utf-8;'
-    });
+// Download Excel function - serves the real .xlsx workbook the report scripts write
+function downloadExcel() {
+  try {
     const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
-    link.setAttribute('download', 'customer_profiles_' + new Date().toISOString().split('T')[0] + '.xls');
+    link.setAttribute('href', EXCEL_REPORT_PATH);
+    link.setAttribute('download', 'customer_profiles_' + new Date().toISOString().split('T')[0] + '.xlsx');
     link.style.visibility = 'hidden';
     document.body.appendChild(link);
     link.click();
@@ -93,33 +70,6 @@ Randy ,,81224424542.0,r.prasidha@yahoo.com,,26/07/24 10:18,76,27,26 Jul 2024,14.
   }
 }
 
-// Convert CSV to Excel-compatible format
-function convertCSVToExcel(csvText) {
-  // Add Excel BOM for proper UTF-8 encoding in Excel
-  const bom = '\uFEFF';
-
-  // Process CSV to ensure Excel compatibility
-  let processedCSV = csvText;
-
-  // Ensure proper line endings for Excel
-  processedCSV = processedCSV.replace(/\r\n/g, '\n');
-  processedCSV = processedCSV.replace(/\r/g, '\n');
-
-  // Add proper Excel table formatting
-  const lines = processedCSV.split('\n');
-  if (lines.length > 0) {
-    // Clean up each line
-    const processedLines = lines.map(line => {
-      // Remove any problematic characters and ensure proper CSV formatting
-      return line.replace(/[^\x20-\x7E\u00A0-\u00FF\u4E00-\u9FFF,\n]/g, '');
-    });
-
-    processedCSV = processedLines.join('\n');
-  }
-
-  return bom + processedCSV;
-}
-
 // Show notification function
 function showNotification(message, type = 'info') {
   const notification = document.createElement('div');
@@ -176,18 +126,26 @@ Angie Giovanni,62.0,8111592727.0,angie.giovanni2@gmail.com,27 Jul 1993,29/07/24
 Randy ,,81224424542.0,r.prasidha@yahoo.com,,26/07/24 10:18,76,27,26 Jul 2024,14.0,59.0,,13160825.0,76,173168.75
 ,62.0,8111747788.0,elvirakwijaya@gmail.com,,17/07/24 13:42,41,12,17 Jul 2024,2.0,4.0,,1339000.0,41,32658.54`;
 
-    // Also store for download functions
-    localStorage.setItem('customerProfilesCSV', csvText);
+    const numericFields = ['Profile Total Spent', 'Profile Total Attended', 'Average Revenue', 'Completed', 'Cancelled'];
+    const feedDataset = getFeedDataset('customer_profiles');
+    let profiles;
 
-    if (!csvText || csvText.trim().length === 0) {
-      throw new Error('CSV file is empty or invalid');
-    }
+    if (feedDataset) {
+      // Rows come precomputed - no CSV parsing on load
+      cacheFeedCSV('customerProfiles', feedDataset, feedDataset.columns);
+      profiles = feedRows(feedDataset, numericFields);
+    } else {
+      if (!csvText || csvText.trim().length === 0) {
+        throw new Error('CSV file is empty or invalid');
+      }
 
-    // Store CSV data for downloads
-    localStorage.setItem('customerProfilesCSV', csvText);
+      // Store CSV data for downloads
+      localStorage.setItem('customerProfilesCSV', csvText);
+      localStorage.removeItem('customerProfilesRevision');
 
-    // Parse CSV data
-    const profiles = parseCSV(csvText);
+      // Parse CSV data
+      profiles = parseCSV(csvText);
+    }
 
     if (!profiles || profiles.length === 0) {
       throw new Error('No valid data found in CSV file');
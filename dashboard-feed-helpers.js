@@ -0,0 +1,42 @@
+// Helpers shared by the dashboard pages for reading the precomputed data feed
+// published by the report scripts (dashboard-feed.js, loaded just before this file)
+
+const FEED_FORMAT_VERSION = 1;
+
+// Dataset from the feed, or null when the feed is missing or from an older format
+function getFeedDataset(name) {
+  const feed = window.BANGCRM_FEED;
+  if (!feed || feed.version !== FEED_FORMAT_VERSION) return null;
+  return feed.datasets[name] || null;
+}
+
+// Turn the column-oriented feed into row objects (missing numbers become 0)
+function feedRows(dataset, numericFields = []) {
+  const rows = new Array(dataset.rows);
+  for (let i = 0; i < dataset.rows; i++) {
+    const row = {};
+    dataset.columns.forEach(column => {
+      const value = dataset.data[column][i];
+      row[column] = value === null && numericFields.includes(column) ? 0 : value;
+    });
+    rows[i] = row;
+  }
+  return rows;
+}
+
+// Build the download CSV once per feed revision and keep it in localStorage
+function cacheFeedCSV(storageKey, dataset, columns) {
+  if (localStorage.getItem(storageKey + 'Revision') === dataset.revision) return;
+
+  const quote = value => {
+    const text = value === null ? '' : String(value);
+    return /[",\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+  };
+  const lines = [columns.join(',')];
+  for (let i = 0; i < dataset.rows; i++) {
+    lines.push(columns.map(column => quote(dataset.data[column][i])).join(','));
+  }
+
+  localStorage.setItem(storageKey + 'CSV', lines.join('\n'));
+  localStorage.setItem(storageKey + 'Revision', dataset.revision);
+}
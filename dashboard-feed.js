@@ -0,0 +1 @@
+window.BANGCRM_FEED = {"version":1,"datasets":{"customer_profiles":{"columns":["CustomerName","MobileCode","Mobile","Email","DateOfBirth","JoinedDate","Completed","Cancelled","Date joined","Days since last class","Days since package purchase","Days since membership purchase","Profile Total Spent","Profile Total Attended","Average Revenue","Completion Rate","Cancellation Rate","Performance Tier"],"rows":9,"data":{"CustomerName":["Tri Wulandari","Jonathan Edward","Lingkan S","Helena S","Lucky Suryadi","guntur mallarangeng","Angie Giovanni","Randy ",null],"MobileCode":["62","62","62","62","62","62","62",null,"62"],"Mobile":["811709799","87878461661","81287561090","8119187117","87886678158","8111888764","8111592727","81224424542","8111747788"],"Email":["wulandari1995.tw@gmail.com","jonathanedwardtobing98@gmail.com","lsngantung@gmail.com","helenafelicea@yahoo.com","Luckysuryadi@gmail.com","gunturmallarangeng@gmail.com","angie.giovanni2@gmail.com","r.prasidha@yahoo.com","elvirakwijaya@gmail.com"],"DateOfBirth":[null,"12 Nov 1998","16 Nov 1985",null,"16 Nov 1989","14 Feb 1993","27 Jul 1993",null,null],"JoinedDate":["04/11/24 10:22","08/09/24 09:26","20/08/24 14:58","20/08/24 14:52","06/08/24 23:07","02/08/24 16:19","29/07/24 20:53","26/07/24 10:18","17/07/24 13:42"],"Completed":[75,2,11,174,62,76,27,76,41],"Cancelled":[25,1,1,137,7,10,3,27,12],"Date joined":[null,"08 Sep 2024","20 Aug 2024","20 Aug 2024","06 Aug 2024","02 Aug 2024","29 Jul 2024","26 Jul 2024","17 Jul 2024"],"Days since last class":[null,380,10,4,27,59,10,14,2],"Days since package purchase":[null,258,290,87,42,77,50,59,4],"Days since membership purchase":[null,null,null,28,null,null,null,null,null],"Profile Total Spent":[17947750.0,515000.0,1545000.0,23952650.0,11921220.0,15656000.0,6651225.0,13160825.0,1339000.0],"Profile Total Attended":[75,2,11,174,62,76,27,76,41],"Average Revenue":[239303.33,257500.0,140454.55,137658.91,192277.74,206000.0,246341.67,173168.75,32658.54],"Completion Rate":[0.7075471698113207,0.5,0.9166666666666666,0.5288753799392097,0.8857142857142857,0.7378640776699029,0.9,0.7307692307692307,0.6833333333333333],"Cancellation Rate":[0.2358490566037736,0.25,0.08333333333333333,0.41641337386018235,0.1,0.0970873786407767,0.1,0.25961538461538464,0.2],"Performance Tier":["Premium","Elite","Standard","Standard","Standard","Premium","Premium","Standard","Standard"]},"summary":{"customers":9,"total_revenue":92688670.0,"total_attended":544,"revenue_per_class":170383.58455882352,"average_revenue_per_customer":180595.94244681916,"top_revenue_customer":"Helena S","top_revenue_per_class_customer":"Jonathan Edward","completion_rate":0.6650366748166259,"cancellation_rate":0.2726161369193154,"tier_counts":{"Elite":1,"Premium":3,"Standard":5,"New":0}},"revision":"21a3c4afd5a14982","published_at":"2026-10-18T08:23:45"},"expiring_plans":{"columns":["Type","Plan Name","Total Credits","Remaining Credits","Purchased Date","Start Date","End Date","First Name","Last Name","Mobile","Email","First Class","Last Class","Last Class Staff","Last Class Name","Full Name","Days Until Expiry"],"rows":9,"data":{"Type":["Package","Package","Package","Package","Package","Package","Package","Package","Package"],"Plan Name":["KEEP THE PARTY GOING💃🏻 (10 Pack)","KEEP THE PARTY GOING💃🏻 (10 Pack)","10 Class Pack (30% off)","3 Class Starter Pack","Free Pass","10 Class Pack (30% off)","5 Class Pack (30% off)","5 Class Pack (30% off)","10 Class Pack (30% off)"],"Total Credits":[10,10,10,3,1,10,5,5,10],"Remaining Credits":[0,8,9,1,0,3,2,2,3],"Purchased Date":["09/09/25","09/09/25","26/09/25","15/11/25","30/10/25","27/09/25","27/09/25","31/10/25","26/09/25"],"Start Date":["27/09/25","27/09/25","27/09/25","15/11/25","01/11/25","01/10/25","02/11/25","02/11/25","02/10/25"],"End Date":["26/11/25","26/11/25","26/11/25","28/11/25","30/11/25","30/11/25","01/12/25","01/12/25","01/12/25"],"First Name":["Arlene","guntur","Nabila","Wanti","sara","Nadia","Theo","Clairine","rachel"],"Last Name":["Tjahja","mallarangeng","Rudiono","Kadarisma","chew","Hudyana","Tedjasasmita","Runtung","lie"],"Mobile":["+62 818785005","+62 8111888764","+62 ","+62 87713111970","+60 124113283","+62 81285001666","+62 87889885152","+62 8111576901","+62 81110076622"],"Email":["jemima.tjahja@gmail.com","gunturmallarangeng@gmail.com","nabila.rudiono@gmail.com","wantikadarisman@rocketmail.com","sarajennavieve@gmail.com","nadiave.design@gmail.com","ttedjasasmita@gmail.com","runtung.clairine@gmail.com","racheljoannelie.sli@gmail.com"],"First Class":["19/09/25","27/09/25","27/09/25","15/11/25","01/11/25","01/10/25","02/11/25","02/11/25","02/10/25"],"Last Class":["16/10/25","27/09/25","27/09/25","23/11/25","01/11/25","30/11/25","23/11/25","22/11/25","27/11/25"],"Last Class Staff":["Surya Mallarangeng, Fellix Guy Kitto","Ruth Ivannie, Surya Mallarangeng","Nabau (Nabila Audri), Elvira Wijaya","Elvira Wijaya","Danny Harris, Sonia Effendy","TBC (To Be Confirmed)","Elvira Wijaya","Syed Harris, Chamonique Garnita","Surya Mallarangeng"],"Last Class Name":["BANG!","BANG!","BANG!","BANG!","BANG!","BANG!","BANG!","BANG!","BANG!"],"Full Name":["Arlene Tjahja","guntur mallarangeng","Nabila Rudiono","Wanti Kadarisma","sara chew","Nadia Hudyana","Theo Tedjasasmita","Clairine Runtung","rachel lie"],"Days Until Expiry":[-326,-326,-326,-324,-322,-322,-321,-321,-321]},"summary":{"total_plans":9,"critical_plans":0,"avg_days":0},"as_of":"2026-10-18","revision":"11fb6bc81e34556f","published_at":"2026-10-18T09:27:59"}},"generated_at":"2026-10-18T09:27:59"};
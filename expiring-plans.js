@@ -15,6 +15,9 @@ function generateFilteredCSV() {
   const csvText = localStorage.getItem('expiringPlansCSV');
   if (!csvText) return '';
 
+  // CSVs built from the feed are already filtered
+  if (localStorage.getItem('expiringPlansRevision')) return csvText;
+
   const plans = parseExpiringCSV(csvText);
 
   // Filter out specific plan types (EXCLUDE these)
@@ -79,29 +82,15 @@ async function downloadCSV() {
   }
 }
 
-// Download Excel function
-async function downloadExcel() {
-  try {
-    showNotification('Preparing Excel download...', 'info');
-
-    // Generate filtered CSV data
-    const csvText = generateFilteredCSV();
-
-    if (!csvText) {
-      throw new Error('No data available for download');
-    }
-
-    // Create Excel-compatible format
-    const excelContent = convertCSVToExcel(csvText);
+// Workbook written next to the report CSV by the report scripts (python expiring_plans.py)
+const EXCEL_REPORT_PATH = 'report/expiring_plans_filtered.xlsx';
 
-    // Create and download file
-    const blob = new Blob([excelContent], {
-      type: 'application/vnd.ms-excel;charset=utf-8;'
-    });
+// Download Excel function - serves the real .xlsx workbook the report scripts write
+function downloadExcel() {
+  try {
     const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
-    link.setAttribute('download', 'expiring_plans_' + new Date().toISOString().split('T')[0] + '.xls');
+    link.setAttribute('href', EXCEL_REPORT_PATH);
+    link.setAttribute('download', 'expiring_plans_' + new Date().toISOString().split('T')[0] + '.xlsx');
     link.style.visibility = 'hidden';
     document.body.appendChild(link);
     link.click();
@@ -114,33 +103,6 @@ async function downloadExcel() {
   }
 }
 
-// Convert CSV to Excel-compatible format
-function convertCSVToExcel(csvText) {
-  // Add Excel BOM for proper UTF-8 encoding in Excel
-  const bom = '\uFEFF';
-
-  // Process CSV to ensure Excel compatibility
-  let processedCSV = csvText;
-
-  // Ensure proper line endings for Excel
-  processedCSV = processedCSV.replace(/\r\n/g, '\n');
-  processedCSV = processedCSV.replace(/\r/g, '\n');
-
-  // Add proper Excel table formatting
-  const lines = processedCSV.split('\n');
-  if (lines.length > 0) {
-    // Clean up each line
-    const processedLines = lines.map(line => {
-      // Remove any problematic characters and ensure proper CSV formatting
-      return line.replace(/[^\x20-\x7E\u00A0-\u00FF\u4E00-\u9FFF,\n]/g, '');
-    });
-
-    processedCSV = processedLines.join('\n');
-  }
-
-  return bom + processedCSV;
-}
-
 // Show notification function
 function showNotification(message, type = 'info') {
   const notification = document.createElement('div');
@@ -196,15 +158,36 @@ Package,10 Class Pack (30% off),10,3,27/09/25,01/10/25,30/11/25,Nadia,Hudyana,+6
 Package,KEEP THE PARTY GOING💃🏻 (10 Pack),10,8,09/09/25,27/09/25,26/11/25,guntur,mallarangeng,+62 8111888764,gunturmallarangeng@gmail.com,27/09/25,27/09/25,"Ruth Ivannie, Surya Mallarangeng",BANG!
 Package,10 Class Pack (30% off),10,9,26/09/25,27/09/25,26/11/25,Nabila,Rudiono,"+62 ",nabila.rudiono@gmail.com,27/09/25,27/09/25,"Nabau (Nabila Audri), Elvira Wijaya",BANG!`;
 
-    // Also store for download functions
-    localStorage.setItem('expiringPlansCSV', csvText);
+    const feedDataset = getFeedDataset('expiring_plans');
+    let plans;
+
+    if (feedDataset) {
+      // Rows come precomputed and pre-filtered. Days until expiry were counted on
+      // the publish date, so shift them once by the days elapsed since then.
+      const sourceColumns = feedDataset.columns.filter(column => !['Full Name', 'Days Until Expiry'].includes(column));
+      cacheFeedCSV('expiringPlans', feedDataset, sourceColumns);
+      plans = feedRows(feedDataset, ['Total Credits', 'Remaining Credits']);
+
+      const today = new Date();
+      today.setHours(0, 0, 0, 0);
+      const elapsedDays = Math.round((today - new Date(feedDataset.as_of + 'T00:00:00')) / (1000 * 60 * 60 * 24));
+      plans.forEach(plan => {
+        if (plan['Days Until Expiry'] !== null) {
+          plan['Days Until Expiry'] -= elapsedDays;
+        }
+      });
+    } else {
+      // Also store for download functions
+      localStorage.setItem('expiringPlansCSV', csvText);
+      localStorage.removeItem('expiringPlansRevision');
 
-    if (!csvText || csvText.trim().length === 0) {
-      throw new Error('CSV file is empty or invalid');
-    }
+      if (!csvText || csvText.trim().length === 0) {
+        throw new Error('CSV file is empty or invalid');
+      }
 
-    // Parse CSV data
-    const plans = parseExpiringCSV(csvText);
+      // Parse CSV data
+      plans = parseExpiringCSV(csvText);
+    }
 
     if (!plans || plans.length === 0) {
       throw new Error('No valid data found in CSV file');
@@ -50,9 +50,18 @@ function getFullName(member) {
 function normalizePhone(phone) {
   if (!phone) return '';
   
-  // Remove non-digit characters
-  let digits = phone.replace(/\D/g, '');
-  
+  // Remove non-digit characters (and float-mangled ".0" suffixes from old exports)
+  let digits = phone.replace(/\.0\b/g, '').replace(/\D/g, '');
+
+  // Same cleanup as report/contact_normalization.py: "+ 62 0812..." keeps its trunk 0
+  // and "+ 62 62812..." repeats the country code in some activity exports
+  if (digits.startsWith('620')) {
+    digits = '62' + digits.substring(2).replace(/^0+/, '');
+  }
+  if (digits.startsWith('6262') && digits.length - 4 >= 8) {
+    digits = digits.substring(2);
+  }
+
   // Handle country code
   if (digits.startsWith('62')) {
     return digits;
@@ -0,0 +1,61 @@
+import pandas as pd
+
+# Chunked readers for activity exports. read_latest_activities keeps one record per
+# customer, so its memory is bounded by the number of customers at any export size.
+# read_activities keeps every record, so its memory grows with the activity rows -
+# only the whole-file parse overhead is avoided.
+DEFAULT_CHUNKSIZE = 50000
+
+
+def prepared_chunks(activities_report_path, prepare_chunk, chunksize=DEFAULT_CHUNKSIZE, dtype=None, usecols=None):
+    # Chunks of the activities export with the clean matching columns the consolidators
+    # expect, plus the number of raw rows read once the generator is exhausted
+    if usecols is not None:
+        header = pd.read_csv(activities_report_path, nrows=0).columns
+        usecols = [col for col in header if col in usecols]
+
+    read = False
+    for chunk in pd.read_csv(activities_report_path, chunksize=chunksize, dtype=dtype, usecols=usecols):
+        read = True
+        yield len(chunk), prepare_chunk(chunk)
+
+    if not read:
+        yield 0, prepare_chunk(pd.read_csv(activities_report_path, nrows=0, dtype=dtype, usecols=usecols))
+
+
+def read_activities(activities_report_path, prepare_chunk, chunksize=DEFAULT_CHUNKSIZE, dtype=None, usecols=None):
+    # Stream the activities export and keep every record - the same rows as reading the
+    # whole file at once, with only one raw chunk being prepared at a time. The result
+    # still holds every activity row, so memory is not bounded by the chunk size.
+    chunks = []
+    total_rows = 0
+    for rows, chunk in prepared_chunks(activities_report_path, prepare_chunk, chunksize, dtype, usecols):
+        total_rows += rows
+        chunks.append(chunk)
+    return pd.concat(chunks, ignore_index=True), total_rows
+
+
+def read_latest_activities(activities_report_path, key_column, prepare_chunk, chunksize=DEFAULT_CHUNKSIZE,
+                           keep_rows=None, dtype=None, usecols=None):
+    # Stream the activities export and keep only the first record seen for each key.
+    # Folding every chunk into the running table with keep='first' gives the same rows
+    # (and the same order) as drop_duplicates(keep='first') on the full file, while
+    # memory stays bounded by the number of distinct customers plus one chunk.
+    latest = None
+    total_rows = 0
+    for rows, chunk in prepared_chunks(activities_report_path, prepare_chunk, chunksize, dtype, usecols):
+        total_rows += rows
+
+        # Optionally drop rows the caller will never merge (e.g. non-profile customers)
+        if keep_rows is not None:
+            chunk = chunk[keep_rows(chunk)]
+
+        chunk = chunk.drop_duplicates(subset=[key_column], keep='first')
+
+        if latest is None:
+            latest = chunk
+        else:
+            latest = pd.concat([latest, chunk], ignore_index=True)
+            latest = latest.drop_duplicates(subset=[key_column], keep='first')
+
+    return latest.reset_index(drop=True), total_rows
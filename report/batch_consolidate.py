@@ -0,0 +1,162 @@
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import re
+import time
+
+import pandas as pd
+
+from report_writer import DEFAULT_FORMATS
+
+CUSTOMER_REPORT_PATTERN = re.compile(r'customer_report_(\d{8})\.csv$')
+ACTIVITIES_PATTERN = re.compile(r'customers_activities_(\d{8})to(\d{8})\.csv$')
+
+DEFAULT_CHUNKSIZE = 50000
+
+# Worker processes are replaced after this many jobs so memory cannot pile up
+TASKS_PER_WORKER = 4
+
+
+def find_snapshot_pairs(source):
+    # Pair every customer_report_YYYYMMDD.csv with the activities window that starts
+    # closest before (or on) its snapshot date. `source` is a directory or a glob.
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.csv'))
+    else:
+        paths = glob.glob(source)
+    return pair_snapshots(paths)
+
+
+def pair_snapshots(paths):
+    # find_snapshot_pairs for an explicit list of export paths
+    reports = {}
+    windows = []
+    for path in paths:
+        name = os.path.basename(path)
+        report_match = CUSTOMER_REPORT_PATTERN.search(name)
+        activities_match = ACTIVITIES_PATTERN.search(name)
+        if report_match:
+            reports[report_match.group(1)] = path
+        elif activities_match:
+            windows.append((activities_match.group(1), activities_match.group(2), path))
+
+    pairs = []
+    for snapshot_date in sorted(reports):
+        candidates = [window for window in windows if window[0] <= snapshot_date]
+        if not candidates:
+            # Fall back to the earliest window when the report predates all of them
+            candidates = sorted(windows)[:1]
+        if not candidates:
+            print(f"No activities export for customer_report_{snapshot_date}.csv - skipped")
+            continue
+        start_date, end_date, activities_path = max(candidates)
+        pairs.append({
+            'snapshot_date': snapshot_date,
+            'customer_report_path': reports[snapshot_date],
+            'activities_report_path': activities_path,
+            'window': f'{start_date}to{end_date}',
+        })
+
+    return pairs
+
+
+def output_path_for(pair, output_dir, report):
+    # Deterministic naming - the same snapshot pair always writes the same file
+    return os.path.join(output_dir, f"{report}_{pair['snapshot_date']}_{pair['window']}.csv")
+
+
+def consolidate_pair(pair, report, output_path, chunksize=DEFAULT_CHUNKSIZE, output_formats=DEFAULT_FORMATS):
+    # Workers do not share the persistent identity index (concurrent writes would
+    # race), so each job resolves customers with a fresh in-memory index
+    from consolidate_report import consolidate_customer_reports
+    from consolidate_reports import create_consolidated_report
+
+    if report == 'consolidated_customer_report':
+        return create_consolidated_report(chunksize=chunksize,
+                                          index_path=None,
+                                          customer_report_path=pair['customer_report_path'],
+                                          activities_report_path=pair['activities_report_path'],
+                                          output_path=output_path,
+                                          output_formats=output_formats)
+    return consolidate_customer_reports(pair['customer_report_path'],
+                                        pair['activities_report_path'],
+                                        output_path,
+                                        chunksize=chunksize,
+                                        index_path=None,
+                                        output_formats=output_formats)
+
+
+def run_job(job):
+    # Runs inside a worker process. Activities are streamed in chunks; the by-email
+    # report keeps one record per customer, so its memory stays bounded by the number
+    # of customers. The name-based consolidated_customer_report keeps every activity
+    # row, so a worker running it holds the whole activities export.
+    pair, output_dir, report, chunksize = job
+    output_path = output_path_for(pair, output_dir, report)
+    start = time.perf_counter()
+    status = 'ok'
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_output = consolidate_pair(pair, report, output_path, chunksize)
+        if df_output is None:
+            status = 'error'
+    except Exception as e:
+        df_output = None
+        status = f'error: {str(e)}'
+
+    return {
+        'snapshot_date': pair['snapshot_date'],
+        'window': pair['window'],
+        'output_path': output_path,
+        'rows': len(df_output) if df_output is not None else 0,
+        'seconds': round(time.perf_counter() - start, 3),
+        'status': status,
+    }
+
+
+def run_batch(source, output_dir='batch_output', report='consolidated_customer_report_by_email',
+              workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    # Consolidate every snapshot pair in parallel and write a per-job summary
+    pairs = find_snapshot_pairs(source)
+    if not pairs:
+        print(f"No snapshot pairs found in {source}")
+        return pd.DataFrame()
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"Consolidating {len(pairs)} snapshot pairs with {workers} workers")
+
+    jobs = [(pair, output_dir, report, chunksize) for pair in pairs]
+    start = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(processes=workers, maxtasksperchild=TASKS_PER_WORKER) as pool:
+        results = list(pool.imap_unordered(run_job, jobs))
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame(results).sort_values('snapshot_date').reset_index(drop=True)
+    summary.to_csv(os.path.join(output_dir, f'{report}_batch_summary.csv'), index=False)
+
+    print("\n=== BATCH SUMMARY ===")
+    print(summary.to_string(index=False))
+    print(f"\nTotal rows: {summary['rows'].sum()}")
+    print(f"Wall time: {elapsed:.2f}s, job time: {summary['seconds'].sum():.2f}s")
+
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Consolidate snapshot pairs of CRM exports in parallel')
+    parser.add_argument('source', help='directory or glob with customer_report_* and customers_activities_* files')
+    parser.add_argument('--output-dir', default='batch_output')
+    parser.add_argument('--report', default='consolidated_customer_report_by_email',
+                        choices=['consolidated_customer_report_by_email', 'consolidated_customer_report'],
+                        help='email/mobile consolidation (consolidate_report) or name consolidation (consolidate_reports)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    run_batch(args.source, args.output_dir, args.report, args.workers, args.chunksize)
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from consolidate_report import consolidate_customer_reports
+
+
+def build_scaled_inputs(scale, work_dir,
+                        customer_report_path='customer_report_20240101.csv',
+                        activities_report_path='customers_activities_20231231to20241231.csv'):
+    # Replicate the sample exports `scale` times with unique emails and mobiles
+    df_customers = pd.read_csv(customer_report_path, dtype={'Mobile': str, 'MobileCode': str})
+    df_activities = pd.read_csv(activities_report_path, dtype={'Mobile': str})
+
+    customers = []
+    activities = []
+    for i in range(scale):
+        df_c = df_customers.copy()
+        df_a = df_activities.copy()
+
+        # Most customers have no email in the activities file, forcing the mobile fallback
+        df_c['Email'] = 'bench' + str(i) + '_' + df_c.index.astype(str) + '@example.com'
+        df_c['MobileCode'] = '62'
+        df_c['Mobile'] = (900000000 + i * 100000 + df_c.index).astype(str)
+
+        df_a['Email'] = 'act' + str(i) + '_' + df_a.index.astype(str) + '@example.com'
+        df_a['Mobile'] = '+ 62 ' + (900000000 + i * 100000 + df_a.index).astype(str)
+
+        customers.append(df_c)
+        activities.append(df_a)
+
+    customers_path = os.path.join(work_dir, f'customer_report_x{scale}.csv')
+    activities_path = os.path.join(work_dir, f'customers_activities_x{scale}.csv')
+    pd.concat(customers, ignore_index=True).to_csv(customers_path, index=False)
+    pd.concat(activities, ignore_index=True).to_csv(activities_path, index=False)
+
+    return customers_path, activities_path
+
+
+def benchmark_mobile_join(scales=(1, 10, 50, 100)):
+    results = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in scales:
+            customers_path, activities_path = build_scaled_inputs(scale, work_dir)
+            output_path = os.path.join(work_dir, f'consolidated_x{scale}.csv')
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                df_output = consolidate_customer_reports(customers_path, activities_path, output_path,
+                                                         index_path=None)
+            elapsed = time.perf_counter() - start
+
+            rows = len(df_output) if df_output is not None else 0
+            results.append({'scale': scale, 'rows': rows, 'seconds': elapsed})
+
+    # Runtime per row should stay flat if the join grows linearly
+    print(f"{'Scale':>6} {'Rows':>10} {'Seconds':>10} {'us/row':>10}")
+    for result in results:
+        per_row = result['seconds'] / result['rows'] * 1e6 if result['rows'] else 0
+        print(f"{result['scale']:>6} {result['rows']:>10} {result['seconds']:>10.3f} {per_row:>10.1f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_mobile_join()
@@ -0,0 +1,57 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from consolidate_profile_customers import create_profile_consolidated_report
+from clean_profile_report import clean_profile_report
+from simplify_profile_report import simplify_profile_report
+from profile_report_pipeline import run_profile_report_pipeline
+
+
+def run_three_step(work_dir):
+    # The current flow - every stage writes a CSV that the next stage re-parses
+    consolidated_path = os.path.join(work_dir, 'consolidated_customer_profiles_report.csv')
+    clean_path = os.path.join(work_dir, 'consolidated_customer_profiles_clean.csv')
+    output_path = os.path.join(work_dir, 'simplified_three_step.csv')
+
+    create_profile_consolidated_report(output_path=consolidated_path)
+    clean_profile_report(input_path=consolidated_path, output_path=clean_path)
+    simplify_profile_report(input_path=clean_path, output_path=output_path)
+    return output_path
+
+
+def run_single_pass(work_dir):
+    output_path = os.path.join(work_dir, 'simplified_single_pass.csv')
+    run_profile_report_pipeline(output_path=output_path)
+    return output_path
+
+
+def benchmark_profile_pipeline(repeats=5):
+    timings = {'three-step': [], 'single-pass': []}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(repeats):
+            for name, runner in (('three-step', run_three_step), ('single-pass', run_single_pass)):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    output_path = runner(work_dir)
+                timings[name].append(time.perf_counter() - start)
+
+        # Both flows must produce the same final artifact
+        with open(os.path.join(work_dir, 'simplified_three_step.csv')) as f:
+            three_step_output = f.read()
+        with open(os.path.join(work_dir, 'simplified_single_pass.csv')) as f:
+            single_pass_output = f.read()
+
+    print(f"{'Flow':>12} {'Best (s)':>10} {'Mean (s)':>10}")
+    for name, runs in timings.items():
+        print(f"{name:>12} {min(runs):>10.4f} {sum(runs) / len(runs):>10.4f}")
+    print(f"Identical output: {three_step_output == single_pass_output}")
+
+    return timings
+
+
+if __name__ == "__main__":
+    benchmark_profile_pipeline()
@@ -0,0 +1,48 @@
+import time
+
+import pandas as pd
+
+from schema import read_typed_csv
+
+# Point these at full-size exports - the samples are small enough that
+# fixed parser overhead dominates the timings
+EXPORTS = [
+    'customer_report_20240101.csv',
+    'customers_activities_20231231to20241231.csv',
+    'customer_profiles.csv',
+    '../reportcrm/expiringplans.csv',
+]
+
+
+def measure(path, repeats=5, reader=pd.read_csv):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = reader(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def benchmark_schema(exports=EXPORTS):
+    results = []
+    print(f"{'Export':<45} {'Inferred B/row':>15} {'Schema B/row':>13} {'Inferred ms':>12} {'Schema ms':>10}")
+    for path in exports:
+        inferred_time, inferred_bytes = measure(path)
+        schema_time, schema_bytes = measure(path, reader=read_typed_csv)
+        results.append({
+            'export': path,
+            'inferred_bytes_per_row': inferred_bytes,
+            'schema_bytes_per_row': schema_bytes,
+            'inferred_seconds': inferred_time,
+            'schema_seconds': schema_time,
+        })
+        print(f"{path:<45} {inferred_bytes:>15.0f} {schema_bytes:>13.0f} "
+              f"{inferred_time * 1000:>12.2f} {schema_time * 1000:>10.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark_schema(sys.argv[1:] or EXPORTS)
@@ -0,0 +1,197 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from synthetic_exports import generate_exports
+
+DEFAULT_SCALES = (10, 100, 1000)
+DEFAULT_WORK_DIR = 'synthetic_exports'
+# Local history of runs on this machine (not tracked) - regressions are checked against it
+DEFAULT_RESULTS_PATH = 'benchmark_results.csv'
+
+# A stage this much slower than the previous run of the same benchmark is flagged
+REGRESSION_RATIO = 1.2
+
+# Which exports each benchmark reads (rows/sec is measured against their total rows)
+BENCHMARK_INPUTS = {
+    'consolidate_report': ['customers', 'activities'],
+    'consolidate_reports': ['customers', 'activities'],
+    'consolidate_profile_customers': ['profiles', 'customers', 'activities'],
+    'profile_report_pipeline': ['profiles', 'customers', 'activities'],
+    'expiring_plans': ['plans'],
+}
+
+
+def peak_rss_mb():
+    # VmHWM belongs to this process image only - ru_maxrss would also carry over the
+    # high-water mark of the parent that generated the exports (it survives fork/exec)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if os.uname().sysname == 'Darwin' else 1)
+
+
+def benchmark_stages(name, exports, work_dir):
+    # (stage, callable) pairs for one benchmark; each callable gets the previous result
+    from consolidate_report import consolidate_customer_reports
+    from consolidate_reports import create_consolidated_report
+    from consolidate_profile_customers import create_profile_consolidated_report
+    from clean_profile_report import clean_profile_report
+    from simplify_profile_report import simplify_profile_report
+    from expiring_plans import build_expiring_plans_index, page_outputs
+
+    paths = {kind: path for kind, (path, _) in exports.items()}
+    output_path = os.path.join(work_dir, f'{name}_output.csv')
+
+    if name == 'consolidate_report':
+        return [('consolidate', lambda _: consolidate_customer_reports(
+            paths['customers'], paths['activities'], output_path, index_path=None))]
+    if name == 'consolidate_reports':
+        return [('consolidate', lambda _: create_consolidated_report(
+            index_path=None, customer_report_path=paths['customers'],
+            activities_report_path=paths['activities'], output_path=output_path))]
+    if name == 'consolidate_profile_customers':
+        return [('consolidate', lambda _: create_profile_consolidated_report(
+            profiles_path=paths['profiles'], customer_report_path=paths['customers'],
+            activities_report_path=paths['activities'], output_path=output_path, index_path=None))]
+    if name == 'profile_report_pipeline':
+        return [
+            ('consolidate', lambda _: create_profile_consolidated_report(
+                profiles_path=paths['profiles'], customer_report_path=paths['customers'],
+                activities_report_path=paths['activities'], output_path=None, index_path=None)),
+            ('clean', lambda df: clean_profile_report(df=df, output_path=None)),
+            ('simplify', lambda df: simplify_profile_report(df=df, output_path=output_path)),
+        ]
+    if name == 'expiring_plans':
+        return [
+            ('index', lambda _: build_expiring_plans_index(paths['plans'])),
+            ('page_outputs', lambda index: page_outputs(index)),
+        ]
+    raise ValueError(f'Unknown benchmark: {name}')
+
+
+def run_benchmark(job):
+    # Runs in a fresh worker process so peak RSS belongs to this benchmark alone.
+    # The export cache points at an empty temporary directory, so every run parses
+    # cold, and the cache is deleted when the run ends.
+    name, exports, work_dir = job
+    with tempfile.TemporaryDirectory(prefix=f'.cache_{name}_', dir=work_dir) as cache_dir:
+        os.environ['BANGCRM_CACHE_DIR'] = cache_dir
+
+        rows = sum(exports[kind][1] for kind in BENCHMARK_INPUTS[name])
+        records = []
+        result = None
+        total_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for stage, run in benchmark_stages(name, exports, work_dir):
+                start = time.perf_counter()
+                try:
+                    result = run(result)
+                except Exception as e:
+                    print(f"{name}/{stage} failed: {str(e)}")
+                    result = None
+                records.append({'stage': stage, 'seconds': time.perf_counter() - start,
+                                'peak_rss_mb': peak_rss_mb(), 'ok': result is not None})
+                if result is None:
+                    break
+        records.append({'stage': 'total', 'seconds': time.perf_counter() - total_start,
+                        'peak_rss_mb': peak_rss_mb(), 'ok': all(record['ok'] for record in records)})
+
+    for record in records:
+        record.update({'benchmark': name, 'rows': rows,
+                       'rows_per_sec': rows / record['seconds'] if record['seconds'] else 0})
+    return records
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare_with_previous(results, previous):
+    # Ratio of this run's time to the latest earlier run of the same benchmark/stage/scale
+    if previous is None or previous.empty:
+        results['vs_previous'] = float('nan')
+        return results
+    keys = ['scale', 'benchmark', 'stage']
+    last = previous.sort_values('run_at').drop_duplicates(subset=keys, keep='last')
+    merged = results.merge(last[keys + ['seconds']], on=keys, how='left', suffixes=('', '_previous'))
+    results['vs_previous'] = (merged['seconds'] / merged['seconds_previous']).to_numpy()
+    return results
+
+
+def benchmark_suite(scales=DEFAULT_SCALES, benchmarks=tuple(BENCHMARK_INPUTS), work_dir=DEFAULT_WORK_DIR,
+                    results_path=DEFAULT_RESULTS_PATH, seed=0):
+    run_at = datetime.now().isoformat(timespec='seconds')
+    commit = current_commit()
+    records = []
+
+    for scale in scales:
+        scale_dir = os.path.join(work_dir, f'x{scale}')
+        start = time.perf_counter()
+        exports = generate_exports(scale, scale_dir, seed=seed)
+        print(f"Generated x{scale} exports in {time.perf_counter() - start:.1f}s: " +
+              ', '.join(f'{kind} {rows}' for kind, (_, rows) in exports.items()))
+
+        for name in benchmarks:
+            # One task per worker, so every benchmark starts from a clean process
+            with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+                stage_records = pool.apply(run_benchmark, ((name, exports, scale_dir),))
+            for record in stage_records:
+                record['scale'] = scale
+            records.extend(stage_records)
+
+    results = pd.DataFrame(records)
+    results.insert(0, 'run_at', run_at)
+    results.insert(1, 'commit', commit)
+    results = results[['run_at', 'commit', 'scale', 'benchmark', 'stage', 'rows', 'seconds',
+                       'rows_per_sec', 'peak_rss_mb', 'ok']]
+
+    previous = pd.read_csv(results_path) if results_path and os.path.exists(results_path) else None
+    report = compare_with_previous(results.copy(), previous)
+
+    if results_path:
+        results.to_csv(results_path, mode='a', index=False, header=previous is None)
+        print(f"Results appended to {results_path}")
+
+    print(f"\n{'Scale':>6} {'Benchmark':<30} {'Stage':<13} {'Rows':>9} {'Seconds':>9} "
+          f"{'Rows/s':>10} {'Peak MB':>8} {'vs prev':>8}")
+    for row in report.itertuples(index=False):
+        ratio = '' if pd.isna(row.vs_previous) else f'{row.vs_previous:.2f}x'
+        flag = ' SLOWER' if not pd.isna(row.vs_previous) and row.vs_previous > REGRESSION_RATIO else ''
+        failed = '' if row.ok else ' FAILED'
+        print(f"{row.scale:>6} {row.benchmark:<30} {row.stage:<13} {row.rows:>9} {row.seconds:>9.3f} "
+              f"{row.rows_per_sec:>10.0f} {row.peak_rss_mb:>8.0f} {ratio:>8}{flag}{failed}")
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the report scripts on synthetic exports')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARK_INPUTS), choices=list(BENCHMARK_INPUTS))
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR)
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark_suite(args.scales, args.benchmarks, args.work_dir, args.results, args.seed)
@@ -0,0 +1,222 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from contact_normalization import normalize_emails, normalize_phones
+from dashboard_feed import DEFAULT_FEED_PATH, publish_dataset
+from schema import load_export
+
+# Same rules as the dashboard (index.js)
+DORMANT_DAYS = 30
+EXPIRING_DAYS = 14
+
+UNLIMITED = 'Unlimited'
+
+# calculateMemberStatus labels - anything else falls back to 'Active' like the dashboard
+STATUS_LABELS = {
+    'active': 'Active',
+    'unpaid': 'Unpaid',
+    'frozen': 'Frozen',
+    'dormant': 'Dormant',
+    'expired': 'Expired',
+    'expiring': 'Expiring Soon',
+    'unknown': 'Unknown',
+}
+
+STATUS_TABLE_COLUMNS = [
+    'fullName', 'mobile', 'email', 'category', 'expiry', 'lastBookingDate',
+    'daysSinceLastVisit', 'calculatedStatus', 'isExpiringSoon', 'isExpired', 'isDormant', 'nextStep',
+]
+
+
+def parse_dates(series):
+    # DD/MM/YY like the dashboard's parseDate - '--', 'Unlimited' and blanks become NaT.
+    # Columns that are already datetimes pass through unchanged.
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, format='%d/%m/%y', errors='coerce')
+
+
+def format_dates(series):
+    return series.dt.strftime('%d/%m/%y').fillna('--')
+
+
+def evaluate_member_status(members, today=None):
+    # Vectorized getMemberStatus / isExpiringSoon / isExpired / isDormant / getNextStep
+    # over a frame with the data.js member fields (expirationDate, renewsOn,
+    # lastBookingDate and, for Unlimited plans, status).
+    #
+    # The dashboard compares against the current time of day, so day offsets are
+    # taken from midnight of `today`: an expiry date of today already counts as
+    # expired and a booking exactly 30 days ago already counts as dormant.
+    today = pd.Timestamp(today or date.today()).normalize()
+    index = members.index
+
+    def column(name):
+        if name in members.columns:
+            return members[name]
+        return pd.Series(pd.NA, index=index, dtype='string')
+
+    expiration = column('expirationDate').astype('string')
+    unlimited = expiration.eq(UNLIMITED).fillna(False).to_numpy(dtype=bool)
+    status = column('status').astype('string').fillna('')
+
+    days_to_expiry = (parse_dates(expiration) - today).dt.days.to_numpy(dtype='float64', na_value=np.nan)
+    days_to_renewal = (parse_dates(column('renewsOn')) - today).dt.days.to_numpy(dtype='float64', na_value=np.nan)
+    last_booking = parse_dates(column('lastBookingDate'))
+    days_since_visit = (today - last_booking).dt.days.to_numpy(dtype='float64', na_value=np.nan)
+
+    no_expiry = np.isnan(days_to_expiry)
+    no_booking = np.isnan(days_since_visit)
+    is_dormant = days_since_visit >= DORMANT_DAYS
+    is_expired = ~unlimited & (days_to_expiry <= 0)
+    is_expiring_soon = np.where(unlimited,
+                                days_to_renewal <= EXPIRING_DAYS,
+                                (days_to_expiry <= EXPIRING_DAYS) & (days_to_expiry > 0))
+
+    status_values = status.to_numpy(dtype=object)
+    member_status = np.select(
+        [
+            unlimited & (status_values == 'Active'),
+            unlimited & np.isin(status_values, ['Unpaid', 'Overdue']),
+            unlimited & (status_values == 'Frozen'),
+            unlimited & is_dormant,
+            unlimited,
+            no_expiry,
+            is_expired,
+            # The dashboard subtracts a missing lastBookingDate as 0, which makes
+            # members with a live plan and no booking dormant as well
+            is_dormant | no_booking,
+            days_to_expiry <= EXPIRING_DAYS,
+        ],
+        [
+            'active', 'unpaid', 'frozen', 'dormant',
+            status.str.lower().to_numpy(dtype=object),
+            'unknown', 'expired', 'dormant', 'expiring',
+        ],
+        default='active',
+    )
+
+    next_step = np.select([is_expired, is_expiring_soon, is_dormant],
+                          ['Send offer', 'WhatsApp reminder', 'Call'],
+                          default='')
+
+    return pd.DataFrame({
+        'calculatedStatus': pd.Series(member_status, index=index).map(STATUS_LABELS).fillna('Active'),
+        'isExpiringSoon': is_expiring_soon,
+        'isExpired': is_expired,
+        'isDormant': is_dormant,
+        'daysSinceLastVisit': pd.array(np.where(no_booking, np.nan, days_since_visit), dtype='Int32'),
+        'nextStep': next_step,
+    }, index=index)
+
+
+def latest_plans(plans):
+    # One plan per member - the one that ends last
+    plans = plans.assign(
+        Email_clean=normalize_emails(plans['Email']),
+        Mobile_clean=normalize_phones(plans['Mobile']),
+        end_date=parse_dates(plans['End Date']),
+    )
+    return plans.sort_values('end_date', ascending=False, kind='stable')
+
+
+def members_from_reports(consolidated, plans=None, as_of=None):
+    # Build dashboard member records from the consolidated customer report. Last visits
+    # come from "Days from Last Completed Class" relative to the export date `as_of`;
+    # plan names and expiry dates come from the expiring plans export, matched by email
+    # and then by mobile.
+    as_of = pd.Timestamp(as_of or date.today()).normalize()
+    days_since_class = pd.to_numeric(consolidated['Days from Last Completed Class'], errors='coerce')
+
+    members = pd.DataFrame({
+        'fullName': consolidated['Name'].astype('string').str.strip(),
+        'mobile': consolidated['Phone Number'].astype('string'),
+        'email': consolidated['Email'].astype('string'),
+        'category': pd.Series(pd.NA, index=consolidated.index, dtype='string'),
+        'expirationDate': pd.Series(pd.NA, index=consolidated.index, dtype='string'),
+        'lastBookingDate': as_of - pd.to_timedelta(days_since_class, unit='D'),
+    })
+
+    if plans is not None and len(plans):
+        plans = latest_plans(plans)
+        plan_index = pd.Series(plans.index, index=plans.index)
+        by_email = plan_index.groupby(plans['Email_clean']).first()
+        by_mobile = plan_index.groupby(plans['Mobile_clean']).first()
+
+        plan_row = normalize_emails(members['email']).map(by_email)
+        plan_row = plan_row.fillna(normalize_phones(members['mobile']).map(by_mobile))
+        matched = plan_row.notna()
+
+        matched_plans = plans.loc[plan_row[matched].astype('int64')]
+        members.loc[matched, 'category'] = matched_plans['Plan Name'].astype('string').to_numpy()
+        members.loc[matched, 'expirationDate'] = matched_plans['End Date'].astype('string').to_numpy()
+
+    return members
+
+
+def build_status_table(members, today=None):
+    # Precomputed churn watch rows in the dashboard's field names
+    statuses = evaluate_member_status(members, today=today)
+
+    expiry = members['expirationDate'].astype('string')
+    if 'renewsOn' in members.columns:
+        # Unlimited plans show their renewal date, like the churn table does
+        expiry = expiry.mask(expiry.eq(UNLIMITED).fillna(False), members['renewsOn'])
+
+    table = pd.concat([members, statuses], axis=1)
+    table['expiry'] = expiry.fillna('--')
+    table['lastBookingDate'] = format_dates(parse_dates(members['lastBookingDate']))
+    return table[STATUS_TABLE_COLUMNS]
+
+
+def create_member_status_table(consolidated_report_path='consolidated_customer_report.csv',
+                               expiring_plans_path='../reportcrm/expiringplans.csv',
+                               output_path='member_status.csv',
+                               as_of=None, today=None, feed_path=None):
+    try:
+        consolidated = load_export(consolidated_report_path)
+        plans = load_export(expiring_plans_path) if expiring_plans_path else None
+        print(f"Loaded {len(consolidated)} customers" +
+              (f" and {len(plans)} expiring plans" if plans is not None else ""))
+
+        members = members_from_reports(consolidated, plans, as_of=as_of)
+        table = build_status_table(members, today=today)
+
+        if output_path:
+            table.to_csv(output_path, index=False)
+            print(f"Member status table saved to: {output_path}")
+
+        if feed_path:
+            publish_dataset('members', table, feed_path=feed_path,
+                            as_of=pd.Timestamp(today or date.today()).date().isoformat())
+
+        print(f"Total: {len(table)}, "
+              f"Active: {(table['calculatedStatus'] == 'Active').sum()}, "
+              f"Expiring: {table['isExpiringSoon'].sum()}, "
+              f"Expired: {table['isExpired'].sum()}, "
+              f"Dormant: {table['isDormant'].sum()}")
+
+        return table
+
+    except Exception as e:
+        print(f"Error building member status table: {str(e)}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompute churn watch statuses for the dashboard')
+    parser.add_argument('--consolidated-report', default='consolidated_customer_report.csv')
+    parser.add_argument('--expiring-plans', default='../reportcrm/expiringplans.csv')
+    parser.add_argument('--output', default='member_status.csv')
+    parser.add_argument('--as-of', default=None, help='export date of the consolidated report (YYYY-MM-DD)')
+    parser.add_argument('--today', default=None, help='evaluation date (YYYY-MM-DD), defaults to today')
+    parser.add_argument('--feed', nargs='?', const=DEFAULT_FEED_PATH, default=None,
+                        help='also publish the table to the dashboard feed')
+    args = parser.parse_args()
+
+    create_member_status_table(args.consolidated_report, args.expiring_plans, args.output,
+                               as_of=args.as_of, today=args.today, feed_path=args.feed)
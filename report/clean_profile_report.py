@@ -1,12 +1,81 @@
 import pandas as pd
 
-def clean_profile_report():
-    # Read the current profile report
-    input_path = 'consolidated_customer_profiles_report.csv'
-    output_path = 'consolidated_customer_profiles_clean.csv'
+from column_plan import required_columns
+from report_writer import write_report
+from instrumentation import instrumented
+from schema import load_export
 
+# Final column order matching consolidated_customer_report structure
+FINAL_COLUMNS = [
+    'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth',
+    'Membership', 'JoinedDate',
+    'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
+    'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking',
+    'Date joined', 'Days since first joined', 'Days since last class',
+    'Days since last appointment', 'Days since outlet access',
+    'Days since package purchase', 'Days since membership purchase',
+    'Days since drop in purchase', 'Days since course purchase',
+    'Days since member', 'Days since non member', 'Days since lost member',
+    'Total class completed', 'Total appointment completed',
+    'Total outlet access completed', 'Total courses completed',
+    'Total spending amount',
+    'profile_totalSpendedAmount', 'profile_totalBooking', 'profile_totalAttendedClass'
+]
+
+# Renamed columns for consistency
+COLUMN_MAPPING = {
+    'CustomerName': 'CustomerName',
+    'MobileCode': 'MobileCode',
+    'Mobile': 'Mobile',
+    'Email': 'Email',
+    'DateOfBirth': 'DateOfBirth',
+    'Membership': 'Membership',
+    'JoinedDate': 'JoinedDate',
+    'Completed': 'Completed',
+    'Booked': 'Booked',
+    'No Show': 'No Show',
+    'Cancelled': 'Cancelled',
+    'Late Cancelled': 'Late Cancelled',
+    'Waitlist Cancelled': 'Waitlist Cancelled',
+    'Waitlist Expired': 'Waitlist Expired',
+    'Total Booking': 'Total Booking',
+    'Date joined': 'Date joined',
+    'Days since first joined': 'Days since first joined',
+    'Days since last class': 'Days since last class',
+    'Days since last appointment': 'Days since last appointment',
+    'Days since outlet access': 'Days since outlet access',
+    'Days since package purchase': 'Days since package purchase',
+    'Days since membership purchase': 'Days since membership purchase',
+    'Days since drop in purchase': 'Days since drop in purchase',
+    'Days since course purchase': 'Days since course purchase',
+    'Days since member': 'Days since member',
+    'Days since non member': 'Days since non member',
+    'Days since lost member': 'Days since lost member',
+    'Total class completed': 'Total class completed',
+    'Total appointment completed': 'Total appointment completed',
+    'Total outlet access completed': 'Total outlet access completed',
+    'Total courses completed': 'Total courses completed',
+    'Total spending amount': 'Total spending amount',
+    'profile_totalSpendedAmount': 'Profile Total Spent',
+    'profile_totalBooking': 'Profile Total Bookings',
+    'profile_totalAttendedClass': 'Profile Total Attended'
+}
+
+# Output schema, and the report columns it is read from
+OUTPUT_COLUMNS = [COLUMN_MAPPING.get(col, col) for col in FINAL_COLUMNS]
+INPUT_SOURCES = {name: [col] for col, name in COLUMN_MAPPING.items() if name != col}
+INPUT_COLUMNS = required_columns(OUTPUT_COLUMNS, INPUT_SOURCES)
+
+@instrumented('clean_profile_report')
+def clean_profile_report(df=None,
+                         input_path='consolidated_customer_profiles_report.csv',
+                         output_path='consolidated_customer_profiles_clean.csv'):
+    # Pass an in-memory profile report as df to skip the CSV read,
+    # output_path=None keeps the result in memory without writing it
     try:
-        df = pd.read_csv(input_path)
+        if df is None:
+            # Read the current profile report
+            df = load_export(input_path, cache_dir=None, usecols=INPUT_COLUMNS)
         print(f"Loaded {len(df)} records from profile report")
 
         # Columns to remove
@@ -20,71 +89,17 @@ def clean_profile_report():
         df_clean = df.drop(columns=columns_to_remove, errors='ignore')
         print(f"Removed {len(columns_to_remove)} columns")
 
-        # Define final column order matching consolidated_customer_report structure
-        final_columns = [
-            'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth',
-            'Membership', 'JoinedDate',
-            'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
-            'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking',
-            'Date joined', 'Days since first joined', 'Days since last class',
-            'Days since last appointment', 'Days since outlet access',
-            'Days since package purchase', 'Days since membership purchase',
-            'Days since drop in purchase', 'Days since course purchase',
-            'Days since member', 'Days since non member', 'Days since lost member',
-            'Total class completed', 'Total appointment completed',
-            'Total outlet access completed', 'Total courses completed',
-            'Total spending amount',
-            'profile_totalSpendedAmount', 'profile_totalBooking', 'profile_totalAttendedClass'
-        ]
-
         # Select only existing columns in the right order
-        existing_columns = [col for col in final_columns if col in df_clean.columns]
+        existing_columns = [col for col in FINAL_COLUMNS if col in df_clean.columns]
         df_final = df_clean[existing_columns].copy()
 
         # Rename columns for consistency
-        column_mapping = {
-            'CustomerName': 'CustomerName',
-            'MobileCode': 'MobileCode',
-            'Mobile': 'Mobile',
-            'Email': 'Email',
-            'DateOfBirth': 'DateOfBirth',
-            'Membership': 'Membership',
-            'JoinedDate': 'JoinedDate',
-            'Completed': 'Completed',
-            'Booked': 'Booked',
-            'No Show': 'No Show',
-            'Cancelled': 'Cancelled',
-            'Late Cancelled': 'Late Cancelled',
-            'Waitlist Cancelled': 'Waitlist Cancelled',
-            'Waitlist Expired': 'Waitlist Expired',
-            'Total Booking': 'Total Booking',
-            'Date joined': 'Date joined',
-            'Days since first joined': 'Days since first joined',
-            'Days since last class': 'Days since last class',
-            'Days since last appointment': 'Days since last appointment',
-            'Days since outlet access': 'Days since outlet access',
-            'Days since package purchase': 'Days since package purchase',
-            'Days since membership purchase': 'Days since membership purchase',
-            'Days since drop in purchase': 'Days since drop in purchase',
-            'Days since course purchase': 'Days since course purchase',
-            'Days since member': 'Days since member',
-            'Days since non member': 'Days since non member',
-            'Days since lost member': 'Days since lost member',
-            'Total class completed': 'Total class completed',
-            'Total appointment completed': 'Total appointment completed',
-            'Total outlet access completed': 'Total outlet access completed',
-            'Total courses completed': 'Total courses completed',
-            'Total spending amount': 'Total spending amount',
-            'profile_totalSpendedAmount': 'Profile Total Spent',
-            'profile_totalBooking': 'Profile Total Bookings',
-            'profile_totalAttendedClass': 'Profile Total Attended'
-        }
-
-        df_final = df_final.rename(columns=column_mapping)
+        df_final = df_final.rename(columns=COLUMN_MAPPING)
 
         # Save the cleaned report
-        df_final.to_csv(output_path, index=False)
-        print(f"Cleaned profile report saved to {output_path}")
+        if output_path:
+            write_report(df_final, output_path, formats=())
+            print(f"Cleaned profile report saved to {output_path}")
 
         # Display column info
         print(f"\nFinal columns ({len(df_final.columns)}):")
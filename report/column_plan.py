@@ -0,0 +1,35 @@
+from schema import ACTIVITIES_DTYPES, CUSTOMER_REPORT_DTYPES, PROFILES_DTYPES
+
+# Columns each raw export can provide, for planning which of them a report reads
+EXPORT_COLUMNS = {
+    'customers': list(CUSTOMER_REPORT_DTYPES),
+    'activities': list(ACTIVITIES_DTYPES),
+    'profiles': list(PROFILES_DTYPES),
+}
+
+
+def required_columns(output_columns, derived=None):
+    # Input columns a step needs to produce output_columns. `derived` maps computed or
+    # renamed outputs to the inputs they come from; every other output is copied as is.
+    # Steps chain: the result of one step is the output_columns of the step before it.
+    derived = derived or {}
+    required = []
+    for column in output_columns:
+        for source in derived.get(column, [column]):
+            if source not in required:
+                required.append(source)
+    return required
+
+
+def plan_usecols(output_columns, sources, derived=None, keys=None):
+    # Minimal columns to parse from each source export: those the outputs are built
+    # from plus the source's matching keys, in export order. Column names mean the
+    # same thing across exports (see schema.COLUMN_DTYPES), so a required column is
+    # read from every source that has it - unless it is qualified as 'source:column'.
+    required = set(required_columns(output_columns, derived))
+    keys = keys or {}
+    return {
+        name: [col for col in EXPORT_COLUMNS[name]
+               if col in required or f'{name}:{col}' in required or col in keys.get(name, ())]
+        for name in sources
+    }
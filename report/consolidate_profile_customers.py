@@ -2,109 +2,191 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-def create_profile_consolidated_report():
-    # File paths
-    profiles_path = 'customer_profiles.csv'
-    customer_report_path = 'customer_report_20240101.csv'
-    activities_report_path = 'customers_activities_20231231to20241231.csv'
-    output_path = 'consolidated_customer_profiles_report.csv'
+from activity_stream import read_latest_activities
+from contact_normalization import normalize_emails, normalize_phones
+from identity_index import DEFAULT_INDEX_PATH, load_identity_index
+from instrumentation import instrumented, stage
+from column_plan import plan_usecols
+from report_writer import write_report
+from schema import COLUMN_DTYPES, load_export
+
+# Profile fields joined onto each customer: output column and the value used when
+# the customer has no profile
+PROFILE_FIELDS = {
+    'customerId': ('customerId', ''),
+    'name': ('profile_name', ''),
+    'joinedOn': ('profile_joinedOn', ''),
+    'isEmailVerified': ('isEmailVerified', ''),
+    'totalSpendedAmount': ('profile_totalSpendedAmount', 0),
+    'totalBooking': ('profile_totalBooking', 0),
+    'totalAttendedClass': ('profile_totalAttendedClass', 0),
+}
+
+# Output schema of the profile consolidated report
+OUTPUT_COLUMNS = [
+    'customerId', 'CustomerName', 'profile_name',
+    'MobileCode', 'Mobile', 'telephone',
+    'Email', 'isEmailVerified',
+    'DateOfBirth', 'Gender',
+    'AddressLine1', 'AddressLine2', 'City', 'State', 'PostalCode', 'Country',
+    'Group', 'Tag', 'Membership',
+    'JoinedDate', 'profile_joinedOn', 'Channel',
+    'Status', 'suspendReason',
+    'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
+    'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking',
+    'profile_totalBooking', 'profile_totalAttendedClass',
+    'Date joined', 'Days since first joined', 'Days since last class',
+    'Days since last appointment', 'Days since outlet access',
+    'Days since package purchase', 'Days since membership purchase',
+    'Days since drop in purchase', 'Days since course purchase',
+    'Days since member', 'Days since non member', 'Days since lost member',
+    'Total class completed', 'Total appointment completed',
+    'Total outlet access completed', 'Total courses completed',
+    'profile_totalSpendedAmount', 'Total spending amount',
+    'parentUserId', 'isChild'
+]
+
+# Renamed profile fields, the customer report's Mobile (the activities' one would only
+# come back as Mobile_act and be dropped), and the email columns every export is matched on
+OUTPUT_SOURCES = {
+    **{column: [field] for field, (column, _) in PROFILE_FIELDS.items() if column != field},
+    'Mobile': ['customers:Mobile'],
+}
+MATCH_KEYS = {'profiles': ['email'], 'customers': ['Email'], 'activities': ['Email']}
+
+EXPORTS = ['profiles', 'customers', 'activities']
+USECOLS = plan_usecols(OUTPUT_COLUMNS, EXPORTS, derived=OUTPUT_SOURCES, keys=MATCH_KEYS)
+
+def prepare_customers(df_customers):
+    # Clean email and mobile in customers for matching
+    df_customers['Email_clean'] = normalize_emails(df_customers['Email'])
+    if 'Mobile' in df_customers.columns:
+        df_customers['Mobile_clean'] = normalize_phones(df_customers['Mobile'], country_codes=df_customers.get('MobileCode'))
+    return df_customers
+
+def prepare_activities(df_activities):
+    # Clean email and mobile in activities for matching
+    df_activities['Email_clean'] = normalize_emails(df_activities['Email'])
+    if 'Mobile' in df_activities.columns:
+        df_activities['Mobile_clean'] = normalize_phones(df_activities['Mobile'])
+    return df_activities
+
+@instrumented('consolidate_profile_customers')
+def create_profile_consolidated_report(chunksize=None,
+                                       profiles_path='customer_profiles.csv',
+                                       customer_report_path='customer_report_20240101.csv',
+                                       activities_report_path='customers_activities_20231231to20241231.csv',
+                                       output_path='consolidated_customer_profiles_report.csv',
+                                       usecols=None,
+                                       index_path=DEFAULT_INDEX_PATH):
+    # usecols maps 'profiles'/'customers'/'activities' to the only columns to parse
+    # (default: those OUTPUT_COLUMNS needs), output_path=None keeps the result in
+    # memory without writing it
+    usecols = usecols or USECOLS
 
     try:
-        # Read all files
-        df_profiles = pd.read_csv(profiles_path)
-        df_customers = pd.read_csv(customer_report_path)
-        df_activities = pd.read_csv(activities_report_path)
+        # Read profiles and customer report
+        with stage('read_profiles') as metrics:
+            df_profiles = load_export(profiles_path, usecols=usecols.get('profiles'))
+            metrics['rows_out'] = len(df_profiles)
+        with stage('read_customers') as metrics:
+            df_customers = load_export(customer_report_path, prepare=prepare_customers,
+                                           usecols=usecols.get('customers'))
+            metrics['rows_out'] = len(df_customers)
 
         print(f"Loaded {len(df_profiles)} customer profiles")
         print(f"Loaded {len(df_customers)} customer report records")
-        print(f"Loaded {len(df_activities)} activity records")
 
-        # Extract emails from profiles for matching
-        profile_emails = set(df_profiles['email'].str.lower().str.strip())
+        # Register profile customers in the identity index - they are the target customers
+        with stage('identity', rows_in=len(df_profiles)) as metrics:
+            identity_index = load_identity_index(index_path)
+            df_profiles['Email_clean'] = normalize_emails(df_profiles['email'])
+            df_profiles['customer_id'] = identity_index.register(df_profiles, email='Email_clean')
+            identity_index.save(index_path)
+            metrics.update(rows_out=len(df_profiles), index_size=len(identity_index))
+        profile_ids = set(df_profiles['customer_id'].dropna())
+        profile_emails = set(df_profiles['Email_clean'].dropna())
         print(f"Target customers: {profile_emails}")
 
-        # Clean data for matching
-        df_customers['Email_clean'] = df_customers['Email'].str.lower().str.strip()
-        df_activities['Email_clean'] = df_activities['Email'].str.lower().str.strip()
-
-        # Clean mobile numbers
-        df_customers['Mobile_clean'] = df_customers['Mobile'].astype(str).str.replace(r'[^\d]', '', regex=True)
-        df_activities['Mobile_clean'] = df_activities['Mobile'].str.replace(r'[^\d]', '', regex=True)
-
-        # Drop duplicates in activities
-        df_activities_unique = df_activities.drop_duplicates(subset=['Email_clean'], keep='first')
+        if chunksize:
+            # Streaming mode - only profile customers' first activity record is kept from each chunk
+            with stage('read_activities') as metrics:
+                df_activities_unique, activity_count = read_latest_activities(
+                    activities_report_path, 'Email_clean', prepare_activities,
+                    chunksize=chunksize, dtype=COLUMN_DTYPES,
+                    usecols=usecols.get('activities'),
+                    keep_rows=lambda chunk: chunk['Email_clean'].isin(profile_emails))
+                metrics.update(rows_in=activity_count, rows_out=len(df_activities_unique), chunksize=chunksize)
+            print(f"Streamed {activity_count} activity records in chunks of {chunksize}")
+        else:
+            with stage('read_activities') as metrics:
+                df_activities = load_export(activities_report_path, prepare=prepare_activities,
+                                                usecols=usecols.get('activities'))
+                metrics['rows_out'] = len(df_activities)
+            print(f"Loaded {len(df_activities)} activity records")
+
+            # Drop duplicates in activities
+            with stage('dedupe', rows_in=len(df_activities)) as metrics:
+                df_activities_unique = df_activities.drop_duplicates(subset=['Email_clean'], keep='first')
+                metrics['rows_out'] = len(df_activities_unique)
 
         # Filter customer report to only include profiles customers
-        df_customers_filtered = df_customers[df_customers['Email_clean'].isin(profile_emails)]
-        print(f"Found {len(df_customers_filtered)} matching customers in report")
-
-        # Filter activities to only include profiles customers
-        df_activities_filtered = df_activities_unique[df_activities_unique['Email_clean'].isin(profile_emails)]
-        print(f"Found {len(df_activities_filtered)} matching activity records")
-
-        # Merge datasets based on email
-        df_merged = pd.merge(
-            df_customers_filtered,
-            df_activities_filtered,
-            left_on='Email_clean',
-            right_on='Email_clean',
-            how='left',
-            suffixes=('', '_act')
-        )
+        with stage('merge', rows_in=len(df_customers)) as metrics:
+            customer_matches = identity_index.lookup(df_customers, email='Email_clean', within=profile_ids)
+            df_customers_filtered = df_customers.assign(customer_id=customer_matches['customer_id'])
+            df_customers_filtered = df_customers_filtered[df_customers_filtered['customer_id'].notna()]
+            print(f"Found {len(df_customers_filtered)} matching customers in report")
+
+            # Filter activities to only include profiles customers
+            activity_matches = identity_index.lookup(df_activities_unique, email='Email_clean', within=profile_ids)
+            df_activities_filtered = df_activities_unique.assign(customer_id=activity_matches['customer_id'])
+            df_activities_filtered = df_activities_filtered[df_activities_filtered['customer_id'].notna()]
+            df_activities_filtered = df_activities_filtered.drop_duplicates(subset=['customer_id'], keep='first')
+            print(f"Found {len(df_activities_filtered)} matching activity records")
+
+            # Merge datasets on the resolved customer ID
+            df_merged = pd.merge(
+                df_customers_filtered,
+                df_activities_filtered,
+                on='customer_id',
+                how='left',
+                suffixes=('', '_act')
+            )
+            metrics.update(rows_out=len(df_merged), matched_customers=len(df_customers_filtered),
+                           matched_activities=len(df_activities_filtered))
 
         print(f"After merge: {len(df_merged)} records")
 
-        # Add profile data
-        # Create a lookup dictionary from profiles
-        profile_lookup = df_profiles.set_index('email')[[
-            'customerId', 'name', 'joinedOn', 'isEmailVerified',
-            'totalSpendedAmount', 'totalBooking', 'totalAttendedClass'
-        ]].to_dict('index')
-
-        # Add profile columns
-        df_merged['customerId'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('customerId', ''))
-        df_merged['profile_name'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('name', ''))
-        df_merged['profile_joinedOn'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('joinedOn', ''))
-        df_merged['isEmailVerified'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('isEmailVerified', ''))
-        df_merged['profile_totalSpendedAmount'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('totalSpendedAmount', 0))
-        df_merged['profile_totalBooking'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('totalBooking', 0))
-        df_merged['profile_totalAttendedClass'] = df_merged['Email_clean'].map(lambda x: profile_lookup.get(x, {}).get('totalAttendedClass', 0))
+        # Add profile data with one join on the customer ID
+        with stage('profile_join', rows_in=len(df_merged)) as metrics:
+            available_fields = [col for col in PROFILE_FIELDS if col in df_profiles.columns]
+            df_profile_columns = (df_profiles.drop_duplicates(subset=['customer_id'], keep='first')
+                                  .set_index('customer_id')[available_fields]
+                                  .rename(columns={col: PROFILE_FIELDS[col][0] for col in available_fields}))
+            df_merged = df_merged.join(df_profile_columns, on='customer_id', rsuffix='_profile')
+
+            # Profile fields that were not loaded get the same defaults as a missing profile
+            for field, (column, default) in PROFILE_FIELDS.items():
+                if field not in available_fields:
+                    df_merged[column] = default
+            metrics['rows_out'] = len(df_merged)
 
         # Select and reorder columns for final output
-        columns = [
-            'customerId', 'CustomerName', 'profile_name',
-            'MobileCode', 'Mobile', 'telephone',
-            'Email', 'isEmailVerified',
-            'DateOfBirth', 'Gender',
-            'AddressLine1', 'AddressLine2', 'City', 'State', 'PostalCode', 'Country',
-            'Group', 'Tag', 'Membership',
-            'JoinedDate', 'profile_joinedOn', 'Channel',
-            'Status', 'suspendReason',
-            'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
-            'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking',
-            'profile_totalBooking', 'profile_totalAttendedClass',
-            'Date joined', 'Days since first joined', 'Days since last class',
-            'Days since last appointment', 'Days since outlet access',
-            'Days since package purchase', 'Days since membership purchase',
-            'Days since drop in purchase', 'Days since course purchase',
-            'Days since member', 'Days since non member', 'Days since lost member',
-            'Total class completed', 'Total appointment completed',
-            'Total outlet access completed', 'Total courses completed',
-            'profile_totalSpendedAmount', 'Total spending amount',
-            'parentUserId', 'isChild'
-        ]
-
-        # Select only existing columns
-        existing_columns = [col for col in columns if col in df_merged.columns]
-        df_output = df_merged[existing_columns].copy()
-
-        # Clean up temporary columns
-        temp_cols = [col for col in df_output.columns if '_clean' in col or col.endswith('_act')]
-        df_output = df_output.drop(columns=temp_cols, errors='ignore')
+        with stage('project', rows_in=len(df_merged)) as metrics:
+            # Select only existing columns
+            existing_columns = [col for col in OUTPUT_COLUMNS if col in df_merged.columns]
+            df_output = df_merged[existing_columns].copy()
+
+            # Clean up temporary columns
+            temp_cols = [col for col in df_output.columns if '_clean' in col or col.endswith('_act')]
+            df_output = df_output.drop(columns=temp_cols, errors='ignore')
+            metrics['rows_out'] = len(df_output)
 
         # Save consolidated report
-        df_output.to_csv(output_path, index=False)
-        print(f"Profile consolidated report saved to {output_path}")
+        with stage('write', rows_in=len(df_output)):
+            if output_path:
+                write_report(df_output, output_path, formats=())
+                print(f"Profile consolidated report saved to {output_path}")
 
         # Print summary statistics
         print("\n=== PROFILE CONSOLIDATION SUMMARY ===")
@@ -127,4 +209,7 @@ def create_profile_consolidated_report():
         return None
 
 if __name__ == "__main__":
-    create_profile_consolidated_report()
\ No newline at end of file
+    import sys
+
+    # Pass a chunk size (e.g. 50000) to stream large multi-year activity exports
+    create_profile_consolidated_report(chunksize=int(sys.argv[1]) if len(sys.argv) > 1 else None)
\ No newline at end of file
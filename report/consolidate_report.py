@@ -2,121 +2,156 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-def consolidate_customer_reports():
-    # Read the customer report CSV
-    customer_report_path = 'customer_report_20240101.csv'
-    activities_report_path = 'customers_activities_20231231to20241231.csv'
-    output_path = 'consolidated_customer_report_20240101.csv'
-
+from activity_stream import read_latest_activities
+from contact_normalization import normalize_emails, normalize_phones
+from identity_index import DEFAULT_INDEX_PATH, load_identity_index
+from instrumentation import instrumented, stage
+from column_plan import plan_usecols
+from report_writer import DEFAULT_FORMATS, write_report
+from schema import COLUMN_DTYPES, load_export
+
+# Output schema of the consolidated report
+CUSTOMER_COLUMNS = [
+    'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth', 'Gender',
+    'AddressLine1', 'AddressLine2', 'City', 'State', 'PostalCode', 'Country',
+    'Group', 'Tag', 'Membership', 'JoinedDate', 'Channel', 'Status',
+    'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
+    'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking'
+]
+
+ACTIVITY_COLUMNS = [
+    'Date joined', 'Days since first joined', 'Days since last class',
+    'Days since last appointment', 'Days since outlet access',
+    'Days since package purchase', 'Days since membership purchase',
+    'Days since drop in purchase', 'Days since course purchase',
+    'Days since member', 'Days since non member', 'Days since lost member',
+    'Total class completed', 'Total appointment completed',
+    'Total outlet access completed', 'Total courses completed',
+    'Total spending amount'
+]
+
+OUTPUT_COLUMNS = CUSTOMER_COLUMNS + ACTIVITY_COLUMNS
+
+# Only these columns are parsed from each export - the outputs plus the prepare_* inputs
+USECOLS = plan_usecols(OUTPUT_COLUMNS, ['customers', 'activities'],
+                       keys={'customers': ['Email', 'Mobile', 'MobileCode'],
+                             'activities': ['Customer', 'Email', 'Mobile']})
+
+def prepare_customers(df_customers):
+    # Clean email and mobile in customers to match format in activities
+    df_customers['Email_clean'] = normalize_emails(df_customers['Email'])
+    df_customers['Mobile_clean'] = normalize_phones(df_customers['Mobile'], country_codes=df_customers['MobileCode'])
+    return df_customers
+
+def prepare_activities(df_activities):
+    # Clean email, mobile and name in activities to match format in customers
+    df_activities['Email_clean'] = normalize_emails(df_activities['Email'])
+    df_activities['Mobile_clean'] = normalize_phones(df_activities['Mobile'])
+    df_activities['Name_clean'] = df_activities['Customer'].str.strip().str.lower()
+    return df_activities
+
+@instrumented('consolidate_report')
+def consolidate_customer_reports(customer_report_path='customer_report_20240101.csv',
+                                  activities_report_path='customers_activities_20231231to20241231.csv',
+                                  output_path='consolidated_customer_report_20240101.csv',
+                                  chunksize=None,
+                                  index_path=DEFAULT_INDEX_PATH,
+                                  output_formats=DEFAULT_FORMATS):
     try:
-        # Read customer report
-        df_customers = pd.read_csv(customer_report_path)
+        # Read customer report (parsed and normalized once per export content)
+        with stage('read_customers') as metrics:
+            df_customers = load_export(customer_report_path, prepare=prepare_customers,
+                                       usecols=USECOLS['customers'])
+            metrics['rows_out'] = len(df_customers)
         print(f"Loaded {len(df_customers)} customer records")
 
-        # Read activities report
-        df_activities = pd.read_csv(activities_report_path)
-        print(f"Loaded {len(df_activities)} activity records")
-
-        # Clean email and mobile in activities to match format in customers
-        df_activities['Email_clean'] = df_activities['Email'].str.lower().str.strip()
-        df_customers['Email_clean'] = df_customers['Email'].str.lower().str.strip()
-
-        # Clean mobile numbers in activities to match format in customers
-        df_activities['Mobile_clean'] = df_activities['Mobile'].str.replace(r'[^\d]', '', regex=True)
-        df_customers['Mobile_clean'] = df_customers['Mobile'].astype(str).str.replace(r'[^\d]', '', regex=True)
-
-        # Drop duplicates in activities data - keep only the most recent record for each customer
-        df_activities_unique = df_activities.drop_duplicates(subset=['Email_clean'], keep='first')
-
-        # Merge datasets based on email first
-        df_merged = pd.merge(df_customers, df_activities_unique,
-                           left_on='Email_clean',
-                           right_on='Email_clean',
-                           how='left',
-                           suffixes=('', '_act'))
-
-        print(f"After email merge: {len(df_merged)} records")
-
-        # For records that didn't match on email, try matching on mobile
-        email_unmatched = df_merged[df_merged['Date joined'].isna()].copy()
-        email_matched = df_merged[df_merged['Date joined'].notna()].copy()
-
-        if len(email_unmatched) > 0:
-            print(f"Trying mobile match for {len(email_unmatched)} unmatched records")
-
-            # For mobile matching, find the best match for each unmatched customer
-            activity_cols = [
-                'Date joined', 'Days since first joined', 'Days since last class',
-                'Days since last appointment', 'Days since outlet access',
-                'Days since package purchase', 'Days since membership purchase',
-                'Days since drop in purchase', 'Days since course purchase',
-                'Days since member', 'Days since non member', 'Days since lost member',
-                'Total class completed', 'Total appointment completed',
-                'Total outlet access completed', 'Total courses completed',
-                'Total spending amount'
-            ]
-
-            # Match unmatched records on mobile
-            for idx, row in email_unmatched.iterrows():
-                mobile_clean = str(row['Mobile_clean'])
-                matching_activities = df_activities_unique[df_activities_unique['Mobile_clean'] == mobile_clean]
-
-                if len(matching_activities) > 0:
-                    # Take the first match (could be improved with better matching logic)
-                    match_data = matching_activities.iloc[0]
-                    for col in activity_cols:
-                        if col in match_data.index:
-                            email_unmatched.at[idx, col] = match_data[col]
-
-        # Combine matched and mobile-matched records
-        df_final = pd.concat([email_matched, email_unmatched], ignore_index=True)
+        if chunksize:
+            # Streaming mode - reduce the activities export chunk by chunk to one record per customer
+            with stage('read_activities') as metrics:
+                df_activities_unique, activity_count = read_latest_activities(
+                    activities_report_path, 'Email_clean', prepare_activities,
+                    chunksize=chunksize, dtype=COLUMN_DTYPES, usecols=USECOLS['activities'])
+                metrics.update(rows_in=activity_count, rows_out=len(df_activities_unique), chunksize=chunksize)
+            print(f"Streamed {activity_count} activity records in chunks of {chunksize}")
+        else:
+            # Read activities report
+            with stage('read_activities') as metrics:
+                df_activities = load_export(activities_report_path, prepare=prepare_activities,
+                                            usecols=USECOLS['activities'])
+                activity_count = len(df_activities)
+                metrics['rows_out'] = activity_count
+            print(f"Loaded {activity_count} activity records")
+
+            # Drop duplicates in activities data - keep only the most recent record for each customer
+            with stage('dedupe', rows_in=activity_count) as metrics:
+                df_activities_unique = df_activities.drop_duplicates(subset=['Email_clean'], keep='first')
+                metrics['rows_out'] = len(df_activities_unique)
+
+        # Resolve activity records to stable customer IDs (new customers are added to the index)
+        with stage('identity', rows_in=len(df_activities_unique)) as metrics:
+            identity_index = load_identity_index(index_path)
+            df_activities_unique = df_activities_unique.copy()
+            df_activities_unique['customer_id'] = identity_index.register(
+                df_activities_unique, email='Email_clean', mobile='Mobile_clean', name='Name_clean')
+            df_activities_unique = df_activities_unique.drop_duplicates(subset=['customer_id'], keep='first')
+            identity_index.save(index_path)
+            metrics.update(rows_out=len(df_activities_unique), index_size=len(identity_index))
+
+        # Match customers on email first, then mobile, against the customers in this export
+        with stage('merge', rows_in=len(df_customers)) as metrics:
+            matches = identity_index.lookup(df_customers, email='Email_clean', mobile='Mobile_clean',
+                                            within=df_activities_unique['customer_id'])
+            df_customers = df_customers.assign(customer_id=matches['customer_id'],
+                                               matched_on=matches['matched_on'])
+
+            # Merge datasets on the resolved customer ID
+            df_merged = pd.merge(df_customers, df_activities_unique,
+                               on='customer_id',
+                               how='left',
+                               suffixes=('', '_act'))
+            metrics['rows_out'] = len(df_merged)
+
+        print(f"After identity merge: {len(df_merged)} records")
+
+        # Keep email-matched records first, as before
+        with stage('mobile_fallback', rows_in=len(df_merged)) as metrics:
+            matched_on_email = df_merged['matched_on'].eq('email').fillna(False).astype(bool)
+            email_matched = df_merged[matched_on_email]
+            email_unmatched = df_merged[~matched_on_email]
+
+            # Combine matched and mobile-matched records
+            df_final = pd.concat([email_matched, email_unmatched], ignore_index=True)
+            email_matches = len(email_matched)
+            mobile_matches = int(df_final['matched_on'].eq('mobile').sum())
+            unmatched = int(df_final['matched_on'].isna().sum())
+            metrics.update(rows_out=len(df_final), email_matches=email_matches,
+                           mobile_matches=mobile_matches, unmatched=unmatched,
+                           match_rate=round(1 - unmatched / len(df_final), 4) if len(df_final) else None)
         print(f"Final consolidated dataset: {len(df_final)} records")
 
         # Select and reorder columns for final output
-        customer_columns = [
-            'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth', 'Gender',
-            'AddressLine1', 'AddressLine2', 'City', 'State', 'PostalCode', 'Country',
-            'Group', 'Tag', 'Membership', 'JoinedDate', 'Channel', 'Status',
-            'Completed', 'Booked', 'No Show', 'Cancelled', 'Late Cancelled',
-            'Waitlist Cancelled', 'Waitlist Expired', 'Total Booking'
-        ]
-
-        activity_columns = [
-            'Date joined', 'Days since first joined', 'Days since last class',
-            'Days since last appointment', 'Days since outlet access',
-            'Days since package purchase', 'Days since membership purchase',
-            'Days since drop in purchase', 'Days since course purchase',
-            'Days since member', 'Days since non member', 'Days since lost member',
-            'Total class completed', 'Total appointment completed',
-            'Total outlet access completed', 'Total courses completed',
-            'Total spending amount'
-        ]
-
-        final_columns = customer_columns + activity_columns
-
-        # Select only existing columns
-        existing_columns = [col for col in final_columns if col in df_final.columns]
-        df_output = df_final[existing_columns].copy()
-
-        # Clean up temporary columns
-        temp_cols = [col for col in df_output.columns if '_clean' in col or col.endswith('_act')]
-        df_output = df_output.drop(columns=temp_cols, errors='ignore')
+        with stage('project', rows_in=len(df_final)) as metrics:
+            # Select only existing columns
+            existing_columns = [col for col in OUTPUT_COLUMNS if col in df_final.columns]
+            df_output = df_final[existing_columns].copy()
+
+            # Clean up temporary columns
+            temp_cols = [col for col in df_output.columns if '_clean' in col or col.endswith('_act')]
+            df_output = df_output.drop(columns=temp_cols, errors='ignore')
+            metrics.update(rows_out=len(df_output), columns=len(df_output.columns))
 
         # Save consolidated report
-        df_output.to_csv(output_path, index=False)
-        print(f"Consolidated report saved to {output_path}")
+        with stage('write', rows_in=len(df_output)):
+            written = write_report(df_output, output_path, formats=output_formats)
+        print(f"Consolidated report saved to {', '.join(written)}")
 
         # Print summary statistics
         print("\n=== CONSOLIDATION SUMMARY ===")
         print(f"Total customers in customer report: {len(df_customers)}")
-        print(f"Total records in activities report: {len(df_activities)}")
+        print(f"Total records in activities report: {activity_count}")
         print(f"Total consolidated records: {len(df_output)}")
 
         # Check matches
-        email_matches = len(email_matched)
-        mobile_matches = len(df_final[df_final['Date joined'].notna()]) - email_matches
-        unmatched = len(df_final[df_final['Date joined'].isna()])
-
         print(f"Email matches: {email_matches}")
         print(f"Mobile matches: {mobile_matches}")
         print(f"Unmatched: {unmatched}")
@@ -135,4 +170,7 @@ def consolidate_customer_reports():
         return None
 
 if __name__ == "__main__":
-    consolidate_customer_reports()
\ No newline at end of file
+    import sys
+
+    # Pass a chunk size (e.g. 50000) to stream large multi-year activity exports
+    consolidate_customer_reports(chunksize=int(sys.argv[1]) if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -2,18 +2,142 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-def create_consolidated_report():
-    # Read both CSV files
-    df1 = pd.read_csv('/Users/yoga.wigardo/Workspaces/bangCRM/report/customer_report_20250826.csv')
-    df2 = pd.read_csv('/Users/yoga.wigardo/Workspaces/bangCRM/report/customers_activities_20250825to20251124.csv')
-
-    # Clean up customer names for matching
+from activity_stream import read_activities
+from contact_normalization import normalize_emails, normalize_phones
+from identity_index import DEFAULT_INDEX_PATH, load_identity_index
+from instrumentation import instrumented, stage
+from record_linkage import DEFAULT_THRESHOLD, link_records
+from column_plan import plan_usecols
+from report_writer import DEFAULT_FORMATS, write_report
+from schema import COLUMN_DTYPES, load_export
+
+# Output schema of the consolidated report, with the export columns each one is built from
+OUTPUT_SOURCES = {
+    'Name': ['CustomerName', 'Customer'],
+    'Number of Completed Classes': ['Completed'],
+    'Number of Late Cancel': ['Late Cancelled'],
+    'Total': ['Total Booking'],
+    'Revenue': ['Total spending amount'],
+    'Average Revenue': ['Total spending amount', 'Completed'],
+    'Number of Credits Left': [],
+    'Count of "1 Free Class Pass"': [],
+    'Days from Last Completed Class': ['Days since last class'],
+    'Days from Last Package Purchase': ['Days since package purchase'],
+    'Days from Last Drop In Purchase': ['Days since drop in purchase'],
+    'Date Joined': ['JoinedDate', 'Date joined'],
+    'Email': ['Email'],
+    'Phone Number': ['MobileCode', 'Mobile'],
+    'Birthday': ['DateOfBirth'],
+}
+
+# Only these columns are parsed from each export - the outputs' sources plus the
+# name/contact columns matching and linkage use
+USECOLS = plan_usecols(list(OUTPUT_SOURCES), ['customers', 'activities'], derived=OUTPUT_SOURCES,
+                       keys={'customers': ['CustomerName', 'Email', 'Mobile', 'MobileCode'],
+                             'activities': ['Customer', 'Email', 'Mobile']})
+
+def prepare_customers(df1):
+    # Clean up customer names for matching, plus the contact keys the fuzzy stage blocks on
     df1['CustomerName_clean'] = df1['CustomerName'].str.strip().str.lower()
+    df1['Email_clean'] = normalize_emails(df1['Email'])
+    df1['Mobile_clean'] = normalize_phones(df1['Mobile'], country_codes=df1['MobileCode'])
+    return df1
+
+def prepare_activities(df2):
+    # Clean up customer names for matching, plus the contact keys the fuzzy stage blocks on
     df2['Customer_clean'] = df2['Customer'].str.strip().str.lower()
+    df2['Email_clean'] = normalize_emails(df2['Email'])
+    df2['Mobile_clean'] = normalize_phones(df2['Mobile'])
+    return df2
+
+def link_unmatched_names(df1, df2, identity_index, threshold=DEFAULT_THRESHOLD):
+    # Fuzzy stage for report customers whose cleaned name has no exact match in the
+    # activities ("Jeje ." vs "jeje"): candidates come from shared phone suffix, email
+    # block or name initials. Links only apply to this run - they are never written to
+    # the identity index, so a wrong link goes away with a stricter threshold.
+    exact = identity_index.lookup(df1, name='CustomerName_clean', within=df2['customer_id'])['customer_id']
+    left = df1[exact.isna()]
+    right = df2[~df2['customer_id'].isin(exact.dropna())]
+    contacts = {'Email_clean': 'email', 'Mobile_clean': 'phone'}
+    links, stats = link_records(left[['CustomerName', *contacts]].rename(columns={'CustomerName': 'name', **contacts}),
+                                right[['Customer', *contacts]].rename(columns={'Customer': 'name', **contacts}),
+                                threshold=threshold)
+
+    links['customer_id'] = right.loc[links['right'], 'customer_id'].to_numpy()
+    links['CustomerName'] = left.loc[links['left'], 'CustomerName'].to_numpy()
+    links['Customer'] = right.loc[links['right'], 'Customer'].to_numpy()
+    return links, stats
+
+def load_consolidation_inputs(customer_report_path, activities_report_path, chunksize=None,
+                              index_path=DEFAULT_INDEX_PATH, name_threshold=DEFAULT_THRESHOLD,
+                              links_path=None):
+    # name_threshold=None matches names exactly (after strip/lower) only; links_path
+    # saves the fuzzy name links with their confidence for review. chunksize streams
+    # the activities export, but every activity row is kept (the report has one row
+    # per activity record), so memory still grows with the number of activity rows -
+    # streaming only avoids the whole-file parse overhead.
+    # Read both CSV files
+    with stage('read_customers') as metrics:
+        df1 = load_export(customer_report_path, prepare=prepare_customers, usecols=USECOLS['customers'])
+        metrics['rows_out'] = len(df1)
+
+    with stage('read_activities') as metrics:
+        if chunksize:
+            # Streaming mode - every activity record, prepared one chunk at a time
+            df2, activity_count = read_activities(activities_report_path, prepare_activities, chunksize=chunksize,
+                                                  dtype=COLUMN_DTYPES, usecols=USECOLS['activities'])
+            metrics.update(rows_in=activity_count, chunksize=chunksize)
+        else:
+            df2 = load_export(activities_report_path, prepare=prepare_activities, usecols=USECOLS['activities'])
+        metrics['rows_out'] = len(df2)
+
+    # Resolve customer names to stable customer IDs through the shared identity index
+    with stage('identity', rows_in=len(df1) + len(df2)) as metrics:
+        identity_index = load_identity_index(index_path)
+        df2['customer_id'] = identity_index.register(df2, name='Customer_clean')
+        metrics.update(rows_out=len(df1) + len(df2), index_size=len(identity_index))
+
+    if name_threshold is not None:
+        with stage('linkage', rows_in=len(df1)) as metrics:
+            links, link_stats = link_unmatched_names(df1, df2, identity_index, threshold=name_threshold)
+            metrics.update(rows_out=len(links), **link_stats)
+        print(f"Linked {len(links)} customer name variants "
+              f"(mean confidence {link_stats['mean_confidence'] or 0:.2f})")
+        if links_path:
+            links[['CustomerName', 'Customer', 'confidence', 'blocks', 'customer_id']].to_csv(links_path, index=False)
+    else:
+        links = None
+
+    with stage('register', rows_in=len(df1)) as metrics:
+        df1['customer_id'] = identity_index.register(df1, name='CustomerName_clean')
+        if links is not None and len(links):
+            # Linked rows take their activity customer's ID for this run only
+            df1.loc[links['left'], 'customer_id'] = links['customer_id'].to_numpy()
+        identity_index.save(index_path)
+        metrics.update(rows_out=len(df1), index_size=len(identity_index))
+
+    return df1, df2
+
+def build_consolidated_rows(df1, df2):
+    # Build consolidated rows for the given customers. Rows depend only on their own
+    # customer ID, so any subset of customers can be rebuilt on its own.
+
+    # Merge the dataframes on customer ID, keeping the report ordered by name
+    with stage('merge', rows_in=len(df1) + len(df2)) as metrics:
+        merged_df = pd.merge(df1, df2, on='customer_id', how='outer')
+        name_key = merged_df['CustomerName_clean'].fillna(merged_df['Customer_clean'])
+        merged_df = merged_df.loc[name_key.sort_values(kind='stable').index].reset_index(drop=True)
+        name_key = name_key.sort_values(kind='stable').reset_index(drop=True)
+        metrics.update(rows_out=len(merged_df),
+                       matched=int((merged_df['CustomerName'].notna() & merged_df['Customer'].notna()).sum()))
+
+    with stage('project', rows_in=len(merged_df)) as metrics:
+        consolidated = project_consolidated_columns(merged_df, name_key)
+        metrics['rows_out'] = len(consolidated)
 
-    # Merge the dataframes on customer name
-    merged_df = pd.merge(df1, df2, left_on='CustomerName_clean', right_on='Customer_clean', how='outer')
+    return consolidated
 
+def project_consolidated_columns(merged_df, name_key):
     # Create the consolidated report with required columns
     consolidated = pd.DataFrame()
 
@@ -47,13 +171,13 @@ def create_consolidated_report():
     consolidated['Count of "1 Free Class Pass"'] = 'N/A'
 
     # Days from Last Completed Class - from df2."Days since last class"
-    consolidated['Days from Last Completed Class'] = merged_df['Days since last class'].fillna('N/A')
+    consolidated['Days from Last Completed Class'] = merged_df['Days since last class'].astype(object).fillna('N/A')
 
     # Days from Last Package Purchase - from df2."Days since package purchase"
-    consolidated['Days from Last Package Purchase'] = merged_df['Days since package purchase'].fillna('N/A')
+    consolidated['Days from Last Package Purchase'] = merged_df['Days since package purchase'].astype(object).fillna('N/A')
 
     # Days from Last Drop In Purchase - from df2."Days since drop in purchase"
-    consolidated['Days from Last Drop In Purchase'] = merged_df['Days since drop in purchase'].fillna('N/A')
+    consolidated['Days from Last Drop In Purchase'] = merged_df['Days since drop in purchase'].astype(object).fillna('N/A')
 
     # Date Joined - use JoinedDate from df1, fallback to Date joined from df2
     consolidated['Date Joined'] = np.where(merged_df['JoinedDate'].notna(),
@@ -65,28 +189,37 @@ def create_consolidated_report():
                                     merged_df['Email_x'],
                                     merged_df['Email_y'])
 
-    # Phone Number - use MobileCode + Mobile from df1, fallback to Mobile from df2
-    df1['phone_full'] = np.where(df1['MobileCode'].notna() & df1['Mobile'].notna(),
-                                '+' + df1['MobileCode'].astype(str) + ' ' + df1['Mobile'].astype(str),
-                                np.nan)
-
-    # Create temporary phone columns from the merged data
-    merged_df['phone_from_df1'] = np.where(merged_df['MobileCode'].notna() & merged_df['Mobile_x'].notna(),
-                                         '+' + merged_df['MobileCode'].astype(str) + ' ' + merged_df['Mobile_x'].astype(str),
-                                         np.nan)
-
-    consolidated['Phone Number'] = np.where(merged_df['phone_from_df1'].notna(),
-                                          merged_df['phone_from_df1'],
-                                          merged_df['Mobile_y'])
+    # Phone Number - E.164 from MobileCode + Mobile in df1, fallback to Mobile from df2
+    consolidated['Phone Number'] = merged_df['Mobile_clean_x'].fillna(merged_df['Mobile_clean_y'])
 
     # Birthday - from df1.DateOfBirth
     consolidated['Birthday'] = merged_df['DateOfBirth']
 
-    # Save to CSV
-    output_path = '/Users/yoga.wigardo/Workspaces/bangCRM/report/consolidated_customer_report.csv'
-    consolidated.to_csv(output_path, index=False)
+    # Keep the customer ID and sort key so rows can be replaced incrementally
+    consolidated['customer_id'] = merged_df['customer_id']
+    consolidated['name_key'] = name_key
 
-    print(f"Consolidated report saved to: {output_path}")
+    return consolidated
+
+@instrumented('consolidate_reports')
+def create_consolidated_report(chunksize=None, index_path=DEFAULT_INDEX_PATH,
+                               customer_report_path='customer_report_20250826.csv',
+                               activities_report_path='customers_activities_20250825to20251124.csv',
+                               output_path='consolidated_customer_report.csv',
+                               name_threshold=DEFAULT_THRESHOLD, links_path=None,
+                               output_formats=DEFAULT_FORMATS):
+    # chunksize streams the activities export with the same output as unstreamed; it
+    # lowers the parse overhead, but memory still grows with the activity rows
+    df1, df2 = load_consolidation_inputs(customer_report_path, activities_report_path,
+                                         chunksize=chunksize, index_path=index_path,
+                                         name_threshold=name_threshold, links_path=links_path)
+    consolidated = build_consolidated_rows(df1, df2).drop(columns=['customer_id', 'name_key'])
+
+    # Save as CSV (plus any extra formats)
+    with stage('write', rows_in=len(consolidated)):
+        written = write_report(consolidated, output_path, formats=output_formats)
+
+    print(f"Consolidated report saved to: {', '.join(written)}")
     print(f"Total records: {len(consolidated)}")
 
     # Display first few rows
@@ -96,4 +229,9 @@ def create_consolidated_report():
     return consolidated
 
 if __name__ == "__main__":
-    report = create_consolidated_report()
\ No newline at end of file
+    import sys
+
+    # Pass a chunk size (e.g. 50000) to stream large multi-year activity exports. This
+    # report keeps every activity row, so streaming trims the parse overhead only -
+    # memory still grows with the number of activity rows.
+    report = create_consolidated_report(chunksize=int(sys.argv[1]) if len(sys.argv) > 1 else None)
\ No newline at end of file
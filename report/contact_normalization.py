@@ -0,0 +1,96 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Numbers written without a country code are Indonesian (same default as index.js)
+DEFAULT_COUNTRY_CODE = '62'
+
+# A bare number starting with the default code is already international from this
+# length on - Indonesian national numbers start with 8 and never with 62
+MIN_INTERNATIONAL_DIGITS = 10
+
+# Shortest national number left after dropping a doubled country code ("+ 62 62811...")
+MIN_NATIONAL_DIGITS = 8
+
+# Fewer digits than this (code included) is a placeholder such as "+ 62 ", not a number
+MIN_PHONE_DIGITS = 8
+
+# Cached canonical values stop growing past this many entries
+MAX_CACHE_ENTRIES = 1_000_000
+
+FLOAT_SUFFIX = re.compile(r'\.0\b')
+NON_DIGITS = re.compile(r'\D')
+SEPARATED_CODE = re.compile(r'^\+\s*(\d{1,3})[\s\-.()]+(.*)$')
+INTERNATIONAL_PREFIX = re.compile(r'^(?:\+|00)')
+
+phone_cache = {}
+email_cache = {}
+
+
+def memoized(values, cache, canonicalize):
+    # Canonicalize each distinct value once: values already seen (in this export or an
+    # earlier one in the same process) come from the cache, only new ones go through
+    # the vectorized canonicalize(), and the result is spread back with one take
+    codes, uniques = pd.factorize(values)
+    pending = [value for value in uniques if value not in cache]
+    computed = dict(zip(pending, canonicalize(pd.Series(pending, dtype='string')).tolist())) if pending else {}
+
+    # Look everything up before the cache is trimmed - a full cache is cleared and
+    # restarted from this batch's new values
+    canonical = np.array([computed[value] if value in computed else cache[value] for value in uniques] + [pd.NA],
+                         dtype=object)
+    if computed:
+        if len(cache) + len(computed) > MAX_CACHE_ENTRIES:
+            cache.clear()
+        cache.update(computed)
+    return pd.Series(canonical[codes], index=values.index, dtype='string')
+
+
+def canonical_emails(emails):
+    emails = emails.str.strip().str.lower()
+    return emails.where(emails != '')
+
+
+def canonical_phones(text):
+    # "+ 62 0812...", "+62 812...", "0812...", "812...", "62812..." and "+62.0 812.0"
+    # all become "+62812..."
+    text = text.str.replace(FLOAT_SUFFIX, '', regex=True).str.strip()
+    parts = text.str.extract(SEPARATED_CODE)
+    separated = parts[0].notna()
+    digits = text.str.replace(NON_DIGITS, '', regex=True)
+
+    # Full international numbers without a separated code ("+62812...", "0062812...")
+    international = text.str.contains(INTERNATIONAL_PREFIX) & ~separated
+    digits = digits.mask(international & text.str.startswith('00'), digits.str[2:])
+    international |= (~separated & digits.str.startswith(DEFAULT_COUNTRY_CODE)
+                      & (digits.str.len() >= MIN_INTERNATIONAL_DIGITS))
+
+    # Everything else is a code plus a national number with an optional trunk 0
+    code = parts[0].where(separated, DEFAULT_COUNTRY_CODE)
+    national = parts[1].str.replace(NON_DIGITS, '', regex=True).where(separated, digits).str.lstrip('0')
+    code_length = code.str.len()
+    for length in (1, 2, 3):
+        doubled = ((code_length == length) & (national.str[:length] == code)
+                   & (national.str.len() - length >= MIN_NATIONAL_DIGITS)).fillna(False)
+        national = national.mask(doubled, national.str[length:])
+
+    phones = ('+' + digits).where(international, '+' + code + national)
+    return phones.where(phones.str.len() > MIN_PHONE_DIGITS)
+
+
+def normalize_emails(emails):
+    # Lower-cased, trimmed emails; blanks become missing
+    return memoized(emails.astype('string'), email_cache, canonical_emails)
+
+
+def normalize_phones(phones, country_codes=None):
+    # E.164 numbers ("+62811...") from any export's phone format. Pass the customer
+    # report's MobileCode column as country_codes - its Mobile column has no code.
+    phones = phones.astype('string')
+    if country_codes is not None:
+        codes = (country_codes.astype('string').str.replace(FLOAT_SUFFIX, '', regex=True)
+                 .str.replace(NON_DIGITS, '', regex=True))
+        with_code = (codes.str.strip('0') != '').fillna(False) & phones.notna()
+        phones = phones.mask(with_code, '+' + codes + ' ' + phones)
+    return memoized(phones, phone_cache, canonical_phones)
@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from contact_normalization import normalize_emails, normalize_phones
+from expiring_plans import prepare_plans
+from export_cache import file_digest
+from profile_metrics import TIER_NEW, TIER_STANDARD, TIER_THRESHOLDS
+from schema import ACTIVITIES_DTYPES, CUSTOMER_REPORT_DTYPES, load_export
+
+DEFAULT_DB_PATH = os.environ.get('BANGCRM_DB', 'crm_store.sqlite')
+
+# Bump whenever table or view layouts change - older databases are rebuilt on the next ingest
+STORE_FORMAT_VERSION = 1
+
+# One table per export kind, with the columns the email/mobile match keys come from
+EXPORT_TABLES = {
+    'customers': {'path': 'customer_report_20240101.csv', 'email': 'Email',
+                  'mobile': 'Mobile', 'mobile_code': 'MobileCode'},
+    'activities': {'path': 'customers_activities_20231231to20241231.csv', 'email': 'Email', 'mobile': 'Mobile'},
+    'profiles': {'path': 'customer_profiles.csv', 'email': 'email', 'mobile': 'telephone'},
+    'expiring_plans': {'path': '../reportcrm/expiringplans.csv', 'email': 'Email', 'mobile': 'Mobile',
+                       'prepare': prepare_plans},
+}
+
+# Every table gets email_key, mobile_key and the first-row flags; these are the extras
+TABLE_INDEXES = {
+    'customers': [['Membership'], ['Status']],
+    'activities': [['email_first', 'Days since last class'], ['Days since last class'],
+                   ['Days since package purchase'], ['Days since membership purchase'],
+                   ['Total spending amount']],
+    'profiles': [],
+    'expiring_plans': [['end_date'], ['Plan Name']],
+}
+
+CUSTOMER_COLUMNS = list(CUSTOMER_REPORT_DTYPES)
+ACTIVITY_COLUMNS = [col for col in ACTIVITIES_DTYPES if col not in ('Customer', 'Email', 'Mobile')]
+
+# consolidate_profile_customers' profile fields under clean_profile_report's names
+PROFILE_COLUMNS = {
+    'totalSpendedAmount': 'Profile Total Spent',
+    'totalBooking': 'Profile Total Bookings',
+    'totalAttendedClass': 'Profile Total Attended',
+}
+
+SIMPLIFIED_COLUMNS = [
+    'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth',
+    'JoinedDate', 'Completed', 'Cancelled', 'Date joined',
+    'Days since last class', 'Days since package purchase',
+    'Days since membership purchase', 'Profile Total Spent',
+    'Profile Total Attended',
+]
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS exports (kind TEXT PRIMARY KEY, path TEXT, digest TEXT, rows INTEGER, '
+        'loaded_at TEXT, version INTEGER)')
+    return conn
+
+
+def add_match_keys(df, spec):
+    # Canonical email/mobile keys, plus flags marking the first row of each key - the
+    # record the pandas consolidators keep with drop_duplicates(keep='first')
+    df = df.copy()
+    country_codes = df[spec['mobile_code']] if spec.get('mobile_code') in df.columns else None
+    df['email_key'] = normalize_emails(df[spec['email']]) if spec['email'] in df.columns else pd.NA
+    df['mobile_key'] = normalize_phones(df[spec['mobile']], country_codes) if spec['mobile'] in df.columns else pd.NA
+    for key, flag in (('email_key', 'email_first'), ('mobile_key', 'mobile_first')):
+        df[flag] = (df[key].notna() & ~df[key].duplicated()).astype('int8')
+    return df
+
+
+def ingest_export(conn, kind, path=None, force=False):
+    # Load one export into its table (replacing the previous load). Exports whose
+    # content was already ingested are skipped. Returns the number of rows loaded.
+    spec = EXPORT_TABLES[kind]
+    path = path or spec['path']
+    digest = file_digest(path)
+    loaded = conn.execute('SELECT digest, version FROM exports WHERE kind = ?', (kind,)).fetchone()
+    if not force and loaded == (digest, STORE_FORMAT_VERSION):
+        print(f"{kind}: {path} already loaded")
+        return 0
+
+    df = add_match_keys(load_export(path, prepare=spec.get('prepare')), spec)
+    # Categoricals and nullable types go in as their plain values
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+    with conn:
+        df.to_sql(kind, conn, if_exists='replace', index=True, index_label='export_row', chunksize=10000)
+        for columns in [['email_key'], ['mobile_key'], ['email_first', 'email_key'],
+                        ['mobile_first', 'mobile_key']] + TABLE_INDEXES[kind]:
+            name = f'idx_{kind}_' + '_'.join(col.lower().replace(' ', '_') for col in columns)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(kind)} '
+                         f'({", ".join(quote(col) for col in columns)})')
+        conn.execute('INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?, ?)',
+                     (kind, path, digest, len(df), datetime.now().isoformat(timespec='seconds'),
+                      STORE_FORMAT_VERSION))
+        create_views(conn)
+
+    print(f"{kind}: loaded {len(df)} rows from {path}")
+    return len(df)
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({quote(table)})')]
+
+
+def create_views(conn):
+    # The consolidation and simplification steps as views over the export tables.
+    # Views are rebuilt after every ingest, since their columns follow the tables'.
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for view in ('simplified_profiles', 'profile_customers', 'consolidated_customers'):
+        conn.execute(f'DROP VIEW IF EXISTS {view}')
+
+    if not {'customers', 'activities'} <= tables:
+        return
+    customer_columns = [col for col in CUSTOMER_COLUMNS if col in table_columns(conn, 'customers')]
+    activity_columns = [col for col in ACTIVITY_COLUMNS if col in table_columns(conn, 'activities')]
+
+    # consolidate_report: each customer takes the first activity record with the same
+    # email, or - when the email has no activity - the first one with the same mobile
+    conn.execute(f'''
+        CREATE VIEW consolidated_customers AS
+        SELECT c.export_row, c.email_key, c.mobile_key,
+               {', '.join(f'c.{quote(col)}' for col in customer_columns)},
+               {', '.join(f'COALESCE(ae.{quote(col)}, am.{quote(col)}) AS {quote(col)}' for col in activity_columns)},
+               CASE WHEN ae.export_row IS NOT NULL THEN 'email'
+                    WHEN am.export_row IS NOT NULL THEN 'mobile' END AS matched_on
+        FROM customers c
+        LEFT JOIN activities ae ON ae.email_first = 1 AND ae.email_key = c.email_key
+        LEFT JOIN activities am ON ae.export_row IS NULL AND am.mobile_first = 1 AND am.mobile_key = c.mobile_key
+    ''')
+
+    if 'profiles' not in tables:
+        return
+    profile_columns = {field: name for field, name in PROFILE_COLUMNS.items()
+                       if field in table_columns(conn, 'profiles')}
+
+    # consolidate_profile_customers + clean_profile_report: customers that have an app
+    # profile (matched by email), their activity record and the profile totals
+    conn.execute(f'''
+        CREATE VIEW profile_customers AS
+        SELECT c.export_row, c.email_key, c.mobile_key,
+               {', '.join(f'c.{quote(col)}' for col in customer_columns)},
+               {', '.join(f'a.{quote(col)}' for col in activity_columns)},
+               {', '.join(f'p.{quote(field)} AS {quote(name)}' for field, name in profile_columns.items())}
+        FROM customers c
+        JOIN profiles p ON p.email_first = 1 AND p.email_key = c.email_key
+        LEFT JOIN activities a ON a.email_first = 1 AND a.email_key = c.email_key
+    ''')
+
+    # simplify_profile_report + profile_metrics: revenue per class, rates and tiers
+    attended = 'COALESCE("Profile Total Attended", 0)'
+    revenue_per_class = f'(CASE WHEN {attended} > 0 THEN COALESCE("Profile Total Spent", 0) * 1.0 / {attended} ELSE 0 END)'
+    bookings = 'COALESCE("Total Booking", 0)'
+    tiers = ' '.join(f"WHEN {revenue_per_class} >= {threshold} THEN '{name}'" for name, threshold in TIER_THRESHOLDS)
+    conn.execute(f'''
+        CREATE VIEW simplified_profiles AS
+        SELECT {', '.join(quote(col) for col in SIMPLIFIED_COLUMNS)},
+               ROUND({revenue_per_class}, 2) AS "Average Revenue",
+               CASE WHEN {bookings} > 0 THEN COALESCE("Completed", 0) * 1.0 / {bookings} ELSE 0 END AS "Completion Rate",
+               CASE WHEN {bookings} > 0 THEN COALESCE("Cancelled", 0) * 1.0 / {bookings} ELSE 0 END AS "Cancellation Rate",
+               CASE WHEN {attended} <= 0 THEN '{TIER_NEW}' {tiers} ELSE '{TIER_STANDARD}' END AS "Performance Tier"
+        FROM profile_customers
+    ''')
+
+
+def ingest_exports(paths=None, db_path=DEFAULT_DB_PATH, force=False):
+    # paths maps export kinds to files; kinds left out use the default export names
+    paths = paths or {}
+    conn = connect(db_path)
+    try:
+        for kind, spec in EXPORT_TABLES.items():
+            path = paths.get(kind) or spec['path']
+            if not os.path.exists(path):
+                print(f"{kind}: {path} not found - skipped")
+                continue
+            ingest_export(conn, kind, path, force=force)
+    finally:
+        conn.close()
+
+
+def query(sql, params=(), db_path=DEFAULT_DB_PATH):
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def dormant_customers(min_days=30, min_spend=0, db_path=DEFAULT_DB_PATH):
+    # Customers with no class for more than min_days who spent more than min_spend
+    return query('''
+        SELECT "CustomerName", "Email", "MobileCode", "Mobile", "Membership",
+               "Days since last class", "Total spending amount"
+        FROM consolidated_customers
+        WHERE "Days since last class" > ? AND "Total spending amount" > ?
+        ORDER BY "Total spending amount" DESC
+    ''', (min_days, min_spend), db_path=db_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local SQLite store of the CRM exports')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = commands.add_parser('ingest', help='load the exports into the store')
+    for kind in EXPORT_TABLES:
+        ingest_parser.add_argument(f'--{kind.replace("_", "-")}', dest=kind, default=None)
+    ingest_parser.add_argument('--force', action='store_true', help='reload exports that are already loaded')
+
+    query_parser = commands.add_parser('query', help='run SQL against the tables and views')
+    query_parser.add_argument('sql')
+    query_parser.add_argument('--output', default=None, help='write the result to a CSV file')
+
+    dormant_parser = commands.add_parser('dormant', help='dormant customers above a spend')
+    dormant_parser.add_argument('--days', type=int, default=30)
+    dormant_parser.add_argument('--min-spend', type=float, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        ingest_exports({kind: getattr(args, kind) for kind in EXPORT_TABLES}, db_path=args.db, force=args.force)
+    else:
+        start = time.perf_counter()
+        if args.command == 'query':
+            result = query(args.sql, db_path=args.db)
+        else:
+            result = dormant_customers(args.days, args.min_spend, db_path=args.db)
+        elapsed = time.perf_counter() - start
+
+        if args.command == 'query' and args.output:
+            result.to_csv(args.output, index=False)
+            print(f"Saved {len(result)} rows to {args.output}")
+        else:
+            print(result.to_string(index=False))
+        print(f"\n{len(result)} rows in {elapsed * 1000:.1f} ms")
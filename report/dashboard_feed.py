@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# The dashboard pages sit next to the report folder
+DEFAULT_FEED_PATH = os.environ.get('BANGCRM_DASHBOARD_FEED', '../dashboard-feed.json')
+
+# Bump whenever the layout of the feed changes so the pages can reject old files
+# (together with FEED_FORMAT_VERSION in dashboard-feed-helpers.js)
+FEED_FORMAT_VERSION = 1
+
+FEED_GLOBAL = 'BANGCRM_FEED'
+
+
+def json_value(value):
+    # numpy scalars and timestamps are not JSON serializable on their own
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def columnar(df):
+    # One list per column - field names are stored once instead of once per row,
+    # and missing values become null
+    data = {}
+    for column in df.columns:
+        values = df[column].astype(object)
+        data[column] = values.where(df[column].notna(), None).tolist()
+    return {'columns': list(df.columns), 'rows': len(df), 'data': data}
+
+
+def load_feed(feed_path=DEFAULT_FEED_PATH):
+    if feed_path and os.path.exists(feed_path):
+        with open(feed_path, encoding='utf-8') as f:
+            feed = json.load(f)
+        if feed.get('version') == FEED_FORMAT_VERSION:
+            return feed
+    return {'version': FEED_FORMAT_VERSION, 'datasets': {}}
+
+
+def write_feed(feed, feed_path=DEFAULT_FEED_PATH):
+    # The JSON file is for pages served over HTTP; the .js twin sets a global so the
+    # pages also work when opened straight from disk, where fetch() is blocked
+    body = json.dumps(feed, default=json_value, ensure_ascii=False, separators=(',', ':'))
+    outputs = {
+        feed_path: body,
+        os.path.splitext(feed_path)[0] + '.js': f'window.{FEED_GLOBAL} = {body};\n',
+    }
+    for path, text in outputs.items():
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def publish_dataset(name, df, summary=None, feed_path=DEFAULT_FEED_PATH, **meta):
+    # Replace one dataset of the feed, leaving the others as published. The revision
+    # is a content hash, so pages can keep derived data (e.g. the download CSV)
+    # cached until the dataset actually changes.
+    dataset = columnar(df)
+    if summary is not None:
+        dataset['summary'] = summary
+    dataset.update(meta)
+    dataset['revision'] = hashlib.sha256(
+        json.dumps(dataset, default=json_value, sort_keys=True).encode()).hexdigest()[:16]
+    dataset['published_at'] = datetime.now().isoformat(timespec='seconds')
+
+    feed = load_feed(feed_path)
+    feed['datasets'][name] = dataset
+    feed['generated_at'] = dataset['published_at']
+    write_feed(feed, feed_path)
+
+    print(f"Published {name} ({len(df)} rows, revision {dataset['revision']}) to {feed_path}")
+    return dataset
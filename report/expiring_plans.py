@@ -0,0 +1,182 @@
+import os
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dashboard_feed import DEFAULT_FEED_PATH, publish_dataset
+from report_writer import DEFAULT_FORMATS, PAGE_FORMATS, write_report
+from schema import load_export
+
+# Plans the expiring plans page leaves out (substring match on the lower-cased plan name)
+EXCLUDED_PLANS = ['drop in', '1 free class pass', 'drop in (20% off)', '10 free pass (instructor)']
+
+DATE_COLUMNS = {'Purchased Date': 'purchased_date', 'Start Date': 'start_date', 'End Date': 'end_date'}
+
+# Plan dates are DD/MM/YY, or DD/MM/YYYY in some exports - the page reads both
+DATE_FORMATS = ('%d/%m/%y', '%d/%m/%Y')
+
+# Alert bands of the expiring plans table
+CRITICAL_DAYS = 7
+WARNING_DAYS = 30
+
+PAGE_TABLE_COLUMNS = ['Full Name', 'End Date', 'Days Until Expiry', 'Remaining Credits', 'Plan Name', 'Alert']
+
+
+def prepare_plans(df):
+    # Parse the dates once (any of the DATE_FORMATS) and add the fields the page derives per row
+    for column, parsed in DATE_COLUMNS.items():
+        dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        for date_format in DATE_FORMATS:
+            dates = dates.fillna(pd.to_datetime(df[column], format=date_format, errors='coerce'))
+        df[parsed] = dates
+    df['Full Name'] = (df['First Name'].fillna('') + ' ' + df['Last Name'].fillna('')).str.strip()
+    plan_name = df['Plan Name'].astype('string').str.lower().fillna('')
+    df['excluded'] = plan_name.str.contains('|'.join(map(re.escape, EXCLUDED_PLANS)), regex=True)
+    return df
+
+
+class ExpiringPlansIndex:
+    # Plans bucketed by expiry day. Rows are kept sorted by end date, so "expiring in
+    # N days" is a binary search over the day numbers instead of a scan, and plan
+    # names and zero-credit plans map straight to their row positions.
+
+    def __init__(self, plans):
+        end_days = plans['end_date'].to_numpy(dtype='datetime64[D]')
+        order = np.argsort(end_days, kind='stable')
+        self.plans = plans.iloc[order].reset_index(drop=True)
+        self.end_days = end_days[order]
+
+        # NaT sorts last, so dated plans are the leading slice
+        self.dated = int((~np.isnat(self.end_days)).sum())
+        days, starts = np.unique(self.end_days[:self.dated], return_index=True)
+        self.day_buckets = dict(zip(days, zip(starts, np.append(starts[1:], self.dated))))
+
+        self.by_plan_name = self.plans.groupby(self.plans['Plan Name'].astype('string'), sort=False).indices
+        remaining = self.plans['Remaining Credits'].to_numpy(dtype='float64', na_value=np.nan)
+        self.zero_credit_rows = np.flatnonzero(remaining == 0)
+        self.page_rows = np.flatnonzero(~self.plans['excluded'].to_numpy(dtype=bool))
+
+    def __len__(self):
+        return len(self.plans)
+
+    def on_day(self, day):
+        # Plans ending on one calendar day
+        start, end = self.day_buckets.get(np.datetime64(pd.Timestamp(day).date(), 'D'), (0, 0))
+        return self.plans.iloc[start:end]
+
+    def expiring_within(self, days, today=None):
+        # Plans ending between today and today + days (inclusive), soonest first
+        today = np.datetime64(pd.Timestamp(today or date.today()).date(), 'D')
+        dated = self.end_days[:self.dated]
+        start = np.searchsorted(dated, today, side='left')
+        end = np.searchsorted(dated, today + np.timedelta64(days, 'D'), side='right')
+        return self.plans.iloc[start:end]
+
+    def zero_credits(self):
+        return self.plans.iloc[self.zero_credit_rows]
+
+    def plan(self, plan_name):
+        return self.plans.iloc[self.by_plan_name.get(plan_name, [])]
+
+    def plan_names(self):
+        return list(self.by_plan_name)
+
+    def days_until_expiry(self, today=None):
+        # Whole days from today's midnight to each end date (NaN when the date is missing)
+        today = np.datetime64(pd.Timestamp(today or date.today()).date(), 'D')
+        days = (self.end_days - today).astype('float64')
+        days[np.isnat(self.end_days)] = np.nan
+        return pd.Series(days, index=self.plans.index, name='Days Until Expiry').astype('Int32')
+
+
+def build_expiring_plans_index(expiring_plans_path='../reportcrm/expiringplans.csv'):
+    return ExpiringPlansIndex(load_export(expiring_plans_path, prepare=prepare_plans))
+
+
+def page_outputs(index, today=None):
+    # The rows the expiring plans page shows: excluded plan types removed, soonest
+    # expiry first, with the day count, alert band and summary cards precomputed
+    days = index.days_until_expiry(today)
+    page = index.plans.iloc[index.page_rows].copy()
+    page['Days Until Expiry'] = days.iloc[index.page_rows]
+    page['Alert'] = np.select(
+        [page['Days Until Expiry'].between(0, CRITICAL_DAYS).fillna(False).to_numpy(dtype=bool),
+         page['Days Until Expiry'].between(CRITICAL_DAYS + 1, WARNING_DAYS).fillna(False).to_numpy(dtype=bool),
+         page['Days Until Expiry'].gt(WARNING_DAYS).fillna(False).to_numpy(dtype=bool)],
+        ['critical', 'warning', 'safe'],
+        default='',
+    )
+
+    upcoming = page['Days Until Expiry'].dropna()
+    upcoming = upcoming[upcoming >= 0]
+    summary = {
+        'total_plans': len(page),
+        'critical_plans': int((page['Alert'] == 'critical').sum()),
+        'avg_days': int(np.floor(upcoming.mean() + 0.5)) if len(upcoming) else 0,  # Math.round
+    }
+    return page, summary
+
+
+def create_expiring_plans_outputs(expiring_plans_path='../reportcrm/expiringplans.csv',
+                                  output_dir='.', today=None, expiring_days=WARNING_DAYS, feed_path=None,
+                                  output_formats=DEFAULT_FORMATS, page_formats=PAGE_FORMATS):
+    try:
+        index = build_expiring_plans_index(expiring_plans_path)
+        print(f"Indexed {len(index)} plans across {len(index.day_buckets)} expiry days "
+              f"and {len(index.plan_names())} plan names")
+
+        page, summary = page_outputs(index, today=today)
+        source_columns = [col for col in index.plans.columns
+                          if col not in DATE_COLUMNS.values() and col not in ('Full Name', 'excluded')]
+
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = {
+            # Same content as the page's "Download CSV" (written in page_formats, whose
+            # .xlsx is the page's "Download Excel") - excluded plan types removed
+            'expiring_plans_filtered.csv': page[source_columns],
+            'expiring_plans_table.csv': page[PAGE_TABLE_COLUMNS],
+            f'expiring_plans_next_{expiring_days}_days.csv':
+                index.expiring_within(expiring_days, today=today).loc[lambda df: ~df['excluded'], source_columns],
+            'expiring_plans_zero_credits.csv':
+                index.zero_credits().loc[lambda df: ~df['excluded'], source_columns],
+        }
+        for name, df in outputs.items():
+            formats = page_formats if name == 'expiring_plans_filtered.csv' else output_formats
+            written = write_report(df, os.path.join(output_dir, name), formats=formats)
+            print(f"Saved {len(df)} plans to {', '.join(written)}")
+
+        if feed_path:
+            # Days until expiry are as of `as_of` - the page shifts them by the days since
+            # `as_of`, so a stale feed still shows correct countdowns. The alert is left
+            # out - the page derives it from the shifted days.
+            publish_dataset('expiring_plans', page[source_columns + ['Full Name', 'Days Until Expiry']],
+                            summary=summary, feed_path=feed_path,
+                            as_of=pd.Timestamp(today or date.today()).date().isoformat())
+
+        print(f"Total plans: {summary['total_plans']}, "
+              f"Critical (<= {CRITICAL_DAYS} days): {summary['critical_plans']}, "
+              f"Average days to expiry: {summary['avg_days']}")
+
+        return index, summary
+
+    except Exception as e:
+        print(f"Error processing expiring plans: {str(e)}")
+        return None, None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Index reportcrm/expiringplans.csv and write the page outputs')
+    parser.add_argument('expiring_plans', nargs='?', default='../reportcrm/expiringplans.csv')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--today', default=None, help='evaluation date (YYYY-MM-DD), defaults to today')
+    parser.add_argument('--days', type=int, default=WARNING_DAYS, help='window of the "expiring in N days" output')
+    parser.add_argument('--feed', nargs='?', const=DEFAULT_FEED_PATH, default=None,
+                        help='also publish the page rows to the dashboard feed')
+    args = parser.parse_args()
+
+    create_expiring_plans_outputs(args.expiring_plans, args.output_dir, today=args.today,
+                                  expiring_days=args.days, feed_path=args.feed)
@@ -0,0 +1,124 @@
+import hashlib
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Bump whenever a loader's normalization changes so stale cache entries are ignored
+CACHE_SCHEMA_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.environ.get('BANGCRM_CACHE_DIR', '.export_cache')
+DEFAULT_MAX_CACHE_BYTES = int(os.environ.get('BANGCRM_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Parquet when pyarrow is installed, pickle otherwise - both skip CSV parsing and dtype inference
+CACHE_SUFFIX = '.parquet' if HAS_PYARROW else '.pkl'
+
+
+def file_digest(path, block_size=1024 * 1024):
+    # Hash the export content so renamed or re-downloaded copies still hit the cache
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare_fingerprint(prepare):
+    # Scripts run as __main__ share a module name, so fingerprint the normalization
+    # by its compiled body as well - editing it also invalidates its cache entries
+    if prepare is None:
+        return ''
+    code = prepare.__code__
+    body = code.co_code + repr((code.co_consts, code.co_names)).encode()
+    return f'{prepare.__qualname__}:{hashlib.sha256(body).hexdigest()}'
+
+
+def cache_key(path, prepare=None, read_kwargs=None, reader=pd.read_csv):
+    parts = [
+        file_digest(path),
+        f'v{CACHE_SCHEMA_VERSION}',
+        prepare_fingerprint(prepare),
+        f'{reader.__module__}.{reader.__qualname__}',
+        repr(sorted((read_kwargs or {}).items())),
+    ]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def evict_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    # Drop the least recently used entries until the cache fits in max_bytes
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(('.parquet', '.pkl')):
+            entry_path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    evicted = []
+    for _, size, entry_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            # Already evicted by another process
+            pass
+        total_bytes -= size
+        evicted.append(entry_path)
+
+    return evicted
+
+
+def cached_read_csv(path, prepare=None, cache_dir=DEFAULT_CACHE_DIR,
+                    max_cache_bytes=DEFAULT_MAX_CACHE_BYTES, reader=pd.read_csv, **read_kwargs):
+    # Read a raw CRM export, run the loader's normalization and cache the result.
+    # Pass cache_dir=None to always parse the CSV.
+    if cache_dir is None:
+        df = reader(path, **read_kwargs)
+        return prepare(df) if prepare else df
+
+    entry_path = os.path.join(cache_dir, cache_key(path, prepare, read_kwargs, reader) + CACHE_SUFFIX)
+
+    if os.path.exists(entry_path):
+        try:
+            df = pd.read_parquet(entry_path) if HAS_PYARROW else pd.read_pickle(entry_path)
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry_path)
+            return df
+        except Exception:
+            # A corrupt or unreadable entry is rebuilt below
+            os.remove(entry_path)
+
+    df = reader(path, **read_kwargs)
+    if prepare:
+        df = prepare(df)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Per-process temp name so parallel batch workers never write the same file
+    tmp_path = f'{entry_path}.{os.getpid()}.tmp'
+    try:
+        if HAS_PYARROW:
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, entry_path)
+    except Exception as e:
+        # Caching is best effort - the parsed frame is still returned
+        print(f"Could not cache {path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    else:
+        evict_cache(cache_dir, max_cache_bytes)
+
+    return df
@@ -0,0 +1,128 @@
+import os
+import pickle
+
+import pandas as pd
+
+# Unset = every run starts from a fresh in-memory index. Set BANGCRM_IDENTITY_INDEX
+# (e.g. customer_identity_index.pkl) to keep customer IDs stable across runs.
+DEFAULT_INDEX_PATH = os.environ.get('BANGCRM_IDENTITY_INDEX') or None
+
+# Version 2 stores mobile keys in E.164 ("+62811..."), version 1 stored bare digits
+INDEX_FORMAT_VERSION = 2
+
+KEY_KINDS = ('email', 'mobile', 'name')
+
+
+def key_values(series):
+    # Missing and blank keys (e.g. a cleaned 'nan' mobile) never match anything
+    values = series.astype(object).where(series.notna(), None)
+    return [value if value != '' else None for value in values]
+
+
+class CustomerIdentityIndex:
+    # Maps normalized email, mobile and name keys to a stable integer customer ID.
+    #
+    # Match policy, shared by every consolidator:
+    # - email is authoritative: a record with an email is always identified by it
+    # - mobile, then name, are only used when the record has no known email
+    # - a mobile or name belongs to the first customer registering it in the latest
+    #   export - numbers and names get reused, so an earlier export's owner is replaced
+
+    def __init__(self):
+        self.keys = {kind: {} for kind in KEY_KINDS}
+        self.next_id = 1
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        index = cls()
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') == 1:
+                # Version 1 mobile keys dropped the country code of some exports, so they
+                # cannot be converted - customers keep their IDs through email and name
+                # keys and their mobiles are registered again by the next run
+                state['keys']['mobile'] = {}
+                state['version'] = INDEX_FORMAT_VERSION
+            if state.get('version') == INDEX_FORMAT_VERSION:
+                index.keys = state['keys']
+                index.next_id = state['next_id']
+        return index
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        if not path:
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': INDEX_FORMAT_VERSION, 'keys': self.keys, 'next_id': self.next_id},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return self.next_id - 1
+
+    def register(self, df, email=None, mobile=None, name=None):
+        # Assign customer IDs to the records of a new export, creating IDs for unseen
+        # customers. Emails keep their first customer; mobiles and names are re-pointed
+        # to their first owner in this export, so re-registering an export that was
+        # already seen is a no-op.
+        columns = {'email': email, 'mobile': mobile, 'name': name}
+        values = {kind: key_values(df[col]) if col else [None] * len(df) for kind, col in columns.items()}
+        email_keys, mobile_keys, name_keys = self.keys['email'], self.keys['mobile'], self.keys['name']
+        claimed_mobiles, claimed_names = set(), set()
+
+        ids = []
+        for email_key, mobile_key, name_key in zip(values['email'], values['mobile'], values['name']):
+            if email_key is not None:
+                customer_id = email_keys.get(email_key)
+            else:
+                customer_id = mobile_keys.get(mobile_key) if mobile_key is not None else None
+                if customer_id is None and name_key is not None:
+                    customer_id = name_keys.get(name_key)
+
+            if customer_id is None:
+                customer_id = self.next_id
+                self.next_id += 1
+
+            if email_key is not None:
+                email_keys.setdefault(email_key, customer_id)
+            if mobile_key is not None and mobile_key not in claimed_mobiles:
+                mobile_keys[mobile_key] = customer_id
+                claimed_mobiles.add(mobile_key)
+            if name_key is not None and name_key not in claimed_names:
+                name_keys[name_key] = customer_id
+                claimed_names.add(name_key)
+            ids.append(customer_id)
+
+        return pd.Series(ids, index=df.index, dtype='Int64', name='customer_id')
+
+    def lookup(self, df, email=None, mobile=None, name=None, within=None):
+        # Batched resolution: email first, then mobile, then name. When `within` is
+        # given, IDs outside it count as misses so the next key kind is tried.
+        result = pd.DataFrame({
+            'customer_id': pd.Series(pd.NA, index=df.index, dtype='Int64'),
+            'matched_on': pd.Series(pd.NA, index=df.index, dtype='string'),
+        })
+        allowed = set(within) if within is not None else None
+
+        for kind, col in (('email', email), ('mobile', mobile), ('name', name)):
+            if not col:
+                continue
+            pending = result['customer_id'].isna()
+            if not pending.any():
+                break
+
+            keys = df.loc[pending, col]
+            ids = keys.map(self.keys[kind]).astype('Int64')
+            if allowed is not None:
+                ids = ids.where(ids.isin(allowed))
+            hit = ids.notna()
+
+            result.loc[hit[hit].index, 'customer_id'] = ids[hit]
+            result.loc[hit[hit].index, 'matched_on'] = kind
+
+        return result
+
+
+def load_identity_index(path=DEFAULT_INDEX_PATH):
+    return CustomerIdentityIndex.load(path)
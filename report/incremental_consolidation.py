@@ -0,0 +1,165 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from consolidate_reports import build_consolidated_rows, load_consolidation_inputs
+from instrumentation import instrumented, stage
+from report_writer import DEFAULT_FORMATS, write_report
+
+DEFAULT_STATE_DIR = 'consolidation_state'
+
+# Customer IDs key the saved state, so the state keeps its own identity index
+INDEX_FILE = 'identity_index.pkl'
+
+# Bump whenever the hashed export columns change (e.g. consolidate_reports.USECOLS)
+# or what the state keeps
+STATE_FORMAT_VERSION = 3
+
+# Name column each export is registered on
+NAME_COLUMNS = {'customers': 'CustomerName_clean', 'activities': 'Customer_clean'}
+
+
+def customer_hashes(df):
+    # One content hash per customer ID, combining every row that customer has in the export
+    columns = [col for col in df.columns if col != 'customer_id']
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return row_hashes.groupby(df['customer_id'].to_numpy()).sum()
+
+
+def unnamed_ids(df, name_column):
+    # Rows without a name get a new customer ID on every run, so they cannot be diffed
+    # against the last run - they are rebuilt every time and left out of the changelog
+    unnamed = df[name_column].astype('string').fillna('').str.strip() == ''
+    return set(df.loc[unnamed, 'customer_id'])
+
+
+def load_state(state_dir):
+    state_path = os.path.join(state_dir, 'state.pkl')
+    if not os.path.exists(state_path):
+        return None
+    state = pd.read_pickle(state_path)
+    if state.get('version') != STATE_FORMAT_VERSION:
+        return None
+    return state
+
+
+def save_state(state_dir, state):
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = os.path.join(state_dir, 'state.pkl')
+    tmp_path = state_path + '.tmp'
+    pd.to_pickle(state, tmp_path)
+    os.replace(tmp_path, state_path)
+
+
+def diff_customers(previous_hashes, current_hashes):
+    # Compare per-customer hashes of one export against the last consolidated state
+    previous_hashes = previous_hashes if previous_hashes is not None else pd.Series(dtype='uint64')
+    inserted = current_hashes.index.difference(previous_hashes.index)
+    deleted = previous_hashes.index.difference(current_hashes.index)
+    common = current_hashes.index.intersection(previous_hashes.index)
+    updated = common[current_hashes[common].to_numpy() != previous_hashes[common].to_numpy()]
+    return set(inserted), set(updated), set(deleted)
+
+
+@instrumented('incremental_consolidation')
+def create_consolidated_report_incremental(customer_report_path, activities_report_path, output_path,
+                                           state_dir=DEFAULT_STATE_DIR, index_path=None,
+                                           chunksize=None, output_formats=DEFAULT_FORMATS):
+    # Same output as create_consolidated_report, but only customers whose rows were
+    # inserted, updated or deleted since the last run are re-merged. Each run appends
+    # its changes to <state_dir>/changelog.csv.
+    index_path = index_path or os.path.join(state_dir, INDEX_FILE)
+    os.makedirs(state_dir, exist_ok=True)
+    df1, df2 = load_consolidation_inputs(customer_report_path, activities_report_path,
+                                         chunksize=chunksize, index_path=index_path)
+    print(f"Loaded {len(df1)} customer records and {len(df2)} activity records")
+
+    with stage('diff', rows_in=len(df1) + len(df2)) as metrics:
+        state = load_state(state_dir)
+        unnamed = unnamed_ids(df1, NAME_COLUMNS['customers']) | unnamed_ids(df2, NAME_COLUMNS['activities'])
+        customers_hashes = customer_hashes(df1[~df1['customer_id'].isin(unnamed)])
+        activities_hashes = customer_hashes(df2[~df2['customer_id'].isin(unnamed)])
+
+        if state is None:
+            print("No previous consolidation state - building every customer")
+            previous_customers = previous_activities = None
+            previous_rows = None
+            previous_unnamed = set()
+        else:
+            previous_customers = state['customers_hashes']
+            previous_activities = state['activities_hashes']
+            previous_rows = state['consolidated']
+            previous_unnamed = state['unnamed_ids']
+
+        customers_inserted, customers_updated, customers_deleted = diff_customers(previous_customers, customers_hashes)
+        activities_inserted, activities_updated, activities_deleted = diff_customers(previous_activities, activities_hashes)
+
+        current_ids = set(customers_hashes.index) | set(activities_hashes.index)
+        previous_ids = set(previous_rows['customer_id'].dropna()) - previous_unnamed \
+            if previous_rows is not None else set()
+        changed_ids = (customers_inserted | customers_updated | customers_deleted |
+                       activities_inserted | activities_updated | activities_deleted)
+        metrics.update(rows_out=len(changed_ids), customers=len(current_ids) + len(unnamed))
+
+    # Rebuild merged rows only for changed customers still present in either export,
+    # plus the unnamed rows
+    rebuild_ids = (changed_ids & current_ids) | unnamed
+    rebuilt_rows = build_consolidated_rows(df1[df1['customer_id'].isin(rebuild_ids)],
+                                           df2[df2['customer_id'].isin(rebuild_ids)])
+
+    if previous_rows is not None:
+        kept_rows = previous_rows[~previous_rows['customer_id'].isin(changed_ids | previous_unnamed)]
+        consolidated = pd.concat([kept_rows, rebuilt_rows], ignore_index=True)
+    else:
+        consolidated = rebuilt_rows
+    consolidated = consolidated.sort_values(['name_key', 'customer_id'], kind='stable').reset_index(drop=True)
+
+    # Changelog - a customer counts as inserted/deleted when it enters/leaves the report
+    changes = []
+    for customer_id in sorted(changed_ids):
+        if customer_id not in previous_ids:
+            change = 'inserted'
+        elif customer_id not in current_ids:
+            change = 'deleted'
+        else:
+            change = 'updated'
+        changes.append((customer_id, change))
+    changelog = pd.DataFrame(changes, columns=['customer_id', 'change'])
+    names = pd.concat([rebuilt_rows, previous_rows] if previous_rows is not None else [rebuilt_rows])
+    names = names.drop_duplicates(subset=['customer_id']).set_index('customer_id')['Name']
+    changelog['Name'] = changelog['customer_id'].map(names)
+    changelog.insert(0, 'run_at', datetime.now().isoformat(timespec='seconds'))
+
+    # Save the report, then the state it was built from
+    with stage('write', rows_in=len(consolidated)):
+        write_report(consolidated.drop(columns=['customer_id', 'name_key']), output_path, formats=output_formats)
+    save_state(state_dir, {
+        'version': STATE_FORMAT_VERSION,
+        'customers_hashes': customers_hashes,
+        'activities_hashes': activities_hashes,
+        'consolidated': consolidated,
+        'unnamed_ids': unnamed,
+    })
+
+    changelog_path = os.path.join(state_dir, 'changelog.csv')
+    changelog.to_csv(changelog_path, mode='a', index=False, header=not os.path.exists(changelog_path))
+
+    print(f"Consolidated report saved to: {output_path}")
+    print(f"Total records: {len(consolidated)}")
+    print(f"Rebuilt {len(rebuild_ids)} of {len(current_ids) + len(unnamed)} customers")
+    print(f"Inserted: {(changelog['change'] == 'inserted').sum()}, "
+          f"Updated: {(changelog['change'] == 'updated').sum()}, "
+          f"Deleted: {(changelog['change'] == 'deleted').sum()}")
+
+    return consolidated.drop(columns=['customer_id', 'name_key']), changelog
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 4:
+        print("Usage: python incremental_consolidation.py <customer_report.csv> <customers_activities.csv> <output.csv>")
+        sys.exit(1)
+
+    create_consolidated_report_incremental(sys.argv[1], sys.argv[2], sys.argv[3])
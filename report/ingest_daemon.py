@@ -0,0 +1,269 @@
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from batch_consolidate import (ACTIVITIES_PATTERN, CUSTOMER_REPORT_PATTERN, DEFAULT_CHUNKSIZE, TASKS_PER_WORKER,
+                               consolidate_pair, output_path_for, pair_snapshots)
+from export_cache import file_digest
+
+PROFILES_PATTERN = re.compile(r'customer_profiles\.csv$')
+EXPIRING_PLANS_PATTERN = re.compile(r'expiringplans\.csv$')
+EXPORT_PATTERNS = (CUSTOMER_REPORT_PATTERN, ACTIVITIES_PATTERN, PROFILES_PATTERN, EXPIRING_PLANS_PATTERN)
+
+# Customer and activity exports land in the report folder, expiring plans in reportcrm
+DEFAULT_WATCH_DIRS = ('.', '../reportcrm')
+DEFAULT_OUTPUT_DIR = os.environ.get('BANGCRM_INGEST_DIR', 'ingest_output')
+
+# How often the folders are listed, and how long a file's size and mtime must stay
+# unchanged before it counts as fully written (browsers and sync tools write in bursts)
+POLL_INTERVAL = 1.0
+SETTLE_SECONDS = 2.0
+
+# Reports built for every snapshot pair; the profile report also needs customer_profiles.csv
+PAIR_REPORTS = ('consolidated_customer_report', 'consolidated_customer_report_by_email')
+PROFILE_REPORT = 'simplified_customer_profiles'
+EXPIRING_PLANS_REPORT = 'expiring_plans'
+
+STATE_FILE = 'ingest_state.json'
+
+# Bump whenever job keys or outputs change so finished jobs are rebuilt once
+STATE_FORMAT_VERSION = 1
+
+
+def run_ingest_job(job):
+    # Runs inside a worker process. Outputs are written to a staging path next to
+    # their destination; the daemon publishes them with os.replace once the job is done.
+    # Only the CSV is staged, so extra output formats are not written here.
+    # Profile and by-email jobs keep one activity record per customer, while
+    # consolidated_customer_report jobs hold every activity row (see batch_consolidate.run_job).
+    from expiring_plans import create_expiring_plans_outputs
+    from profile_report_pipeline import run_profile_report_pipeline
+
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if job['report'] == EXPIRING_PLANS_REPORT:
+                index, _ = create_expiring_plans_outputs(job['inputs']['expiring_plans'],
+                                                         output_dir=job['staging_path'])
+                failed = index is None
+            elif job['report'] == PROFILE_REPORT:
+                failed = run_profile_report_pipeline(job['inputs']['profiles'],
+                                                     job['inputs']['customer_report_path'],
+                                                     job['inputs']['activities_report_path'],
+                                                     output_path=job['staging_path'],
+                                                     chunksize=job['chunksize'],
+                                                     index_path=None,
+                                                     output_formats=()) is None
+            else:
+                failed = consolidate_pair(job['inputs'], job['report'], job['staging_path'],
+                                          job['chunksize'], output_formats=()) is None
+        if failed:
+            status = 'error'
+    except Exception as e:
+        status = f'error: {str(e)}'
+
+    return {'key': job['key'], 'status': status, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def publish(staging_path, output_path):
+    # Swap finished outputs into place. A directory (several output files) is
+    # published file by file, each with its own atomic replace.
+    if os.path.isdir(staging_path):
+        os.makedirs(output_path, exist_ok=True)
+        for name in os.listdir(staging_path):
+            os.replace(os.path.join(staging_path, name), os.path.join(output_path, name))
+        os.rmdir(staging_path)
+    else:
+        os.replace(staging_path, output_path)
+
+
+def discard(staging_path):
+    if os.path.isdir(staging_path):
+        shutil.rmtree(staging_path, ignore_errors=True)
+    elif os.path.exists(staging_path):
+        os.remove(staging_path)
+
+
+class IngestDaemon:
+    def __init__(self, watch_dirs=DEFAULT_WATCH_DIRS, output_dir=DEFAULT_OUTPUT_DIR, workers=2,
+                 chunksize=DEFAULT_CHUNKSIZE, poll_interval=POLL_INTERVAL, settle_seconds=SETTLE_SECONDS):
+        self.watch_dirs = list(watch_dirs)
+        self.output_dir = output_dir
+        self.workers = workers
+        self.chunksize = chunksize
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        # path -> (size, mtime_ns, monotonic time the file was first seen in this state)
+        self.observed = {}
+        # (path, size, mtime_ns) -> content digest, so unchanged files are hashed once
+        self.digests = {}
+        # Jobs running, the newest job key per output path, and jobs that failed (they
+        # are retried once their inputs change)
+        self.running = {}
+        self.latest = {}
+        self.failed = set()
+        self.state = self.load_state()
+
+    def state_path(self):
+        return os.path.join(self.output_dir, STATE_FILE)
+
+    def load_state(self):
+        if os.path.exists(self.state_path()):
+            with open(self.state_path(), encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_FORMAT_VERSION:
+                return state
+        return {'version': STATE_FORMAT_VERSION, 'published': {}}
+
+    def save_state(self):
+        tmp_path = f'{self.state_path()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.state_path())
+
+    def scan(self):
+        # Exports whose size and mtime have not changed for settle_seconds. Files still
+        # being written (or copied in) keep resetting their timer.
+        now = time.monotonic()
+        present = set()
+        for watch_dir in self.watch_dirs:
+            if not os.path.isdir(watch_dir):
+                continue
+            for entry in os.scandir(watch_dir):
+                if not entry.is_file() or not any(pattern.search(entry.name) for pattern in EXPORT_PATTERNS):
+                    continue
+                stat = entry.stat()
+                present.add(entry.path)
+                previous = self.observed.get(entry.path)
+                if previous is None or previous[:2] != (stat.st_size, stat.st_mtime_ns):
+                    self.observed[entry.path] = (stat.st_size, stat.st_mtime_ns, now)
+
+        for path in set(self.observed) - present:
+            del self.observed[path]
+        return {path: observed[:2] for path, observed in self.observed.items()
+                if now - observed[2] >= self.settle_seconds}
+
+    async def digest(self, path, size, mtime_ns):
+        if (path, size, mtime_ns) not in self.digests:
+            self.digests[(path, size, mtime_ns)] = await asyncio.to_thread(file_digest, path)
+        return self.digests[(path, size, mtime_ns)]
+
+    async def plan_jobs(self, stable):
+        # Every report the stable exports can produce. A job is keyed by its report,
+        # output and input contents, so re-saved or duplicate drops map to the same job.
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Reports still waiting for their activities export are retried every poll
+            pairs = pair_snapshots([path for path in stable if not EXPIRING_PLANS_PATTERN.search(path)
+                                    and not PROFILES_PATTERN.search(path)])
+        profiles = sorted(path for path in stable if PROFILES_PATTERN.search(path))
+        plans = sorted(path for path in stable if EXPIRING_PLANS_PATTERN.search(path))
+
+        jobs = []
+        for pair in pairs:
+            for report in PAIR_REPORTS:
+                jobs.append((report, output_path_for(pair, self.output_dir, report), pair))
+            if profiles:
+                jobs.append((PROFILE_REPORT, output_path_for(pair, self.output_dir, PROFILE_REPORT),
+                             {**pair, 'profiles': profiles[0]}))
+        for path in plans[:1]:
+            jobs.append((EXPIRING_PLANS_REPORT, os.path.join(self.output_dir, EXPIRING_PLANS_REPORT),
+                         {'expiring_plans': path}))
+
+        planned = []
+        for report, output_path, inputs in jobs:
+            input_paths = sorted(value for value in inputs.values() if value in stable)
+            digests = [await self.digest(path, *stable[path]) for path in input_paths]
+            key = hashlib.sha256('|'.join([report, output_path, *digests]).encode()).hexdigest()[:16]
+            planned.append({'key': key, 'report': report, 'output_path': output_path, 'inputs': inputs,
+                            'chunksize': self.chunksize})
+        return planned
+
+    def is_done(self, job):
+        published = self.state['published'].get(job['output_path'])
+        return published is not None and published['key'] == job['key'] and os.path.exists(job['output_path'])
+
+    async def run_job(self, executor, job):
+        # Stage next to the destination so the final os.replace never crosses filesystems
+        directory, name = os.path.split(job['output_path'])
+        if job['report'] == EXPIRING_PLANS_REPORT:
+            job['staging_path'] = tempfile.mkdtemp(prefix=f'.{name}.', dir=directory)
+        else:
+            job['staging_path'] = os.path.join(directory, f'.{name}.{job["key"]}.tmp')
+
+        print(f"[{datetime.now():%H:%M:%S}] Building {os.path.basename(job['output_path'])}")
+        result = await asyncio.get_running_loop().run_in_executor(executor, run_ingest_job, job)
+
+        # Only the newest inputs for an output are published - a slower job for an
+        # export that has since been replaced is thrown away
+        if result['status'] == 'ok' and self.latest.get(job['output_path']) == job['key']:
+            publish(job['staging_path'], job['output_path'])
+            self.state['published'][job['output_path']] = {
+                'key': job['key'], 'report': job['report'], 'seconds': result['seconds'],
+                'published_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            self.save_state()
+            print(f"[{datetime.now():%H:%M:%S}] Published {job['output_path']} ({result['seconds']:.1f}s)")
+        else:
+            discard(job['staging_path'])
+            if result['status'] != 'ok':
+                self.failed.add(job['key'])
+                print(f"[{datetime.now():%H:%M:%S}] {os.path.basename(job['output_path'])}: {result['status']}")
+        return result
+
+    async def poll(self, executor):
+        # One pass: schedule every job that is not published, running or failed
+        stable = self.scan()
+        for job in await self.plan_jobs(stable):
+            if self.is_done(job) or job['key'] in self.running or job['key'] in self.failed:
+                continue
+            self.latest[job['output_path']] = job['key']
+            task = asyncio.create_task(self.run_job(executor, job))
+            self.running[job['key']] = task
+            task.add_done_callback(lambda _, key=job['key']: self.running.pop(key, None))
+        return stable
+
+    async def run(self, once=False):
+        # Watch until cancelled. once=True waits for the current exports to settle,
+        # builds everything they produce and returns.
+        os.makedirs(self.output_dir, exist_ok=True)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 max_tasks_per_child=TASKS_PER_WORKER) as executor:
+            print(f"Watching {', '.join(self.watch_dirs)} -> {self.output_dir} with {self.workers} workers")
+            while True:
+                stable = await self.poll(executor)
+                if once and not self.running and len(stable) == len(self.observed):
+                    return self.state['published']
+                await asyncio.sleep(self.poll_interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Watch the export folders and rebuild reports as exports land')
+    parser.add_argument('watch_dirs', nargs='*', default=list(DEFAULT_WATCH_DIRS))
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--settle-seconds', type=float, default=SETTLE_SECONDS)
+    parser.add_argument('--once', action='store_true', help='build the current exports and exit')
+    args = parser.parse_args()
+
+    daemon = IngestDaemon(args.watch_dirs, args.output_dir, workers=args.workers, chunksize=args.chunksize,
+                          poll_interval=args.poll_interval, settle_seconds=args.settle_seconds)
+    try:
+        asyncio.run(daemon.run(once=args.once))
+    except KeyboardInterrupt:
+        print("Stopped")
@@ -0,0 +1,138 @@
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+# Where stage metrics go: unset = off, '-' = stderr, anything else = a JSON lines file
+DEFAULT_SINK = os.environ.get('BANGCRM_INSTRUMENT', '')
+
+# Optional deeper profiling per stage: 'cprofile', 'tracemalloc' or both (comma separated)
+DEFAULT_PROFILE = os.environ.get('BANGCRM_PROFILE', '')
+
+# Functions listed per stage in cprofile mode
+PROFILE_TOP_FUNCTIONS = 10
+
+settings = {'sink': DEFAULT_SINK, 'profile': {mode for mode in DEFAULT_PROFILE.split(',') if mode}}
+active_runs = []
+
+
+def configure(sink=None, profile=None):
+    # Override the environment settings, e.g. configure(sink='stages.jsonl', profile='tracemalloc')
+    if sink is not None:
+        settings['sink'] = sink
+    if profile is not None:
+        settings['profile'] = {mode for mode in profile.split(',') if mode} if isinstance(profile, str) else set(profile)
+
+
+def enabled():
+    return bool(settings['sink'])
+
+
+def rss_mb():
+    # Current resident set size (Linux); None where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def emit(event):
+    line = json.dumps(event, default=str)
+    if settings['sink'] == '-':
+        print(line, file=sys.stderr)
+    else:
+        with open(settings['sink'], 'a') as f:
+            f.write(line + '\n')
+
+
+def top_functions(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+    functions = []
+    for (path, line, name), (_, calls, own, cumulative, _) in list(stats.stats.items()):
+        functions.append({'function': f'{os.path.basename(path)}:{line}({name})', 'calls': calls,
+                          'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)})
+    functions.sort(key=lambda entry: entry['cumulative_seconds'], reverse=True)
+    return functions[:limit]
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    # Measure one phase of the current run. The yielded dict can be filled in by the
+    # caller - rows_out plus any stage specific counts (e.g. match rates).
+    metrics = {'rows_in': rows_in}
+    if not enabled():
+        yield metrics
+        return
+
+    run = active_runs[-1] if active_runs else {'script': None, 'run_id': None, 'stages': []}
+    profiler = cProfile.Profile() if 'cprofile' in settings['profile'] else None
+    tracing = 'tracemalloc' in settings['profile']
+    if tracing:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        rss_after = rss_mb()
+
+        event = {'event': 'stage', 'script': run['script'], 'run_id': run['run_id'], 'stage': name,
+                 'seconds': round(seconds, 6), **metrics}
+        if rss_after is not None:
+            event['rss_mb'] = round(rss_after, 1)
+            event['rss_delta_mb'] = round(rss_after - rss_before, 1)
+        if tracing:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            event['traced_delta_mb'] = round((traced_after - traced_before) / 1024 / 1024, 2)
+            event['traced_peak_mb'] = round(traced_peak / 1024 / 1024, 2)
+        if profiler:
+            event['top_functions'] = top_functions(profiler)
+
+        run['stages'].append({'stage': name, 'seconds': event['seconds']})
+        emit(event)
+
+
+def instrumented(script):
+    # Decorator for a report entry point: groups its stages under one run ID and emits
+    # a run summary (total time and the slowest stage) when it returns
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return function(*args, **kwargs)
+
+            run = {'script': script, 'run_id': uuid.uuid4().hex[:12], 'stages': []}
+            active_runs.append(run)
+            started_at = datetime.now().isoformat(timespec='seconds')
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                active_runs.pop()
+                slowest = max(run['stages'], key=lambda entry: entry['seconds'], default=None)
+                emit({'event': 'run', 'script': script, 'run_id': run['run_id'],
+                      'started_at': started_at,
+                      'seconds': round(time.perf_counter() - start, 6),
+                      'stages': len(run['stages']),
+                      'slowest_stage': slowest['stage'] if slowest else None,
+                      'rss_mb': round(rss_mb(), 1) if rss_mb() is not None else None})
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Performance levels by revenue per attended class (README: Elite >= 250K, Premium >= 200K)
+TIER_THRESHOLDS = (('Elite', 250000), ('Premium', 200000))
+TIER_STANDARD = 'Standard'
+TIER_NEW = 'New'
+TIERS = [name for name, _ in TIER_THRESHOLDS] + [TIER_STANDARD, TIER_NEW]
+
+ProfileMetricsSummary = namedtuple('ProfileMetricsSummary', [
+    'customers', 'total_revenue', 'total_attended', 'revenue_per_class',
+    'average_revenue_per_customer', 'top_revenue_customer', 'top_revenue_per_class_customer',
+    'completion_rate', 'cancellation_rate', 'tier_counts',
+])
+
+
+def column_values(df, column, default=0):
+    # Plain float64 array for a numeric column - missing columns and values count as default
+    if column not in df.columns:
+        return np.full(len(df), float(default))
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=default)
+
+
+def safe_divide(numerator, denominator):
+    # Element-wise numerator / denominator, 0 where the denominator is 0
+    result = np.zeros(len(numerator))
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def performance_tiers(revenue_per_class, attended):
+    # README performance level per customer: New without attended classes, otherwise
+    # the first tier whose revenue-per-class threshold is reached
+    conditions = [attended <= 0] + [revenue_per_class >= threshold for _, threshold in TIER_THRESHOLDS]
+    choices = [TIER_NEW] + [name for name, _ in TIER_THRESHOLDS]
+    return np.select(conditions, choices, default=TIER_STANDARD)
+
+
+def compute_profile_metrics(df, name_column='CustomerName'):
+    # Per-customer revenue per class, completion/cancellation rates and performance tier
+    # in one vectorized pass, plus a summary of the whole report. Returns (metrics, summary)
+    # where metrics is aligned with df's index.
+    spent = column_values(df, 'Profile Total Spent')
+    attended = column_values(df, 'Profile Total Attended')
+    completed = column_values(df, 'Completed')
+    cancelled = column_values(df, 'Cancelled')
+
+    # Total Booking also counts no-shows and waitlist outcomes; reports that dropped
+    # it fall back to the bookings that were either completed or cancelled
+    if 'Total Booking' in df.columns:
+        bookings = column_values(df, 'Total Booking')
+    else:
+        bookings = completed + cancelled
+
+    revenue_per_class = safe_divide(spent, attended)
+    completion_rate = safe_divide(completed, bookings)
+    cancellation_rate = safe_divide(cancelled, bookings)
+
+    tier = performance_tiers(revenue_per_class, attended)
+
+    metrics = pd.DataFrame({
+        'Revenue per Class': revenue_per_class,
+        'Completion Rate': completion_rate,
+        'Cancellation Rate': cancellation_rate,
+        'Performance Tier': pd.Categorical(tier, categories=TIERS),
+    }, index=df.index)
+
+    names = df[name_column].to_numpy() if name_column in df.columns else np.full(len(df), None)
+    total_revenue = spent.sum()
+    total_attended = attended.sum()
+    total_bookings = bookings.sum()
+    tier_names, tier_totals = np.unique(tier, return_counts=True)
+
+    summary = ProfileMetricsSummary(
+        customers=len(df),
+        total_revenue=float(total_revenue),
+        total_attended=int(total_attended),
+        revenue_per_class=float(total_revenue / total_attended) if total_attended > 0 else 0.0,
+        average_revenue_per_customer=float(revenue_per_class.mean()) if len(df) else 0.0,
+        top_revenue_customer=names[spent.argmax()] if len(df) else None,
+        top_revenue_per_class_customer=names[revenue_per_class.argmax()] if len(df) else None,
+        completion_rate=float(completed.sum() / total_bookings) if total_bookings > 0 else 0.0,
+        cancellation_rate=float(cancelled.sum() / total_bookings) if total_bookings > 0 else 0.0,
+        tier_counts={name: int(tier_totals[tier_names == name].sum()) for name in TIERS},
+    )
+
+    return metrics, summary
+
+
+def format_summary(summary):
+    # Human readable lines for the console summary
+    tiers = ', '.join(f'{name}: {count}' for name, count in summary.tier_counts.items())
+    return [
+        f"Total Customers: {summary.customers}",
+        f"Total Revenue: {summary.total_revenue:,.2f}",
+        f"Total Classes Attended: {summary.total_attended}",
+        f"Overall Average Revenue per Class: {summary.revenue_per_class:.2f}",
+        f"Average Revenue per Customer: {summary.average_revenue_per_customer:.2f}",
+        f"Highest Revenue Customer: {summary.top_revenue_customer}",
+        f"Highest Revenue per Class: {summary.top_revenue_per_class_customer}",
+        f"Completion Rate: {summary.completion_rate:.1%}",
+        f"Cancellation Rate: {summary.cancellation_rate:.1%}",
+        f"Performance Tiers: {tiers}",
+    ]
@@ -0,0 +1,71 @@
+import clean_profile_report as clean_report
+import consolidate_profile_customers as consolidate_profiles
+import simplify_profile_report as simplify_report
+from column_plan import plan_usecols, required_columns
+from consolidate_profile_customers import create_profile_consolidated_report
+from identity_index import DEFAULT_INDEX_PATH
+from report_writer import PAGE_FORMATS
+from clean_profile_report import clean_profile_report
+from simplify_profile_report import simplify_profile_report
+
+# Only the source columns that survive into simplified_customer_profiles.csv (plus the
+# email keys used for matching and Total Booking for the booking rates) are parsed -
+# planned backwards from simplify's output through clean's renames to the exports
+PROFILE_PIPELINE_USECOLS = plan_usecols(
+    required_columns(required_columns(simplify_report.FINAL_COLUMNS + simplify_report.METRIC_COLUMNS,
+                                      simplify_report.INPUT_SOURCES),
+                     clean_report.INPUT_SOURCES),
+    consolidate_profiles.EXPORTS,
+    derived=consolidate_profiles.OUTPUT_SOURCES,
+    keys=consolidate_profiles.MATCH_KEYS)
+
+
+def run_profile_report_pipeline(profiles_path='customer_profiles.csv',
+                                customer_report_path='customer_report_20240101.csv',
+                                activities_report_path='customers_activities_20231231to20241231.csv',
+                                output_path='simplified_customer_profiles.csv',
+                                keep_intermediate=False,
+                                chunksize=None,
+                                feed_path=None,
+                                index_path=DEFAULT_INDEX_PATH,
+                                output_formats=PAGE_FORMATS):
+    # Run consolidate -> clean -> simplify as in-memory steps. Intermediate CSVs are
+    # only written when keep_intermediate is set, in which case each step's own
+    # columns are loaded so they match the files produced by the standalone scripts.
+    if keep_intermediate:
+        usecols = None
+        consolidated_path = 'consolidated_customer_profiles_report.csv'
+        clean_path = 'consolidated_customer_profiles_clean.csv'
+    else:
+        usecols = PROFILE_PIPELINE_USECOLS
+        consolidated_path = None
+        clean_path = None
+
+    df_consolidated = create_profile_consolidated_report(
+        chunksize=chunksize,
+        profiles_path=profiles_path,
+        customer_report_path=customer_report_path,
+        activities_report_path=activities_report_path,
+        output_path=consolidated_path,
+        usecols=usecols,
+        index_path=index_path)
+    if df_consolidated is None:
+        return None
+
+    df_clean = clean_profile_report(df=df_consolidated, output_path=clean_path)
+    if df_clean is None:
+        return None
+
+    return simplify_profile_report(df=df_clean, output_path=output_path, feed_path=feed_path,
+                                   output_formats=output_formats)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from dashboard_feed import DEFAULT_FEED_PATH
+
+    # Pass --keep-intermediate to also write the consolidated and clean CSVs, and
+    # --feed to publish the profiles to the dashboard feed
+    run_profile_report_pipeline(keep_intermediate='--keep-intermediate' in sys.argv,
+                                feed_path=DEFAULT_FEED_PATH if '--feed' in sys.argv else None)
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from export_cache import HAS_PYARROW
+
+# Name similarity (bigram Dice, 0..1) needed to link two records
+DEFAULT_THRESHOLD = 0.85
+
+# Lower bar for pairs that also share a phone suffix - the number already points at
+# the same person, the name only has to agree loosely
+PHONE_THRESHOLD = 0.6
+
+# Which blocking keys generate candidate pairs (see blocking_keys)
+BLOCKING_KEYS = ('phone', 'email', 'initials')
+
+# Blocks that would produce more pairs than this are skipped - they are too common to
+# say anything (e.g. a shared placeholder number) and would make linkage quadratic
+MAX_BLOCK_PAIRS = 2500
+
+PHONE_SUFFIX_DIGITS = 7
+EMAIL_PREFIX_CHARS = 4
+
+# Arrow-backed strings run the slicing and regex work below in compiled code
+TEXT_DTYPE = 'string[pyarrow]' if HAS_PYARROW else 'string'
+
+
+def squash_names(names):
+    # Lower case, letters and digits only, single spaces: "CHRISTO  MUALIM" and
+    # "Christo Mualim" agree, "Jeje ." becomes "jeje"
+    names = names.astype(TEXT_DTYPE).str.lower().str.replace(r'[^\w\s]|_', ' ', regex=True)
+    names = names.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return names.where(names != '')
+
+
+def blocking_keys(names, emails=None, phones=None, keys=BLOCKING_KEYS):
+    # One column per blocking key; rows without the underlying field get no key
+    blocks = pd.DataFrame(index=names.index)
+    if 'phone' in keys and phones is not None:
+        phones = phones.astype(TEXT_DTYPE)
+        blocks['phone'] = phones.str[-PHONE_SUFFIX_DIGITS:].where(phones.str.len() > PHONE_SUFFIX_DIGITS)
+    if 'email' in keys and emails is not None:
+        emails = emails.astype(TEXT_DTYPE)
+        # Domain plus the start of the local part: "rina.s@mail.com" -> "mail.com:rina"
+        blocks['email'] = emails.str.replace(rf'^([^@]{{0,{EMAIL_PREFIX_CHARS}}})[^@]*@(.+)$', r'\2:\1',
+                                             regex=True).where(emails.str.match(r'[^@]*@.'))
+    if 'initials' in keys:
+        # First three letters of the first word, first letter of the last word
+        first = names.str.replace(r'^(\S{0,3}).*$', r'\1', regex=True)
+        last = names.str.replace(r'^(?:.*\s)?(\S)\S*$', r'\1', regex=True)
+        blocks['initials'] = first + ':' + last
+    return blocks
+
+
+def candidate_pairs(left_blocks, right_blocks, max_block_pairs=MAX_BLOCK_PAIRS):
+    # Every (left, right) row pair sharing at least one block, with the blocks they
+    # share. Work is proportional to the pairs inside blocks, not len(left) * len(right).
+    pairs = []
+    skipped = 0
+    for key in left_blocks.columns.intersection(right_blocks.columns):
+        left = left_blocks[key].dropna().rename('block').rename_axis('left').reset_index()
+        right = right_blocks[key].dropna().rename('block').rename_axis('right').reset_index()
+        sizes = left['block'].value_counts().mul(right['block'].value_counts(), fill_value=0)
+        oversized = sizes.index[sizes > max_block_pairs]
+        skipped += len(oversized)
+        left = left[~left['block'].isin(oversized)]
+        pairs.append(left.merge(right, on='block')[['left', 'right']].assign(key=key))
+
+    if not pairs:
+        return pd.DataFrame(columns=['left', 'right', 'blocks']), skipped
+    # One row per pair, with the shared blocks listed as e.g. "email,initials"
+    shared = (pd.concat(pairs, ignore_index=True).drop_duplicates().assign(hit=True)
+              .set_index(['left', 'right', 'key'])['hit'].unstack(fill_value=False))
+    blocks = pd.Series('', index=shared.index)
+    for key in sorted(shared.columns):
+        blocks = blocks + np.where(shared[key], key + ',', '')
+    return blocks.str.rstrip(',').rename('blocks').reset_index(), skipped
+
+
+def bigram_counts(names):
+    # Sorted (name, bigram) keys with their counts for padded names - " ab " gives
+    # " a", "ab", "b " - built one character offset at a time. A key is
+    # name * vocabulary + bigram, so name and bigram can be recovered with divmod.
+    padded = (' ' + names.fillna('') + ' ').reset_index(drop=True)
+    totals = np.maximum(padded.str.len().to_numpy(dtype=np.int64) - 1, 0)
+    rows, bigrams = [np.array([], dtype=np.int64)], [np.array([], dtype=object)]
+    for start in range(int(totals.max(initial=0))):
+        offset_rows = np.flatnonzero(totals > start)
+        rows.append(offset_rows)
+        bigrams.append(padded.iloc[offset_rows].str[start:start + 2].to_numpy(dtype=object))
+    codes, vocabulary = pd.factorize(np.concatenate(bigrams))
+    keys, counts = np.unique(np.concatenate(rows) * max(len(vocabulary), 1) + codes, return_counts=True)
+    return keys, counts, max(len(vocabulary), 1), totals
+
+
+def shared_bigrams(left_codes, right_codes, keys, counts, vocabulary_size):
+    # Bigrams two names have in common (with multiplicity) for each (left, right) pair:
+    # every bigram of the left name is looked up among the right name's sorted keys
+    names = keys // vocabulary_size
+    starts = np.searchsorted(names, left_codes)
+    lengths = np.searchsorted(names, left_codes, side='right') - starts
+    pair = np.repeat(np.arange(len(left_codes)), lengths)
+    position = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    wanted = right_codes[pair] * vocabulary_size + keys[position] % vocabulary_size
+    found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    hit = keys[found] == wanted
+    return np.bincount(pair[hit], np.minimum(counts[position[hit]], counts[found[hit]]),
+                       minlength=len(left_codes))
+
+
+def name_similarity(left_names, right_names):
+    # Bigram Dice coefficient for aligned name pairs: 2 * shared bigrams / all bigrams.
+    # Scoring is sorted-array lookups - no Python loop over pairs.
+    codes, uniques = pd.factorize(pd.concat([left_names, right_names], ignore_index=True))
+    keys, counts, vocabulary_size, totals = bigram_counts(pd.Series(uniques, dtype=TEXT_DTYPE))
+
+    # Each distinct name pair is scored once; missing names never match
+    pairs = codes[:len(left_names)].astype(np.int64) * (len(uniques) + 1) + codes[len(left_names):]
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    left_codes, right_codes = np.divmod(unique_pairs, len(uniques) + 1)
+    scored = (left_codes >= 0) & (right_codes >= 0) & (right_codes < len(uniques))
+
+    similarity = np.zeros(len(unique_pairs))
+    common = shared_bigrams(left_codes[scored], right_codes[scored], keys, counts, vocabulary_size)
+    denominator = totals[left_codes[scored]] + totals[right_codes[scored]]
+    similarity[scored] = np.divide(2 * common, denominator, out=np.zeros(len(common)), where=denominator > 0)
+    return similarity[inverse]
+
+
+def link_records(left, right, threshold=DEFAULT_THRESHOLD, phone_threshold=PHONE_THRESHOLD,
+                 keys=BLOCKING_KEYS, max_block_pairs=MAX_BLOCK_PAIRS):
+    # Link records of two exports that name the same customer differently. left and
+    # right need 'name' and optionally 'email'/'phone' columns, the latter already
+    # canonical (normalize_emails / normalize_phones). Returns one row per link (left
+    # index, right index, confidence, shared blocks) - each record is linked at most
+    # once, best confidence first - and a dict of linkage counts.
+    prepared = {}
+    for side, df in (('left', left), ('right', right)):
+        names = squash_names(df['name'])
+        prepared[side] = (names, blocking_keys(names, df.get('email'), df.get('phone'), keys))
+
+    pairs, skipped = candidate_pairs(prepared['left'][1], prepared['right'][1], max_block_pairs)
+    pairs['confidence'] = name_similarity(prepared['left'][0].loc[pairs['left']].reset_index(drop=True),
+                                          prepared['right'][0].loc[pairs['right']].reset_index(drop=True))
+
+    same_phone = pairs['blocks'].str.contains('phone', regex=False)
+    accepted = pairs[(pairs['confidence'] >= threshold) | (same_phone & (pairs['confidence'] >= phone_threshold))]
+    links = (accepted.sort_values('confidence', ascending=False, kind='stable')
+             .drop_duplicates(subset=['left'], keep='first')
+             .drop_duplicates(subset=['right'], keep='first')
+             .reset_index(drop=True))
+
+    stats = {
+        'candidates': len(pairs),
+        'links': len(links),
+        'skipped_blocks': skipped,
+        'mean_confidence': round(float(links['confidence'].mean()), 4) if len(links) else None,
+    }
+    return links, stats
+
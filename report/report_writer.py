@@ -0,0 +1,241 @@
+import csv
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from export_cache import HAS_PYARROW
+
+# Extra formats written next to every report - none unless asked for, e.g. with
+# BANGCRM_OUTPUT_FORMATS=parquet,xlsx
+DEFAULT_FORMATS = tuple(fmt for fmt in os.environ.get('BANGCRM_OUTPUT_FORMATS', '').split(',') if fmt)
+
+# The dashboard pages' "Download Excel" serves the .xlsx twin of the report they show,
+# so the reports behind the pages are written with it by default
+PAGE_FORMATS = tuple(dict.fromkeys(DEFAULT_FORMATS + ('xlsx',)))
+
+# Rows formatted per CSV chunk, and threads formatting chunks at once. The pyarrow
+# formatting kernels release the GIL, so chunks are formatted in parallel.
+CSV_CHUNK_ROWS = 100_000
+CSV_WORKERS = min(4, os.cpu_count() or 1)
+
+PARQUET_COMPRESSION = 'zstd'
+
+# Excel's sheet size limit (header row included)
+XLSX_MAX_ROWS = 1_048_576
+
+# Arrow-backed strings keep the per-cell markup concatenation in compiled code
+XLSX_TEXT = 'string[pyarrow]' if HAS_PYARROW else 'string'
+
+# Characters XML 1.0 cannot carry at all - Excel refuses workbooks containing them
+XML_ILLEGAL = r'[\x00-\x08\x0b\x0c\x0e-\x1f]'
+
+
+def integral_floats(df):
+    # Float columns whose values are all whole numbers become nullable ints, so they
+    # are written as 402 rather than 402.0
+    converted = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values.dtype):
+            finite = values.dropna().to_numpy(dtype='float64')
+            if np.isfinite(finite).all() and (finite == np.round(finite)).all() \
+                    and (np.abs(finite) < 2 ** 53).all():
+                converted[column] = 'Int64'
+    return df.astype(converted) if converted else df
+
+
+def csv_header(columns):
+    # Header quoted the way to_csv quotes it ('Count of "1 Free Class Pass"')
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(columns)
+    return buffer.getvalue()
+
+
+def arrow_cells(values):
+    # One column as CSV cell text: whole numbers without '.0' (402), other numbers in
+    # shortest form (239303.33), booleans as True/False like to_csv, and text quoted
+    # only when it holds a comma, quote or newline
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pd.api.types.is_bool_dtype(values.dtype):
+        values = values.map({True: 'True', False: 'False'}, na_action='ignore').astype('string')
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed object columns such as day counts with 'N/A'
+        array = pa.array(values.map(str, na_action='ignore'), from_pandas=True, type=pa.string())
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if pa.types.is_dictionary(array.type):
+        array = array.dictionary_decode()
+    if pa.types.is_large_string(array.type):
+        array = array.cast(pa.string())
+    if not (pa.types.is_string(array.type) or pa.types.is_integer(array.type) or pa.types.is_floating(array.type)):
+        # Dates and anything else are written as pandas renders them
+        array = pa.array(values.astype('string'), from_pandas=True, type=pa.string())
+    if pa.types.is_floating(array.type):
+        # Whole numbers as integers (arrow would write 81222787887.0 as 8.1222787887e+10)
+        whole = pc.and_(pc.equal(pc.round(array), array), pc.less(pc.abs(array), 2 ** 53))
+        integers = pc.cast(pc.if_else(whole, array, 0), pa.int64()).cast(pa.string())
+        array = pc.if_else(whole, integers, array.cast(pa.string()))
+    if pa.types.is_string(array.type):
+        quoted = pc.binary_join_element_wise('"', pc.replace_substring(array, '"', '""'), '"', '')
+        array = pc.if_else(pc.match_substring_regex(array, '[,"\r\n]'), quoted, array)
+    return pc.fill_null(array.cast(pa.string()), '')
+
+
+def format_csv_chunk(chunk):
+    # CSV text (without header) for one chunk of rows
+    if not HAS_PYARROW:
+        return integral_floats(chunk).to_csv(index=False, header=False).encode('utf-8')
+
+    import pyarrow.compute as pc
+
+    cells = [arrow_cells(chunk[column]) for column in chunk.columns]
+    lines = pc.binary_join_element_wise(pc.binary_join_element_wise(*cells, ','), '', '\n')
+    # The value buffer of a string array is every line back to back
+    offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32)[lines.offset:lines.offset + len(lines) + 1]
+    return memoryview(lines.buffers()[2])[offsets[0]:offsets[-1]].tobytes()
+
+
+def write_csv(df, path, chunk_rows=CSV_CHUNK_ROWS, workers=CSV_WORKERS):
+    # Same layout as df.to_csv(path, index=False), with whole-number floats written as
+    # integers. Chunks are formatted on a thread pool and written in order.
+    starts = range(0, len(df), chunk_rows)
+    with open(path, 'wb') as f:
+        f.write(csv_header(list(df.columns)).encode('utf-8'))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for text in pool.map(lambda start: format_csv_chunk(df.iloc[start:start + chunk_rows]), starts):
+                f.write(text)
+
+
+def write_parquet(df, path):
+    if not HAS_PYARROW:
+        raise ImportError('parquet output needs pyarrow')
+    import pyarrow as pa
+
+    # Mixed object columns (day counts with 'N/A') are stored as the text the CSV shows
+    mixed = {}
+    for column in df.columns:
+        if df[column].dtype == object:
+            try:
+                pa.array(df[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                mixed[column] = 'string'
+    df = df.astype(mixed) if mixed else df
+    df.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+
+
+def xlsx_column_name(position):
+    name = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def xlsx_cells(values):
+    # One column as sheet cells: numbers stay numeric, everything else is inline text
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numbers = values.astype('Float64')
+        text = numbers.astype(XLSX_TEXT).where(np.isfinite(numbers.fillna(0).to_numpy(dtype='float64')))
+        return ('<c><v>' + text + '</v></c>').fillna('<c/>')
+    text = values.astype(XLSX_TEXT).str.replace(XML_ILLEGAL, '', regex=True)
+    text = text.str.replace('&', '&amp;', regex=False).str.replace('<', '&lt;', regex=False) \
+        .str.replace('>', '&gt;', regex=False)
+    return ('<c t="inlineStr"><is><t xml:space="preserve">' + text + '</t></is></c>').fillna('<c/>')
+
+
+def write_xlsx(df, path, sheet_name='Report'):
+    # A real .xlsx workbook (one sheet, frozen header row, filter on every column)
+    # built with the standard library - the pages' "Excel" download is a CSV with a BOM
+    if len(df) + 1 > XLSX_MAX_ROWS:
+        raise ValueError(f'{len(df)} rows do not fit in one Excel sheet')
+
+    header = ''.join(f'<c t="inlineStr"><is><t>{escape(str(column))}</t></is></c>' for column in df.columns)
+    rows = pd.Series('<row>', index=df.index, dtype=XLSX_TEXT)
+    for column in df.columns:
+        rows = rows + xlsx_cells(df[column])
+    last_cell = f'{xlsx_column_name(max(len(df.columns) - 1, 0))}{len(df) + 1}'
+    sheet = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        '</sheetView></sheetViews>'
+        f'<sheetData><row>{header}</row>' + '</row>'.join(rows.tolist()) + ('</row>' if len(rows) else '') +
+        f'</sheetData><autoFilter ref="A1:{last_cell}"/></worksheet>'
+    )
+    parts = {
+        '[Content_Types].xml':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>',
+        '_rels/.rels':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>',
+        'xl/workbook.xml':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        'xl/_rels/workbook.xml.rels':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+            '</Relationships>',
+        'xl/worksheets/sheet1.xml': sheet,
+    }
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in parts.items():
+            workbook.writestr(name, content)
+
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'xlsx': write_xlsx,
+}
+
+
+def write_report(df, output_path, formats=DEFAULT_FORMATS):
+    # Write a finished report to output_path (format from its extension, CSV when
+    # unknown) plus one sibling file per extra format. Every file is written to a temp
+    # name and swapped in, so readers never see a partial report.
+    base, extension = os.path.splitext(output_path)
+    targets = {output_path: extension.lstrip('.') if extension.lstrip('.') in WRITERS else 'csv'}
+    for fmt in formats or ():
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown output format {fmt!r} (expected one of {', '.join(WRITERS)})")
+        if fmt == 'xlsx' and len(df) + 1 > XLSX_MAX_ROWS:
+            # Too big for one sheet - the CSV (and any other format) is still written
+            print(f"Skipped {base}.xlsx: {len(df)} rows do not fit in one Excel sheet")
+            continue
+        targets.setdefault(f'{base}.{fmt}', fmt)
+
+    for path, fmt in targets.items():
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            WRITERS[fmt](df, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return list(targets)
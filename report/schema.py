@@ -0,0 +1,152 @@
+import pandas as pd
+
+from export_cache import HAS_PYARROW, cached_read_csv
+
+# Compact dtypes for every known CRM export. Phones stay strings so they never
+# come back float-mangled (62.0, 811709799.0), low-cardinality labels are
+# categoricals, and counts/day offsets are nullable small ints.
+TEXT = 'string'
+LABEL = 'category'
+COUNT = 'Int32'
+DAYS = 'Int16'
+FLAG = 'boolean'
+AMOUNT = 'float64'
+
+CUSTOMER_REPORT_DTYPES = {
+    'CustomerName': TEXT,
+    'MobileCode': TEXT,
+    'Mobile': TEXT,
+    'Email': TEXT,
+    'DateOfBirth': TEXT,
+    'Gender': LABEL,
+    'AddressLine1': TEXT,
+    'AddressLine2': TEXT,
+    'City': TEXT,
+    'State': TEXT,
+    'PostalCode': TEXT,
+    'Country': LABEL,
+    'Group': LABEL,
+    'Tag': TEXT,
+    'Membership': LABEL,
+    'JoinedDate': TEXT,
+    'Channel': LABEL,
+    'Status': LABEL,
+    'Completed': COUNT,
+    'Booked': COUNT,
+    'No Show': COUNT,
+    'Cancelled': COUNT,
+    'Late Cancelled': COUNT,
+    'Waitlist Cancelled': COUNT,
+    'Waitlist Expired': COUNT,
+    'Total Booking': COUNT,
+}
+
+ACTIVITIES_DTYPES = {
+    'Customer': TEXT,
+    'Date joined': TEXT,
+    'Days since first joined': DAYS,
+    'Days since last class': DAYS,
+    'Days since last appointment': DAYS,
+    'Days since outlet access': DAYS,
+    'Days since package purchase': DAYS,
+    'Days since membership purchase': DAYS,
+    'Days since drop in purchase': DAYS,
+    'Days since course purchase': DAYS,
+    'Days since member': DAYS,
+    'Days since non member': DAYS,
+    'Days since lost member': DAYS,
+    'Total class completed': COUNT,
+    'Total appointment completed': COUNT,
+    'Total outlet access completed': COUNT,
+    'Total courses completed': COUNT,
+    'Total spending amount': AMOUNT,
+    'Email': TEXT,
+    'Mobile': TEXT,
+}
+
+PROFILES_DTYPES = {
+    'customerId': TEXT,
+    'name': TEXT,
+    'profileImageUrl': TEXT,
+    'joinedOn': TEXT,
+    'membership': LABEL,
+    'telephone': TEXT,
+    'email': TEXT,
+    'isEmailVerified': FLAG,
+    'status': LABEL,
+    'suspendReason': TEXT,
+    'totalSpendedAmount': AMOUNT,
+    'totalBooking': COUNT,
+    'totalAttendedClass': COUNT,
+    'parentUserId': TEXT,
+    'isChild': FLAG,
+}
+
+EXPIRING_PLANS_DTYPES = {
+    'Type': LABEL,
+    'Plan Name': LABEL,
+    'Total Credits': COUNT,
+    'Remaining Credits': COUNT,
+    'Purchased Date': TEXT,
+    'Start Date': TEXT,
+    'End Date': TEXT,
+    'First Name': TEXT,
+    'Last Name': TEXT,
+    'Mobile': TEXT,
+    'Email': TEXT,
+    'First Class': TEXT,
+    'Last Class': TEXT,
+    'Last Class Staff': LABEL,
+    'Last Class Name': LABEL,
+}
+
+# Columns added by the profile consolidation and renamed by clean_profile_report
+PROFILE_REPORT_DTYPES = {
+    'profile_name': TEXT,
+    'profile_joinedOn': TEXT,
+    'profile_totalSpendedAmount': AMOUNT,
+    'profile_totalBooking': COUNT,
+    'profile_totalAttendedClass': COUNT,
+    'Profile Total Spent': AMOUNT,
+    'Profile Total Bookings': COUNT,
+    'Profile Total Attended': COUNT,
+    'Average Revenue': AMOUNT,
+}
+
+# Column names are shared across exports with the same meaning, so one map covers
+# the raw exports and every intermediate report read back from disk
+COLUMN_DTYPES = {
+    **CUSTOMER_REPORT_DTYPES,
+    **ACTIVITIES_DTYPES,
+    **PROFILES_DTYPES,
+    **EXPIRING_PLANS_DTYPES,
+    **PROFILE_REPORT_DTYPES,
+}
+
+
+def read_typed_csv(path, dtype=COLUMN_DTYPES, usecols=None, **read_kwargs):
+    # The C parser converts nullable ints slowly, so the multithreaded pyarrow parser
+    # is used whenever it is installed. Text columns are pinned to strings up front -
+    # pandas' pyarrow engine would otherwise turn ISO dates into timestamps first.
+    # Planned columns that an export does not have are skipped rather than an error
+    header = pd.read_csv(path, nrows=0).columns
+    columns = [col for col in header if usecols is None or col in usecols]
+    if not HAS_PYARROW or read_kwargs:
+        return pd.read_csv(path, dtype=dtype, usecols=columns if usecols is not None else None, **read_kwargs)
+
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    convert_options = pa_csv.ConvertOptions(
+        column_types={col: pa.string() for col in columns if dtype.get(col) in (TEXT, LABEL)},
+        include_columns=columns,
+        strings_can_be_null=True,
+    )
+    df = pa_csv.read_csv(path, convert_options=convert_options).to_pandas()
+    return df.astype({col: kind for col, kind in dtype.items() if col in df.columns})
+
+
+def load_export(path, prepare=None, **read_kwargs):
+    # Read any CRM export or report with the shared dtypes (through the export cache)
+    read_kwargs.setdefault('dtype', COLUMN_DTYPES)
+    return cached_read_csv(path, prepare=prepare, reader=read_typed_csv, **read_kwargs)
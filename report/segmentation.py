@@ -0,0 +1,267 @@
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import DORMANT_DAYS
+from dashboard_feed import DEFAULT_FEED_PATH, publish_dataset
+from profile_metrics import TIERS, column_values, performance_tiers, safe_divide
+from report_writer import DEFAULT_FORMATS, write_report
+from schema import load_export
+from snapshot_store import DEFAULT_STORE_DIR, partition_path, read_partition, snapshot_dates, write_partition
+
+# Source columns per RFM input, first present one wins: consolidated customer report
+# (and snapshot store) columns first, then the profile report's
+RFM_SOURCES = {
+    'recency': ['Days from Last Completed Class', 'Days since last class'],
+    'frequency': ['Number of Completed Classes', 'Total class completed', 'Completed'],
+    'monetary': ['Revenue', 'Total spending amount', 'Profile Total Spent'],
+    'joined': ['Date Joined', 'JoinedDate'],
+}
+NAME_COLUMNS = ['Name', 'CustomerName']
+
+# Scores run 1..SCORE_BINS, higher is better (more recent, more classes, more revenue)
+SCORE_BINS = 5
+
+# Join dates as the exports write them, with the length of the date part: customer
+# reports use "30/08/25 10:35", activity exports "01 Aug 2024"
+JOINED_FORMATS = (('%d/%m/%y', 8), ('%d %b %Y', 11))
+COHORT_UNKNOWN = 'Unknown'
+
+SEGMENTS = ['Champions', 'Loyal', 'New', 'Promising', 'At Risk', 'Hibernating']
+
+SEGMENT_COLUMNS = [
+    'customer_id', 'Name', 'Email', 'Cohort', 'Recency', 'Frequency', 'Monetary', 'Revenue per Class',
+    'R Score', 'F Score', 'M Score', 'RFM Score', 'Segment', 'Performance Tier',
+    'Revenue Rank', 'Revenue per Class Rank',
+]
+
+# Bump whenever scoring or the segment columns change - segments stored by an older
+# version live under another table name, are recomputed from the metrics once and
+# their old table is removed by segment_snapshots
+SEGMENTS_FORMAT_VERSION = 2
+SEGMENTS_TABLE = f'segments_v{SEGMENTS_FORMAT_VERSION}'
+
+# Segments already loaded in this process, by (store directory, snapshot date)
+loaded_segments = {}
+
+
+def source_values(df, field, default=np.nan):
+    # float64 values of the first source column of an RFM input the report has
+    for column in RFM_SOURCES[field]:
+        if column in df.columns:
+            return column_values(df, column, default=default)
+    return np.full(len(df), float(default))
+
+
+def first_column(df, columns):
+    for column in columns:
+        if column in df.columns:
+            return df[column]
+    return pd.Series(pd.NA, index=df.index, dtype='string')
+
+
+def quantile_scores(values, bins=SCORE_BINS, higher_is_better=True):
+    # Quantile bin (1..bins) of every value among the non-missing ones, from percentile
+    # ranks. Tied values share the score of the lowest of their positions, so a large
+    # block of customers with a single class stays at the bottom. Missing values score 1.
+    ranks = pd.Series(values).rank(method='min', ascending=higher_is_better, pct=True).to_numpy()
+    scores = np.clip(np.ceil(np.nan_to_num(ranks, nan=0.0) * bins), 1, bins)
+    return scores.astype(np.int8)
+
+
+def rfm_segments(r_score, f_score, m_score):
+    # Named segment per customer, first matching rule wins (rules follow SEGMENTS)
+    return np.select(
+        [
+            (r_score >= 4) & (f_score >= 4) & (m_score >= 4),
+            (r_score >= 3) & (f_score >= 4),
+            (r_score >= 4) & (f_score <= 2),
+            r_score >= 3,
+            f_score >= 3,
+        ],
+        SEGMENTS[:-1],
+        default=SEGMENTS[-1],
+    )
+
+
+def join_cohorts(joined):
+    # Join month (YYYY-MM) from any of the JOINED_FORMATS, COHORT_UNKNOWN when missing
+    joined = joined.astype('string').str.strip()
+    dates = pd.Series(pd.NaT, index=joined.index, dtype='datetime64[ns]')
+    for date_format, length in JOINED_FORMATS:
+        dates = dates.fillna(pd.to_datetime(joined.str[:length], format=date_format, errors='coerce'))
+    return dates.dt.strftime('%Y-%m').astype('string').fillna(COHORT_UNKNOWN)
+
+
+def segment_customers(df, bins=SCORE_BINS):
+    # RFM scores, segment, performance tier and join cohort for every customer of a
+    # consolidated report (or profile report) in one vectorized pass. Rows come back
+    # ordered by total revenue, so top-N views are a head() instead of a sort.
+    # A customer with several report rows is scored on their first one.
+    if 'customer_id' in df.columns:
+        df = df[~(df['customer_id'].duplicated() & df['customer_id'].notna())]
+    recency = source_values(df, 'recency')
+    frequency = source_values(df, 'frequency', default=0)
+    monetary = source_values(df, 'monetary', default=0)
+    revenue_per_class = safe_divide(monetary, frequency)
+
+    r_score = quantile_scores(recency, bins, higher_is_better=False)
+    f_score = quantile_scores(frequency, bins)
+    m_score = quantile_scores(monetary, bins)
+
+    segments = pd.DataFrame({
+        'customer_id': df['customer_id'].to_numpy() if 'customer_id' in df.columns else pd.NA,
+        'Name': first_column(df, NAME_COLUMNS),
+        'Email': first_column(df, ['Email']),
+        'Cohort': join_cohorts(first_column(df, RFM_SOURCES['joined'])),
+        'Recency': pd.array(recency, dtype='Float64'),
+        'Frequency': frequency,
+        'Monetary': monetary,
+        'Revenue per Class': revenue_per_class.round(2),
+        'R Score': r_score,
+        'F Score': f_score,
+        'M Score': m_score,
+        'RFM Score': pd.Series(r_score.astype(np.int16) * 100 + f_score * 10 + m_score,
+                               index=df.index).astype('string'),
+        'Segment': pd.Categorical(rfm_segments(r_score, f_score, m_score), categories=SEGMENTS),
+        'Performance Tier': pd.Categorical(performance_tiers(revenue_per_class, frequency), categories=TIERS),
+    }, index=df.index)
+    segments['Revenue Rank'] = segments['Monetary'].rank(method='first', ascending=False).astype('int64')
+    segments['Revenue per Class Rank'] = segments['Revenue per Class'].rank(method='first',
+                                                                           ascending=False).astype('int64')
+    return segments.sort_values('Revenue Rank')[SEGMENT_COLUMNS].reset_index(drop=True)
+
+
+def cohort_summary(segments):
+    # One row per join month: customers, how many attended within DORMANT_DAYS,
+    # revenue, and the customers in each segment
+    active = (segments['Recency'] < DORMANT_DAYS).fillna(False)
+    grouped = segments.assign(active=active).groupby('Cohort', sort=True, observed=True)
+    summary = pd.DataFrame({
+        'Customers': grouped.size(),
+        'Active': grouped['active'].sum(),
+        'Revenue': grouped['Monetary'].sum(),
+        'Average Revenue per Customer': grouped['Monetary'].mean().round(2),
+    })
+    summary['Active Share'] = (summary['Active'] / summary['Customers']).round(4)
+    counts = pd.crosstab(segments['Cohort'], segments['Segment']).reindex(columns=SEGMENTS, fill_value=0)
+    return summary.join(counts).reset_index()
+
+
+def snapshot_segments(snapshot_date=None, store_dir=DEFAULT_STORE_DIR, refresh=False):
+    # Segments of one stored snapshot (the latest by default), computed from its metrics
+    # the first time they are asked for and read back from the store afterwards.
+    # Snapshots are never rewritten, so stored segments stay valid.
+    if snapshot_date is None:
+        dates = snapshot_dates(store_dir)
+        if not dates:
+            raise FileNotFoundError(f'No snapshots stored in {store_dir}')
+        snapshot_date = dates[-1]
+
+    key = (os.path.abspath(store_dir), snapshot_date)
+    if not refresh and key in loaded_segments:
+        return loaded_segments[key]
+
+    if refresh or not os.path.exists(partition_path(store_dir, SEGMENTS_TABLE, snapshot_date)):
+        segments = segment_customers(read_partition(store_dir, 'metrics', snapshot_date))
+        write_partition(segments, store_dir, SEGMENTS_TABLE, snapshot_date)
+    else:
+        segments = read_partition(store_dir, SEGMENTS_TABLE, snapshot_date)
+    loaded_segments[key] = segments
+    return segments
+
+
+def remove_old_segments(store_dir=DEFAULT_STORE_DIR):
+    # Delete segment tables stored by older SEGMENTS_FORMAT_VERSIONs - nothing reads
+    # them, and they are recomputed from the metrics when asked for
+    removed = []
+    if not os.path.isdir(store_dir):
+        return removed
+    for table in sorted(os.listdir(store_dir)):
+        if re.fullmatch(r'segments_v\d+', table) and table != SEGMENTS_TABLE:
+            shutil.rmtree(os.path.join(store_dir, table))
+            removed.append(table)
+    return removed
+
+
+def segment_snapshots(store_dir=DEFAULT_STORE_DIR, refresh=False):
+    # Make sure every stored snapshot has its segments; returns the dates computed now.
+    # Segment tables of older format versions are removed on the way.
+    for table in remove_old_segments(store_dir):
+        print(f"Removed outdated segments table {table}")
+    computed = []
+    for snapshot_date in snapshot_dates(store_dir):
+        if refresh or not os.path.exists(partition_path(store_dir, SEGMENTS_TABLE, snapshot_date)):
+            snapshot_segments(snapshot_date, store_dir, refresh=True)
+            computed.append(snapshot_date)
+    return computed
+
+
+def select_segments(segments, names=None, tiers=None, cohorts=None):
+    # Rows of the chosen segments / performance tiers / cohorts, still in revenue order
+    selected = pd.Series(True, index=segments.index)
+    if names:
+        selected &= segments['Segment'].isin(names)
+    if tiers:
+        selected &= segments['Performance Tier'].isin(tiers)
+    if cohorts:
+        selected &= segments['Cohort'].isin(cohorts)
+    return segments[selected]
+
+
+def publish_segments(segments, snapshot_date=None, feed_path=DEFAULT_FEED_PATH):
+    # Segments and cohorts for the dashboard pages, with segment and tier counts
+    counts = segments['Segment'].value_counts().reindex(SEGMENTS, fill_value=0)
+    tiers = segments['Performance Tier'].value_counts().reindex(TIERS, fill_value=0)
+    summary = {
+        'customers': len(segments),
+        'segment_counts': {name: int(count) for name, count in counts.items()},
+        'tier_counts': {name: int(count) for name, count in tiers.items()},
+    }
+    publish_dataset('segments', segments, summary=summary, feed_path=feed_path, snapshot_date=snapshot_date)
+    publish_dataset('cohorts', cohort_summary(segments), feed_path=feed_path, snapshot_date=snapshot_date)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='RFM segments and join cohorts of the consolidated customers')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--snapshot-date', default=None, help='YYYYMMDD, defaults to the latest stored snapshot')
+    parser.add_argument('--report', default=None,
+                        help='segment a consolidated report CSV directly instead of a stored snapshot')
+    parser.add_argument('--refresh', action='store_true', help='recompute stored segments')
+    parser.add_argument('--segment', action='append', choices=SEGMENTS, help='export only these segments')
+    parser.add_argument('--tier', action='append', choices=TIERS, help='export only these performance tiers')
+    parser.add_argument('--cohort', action='append', help='export only these join months (YYYY-MM)')
+    parser.add_argument('--output', default=None, help='write the selected customers (campaign export)')
+    parser.add_argument('--cohorts-output', default=None, help='write the cohort summary')
+    parser.add_argument('--feed', nargs='?', const=DEFAULT_FEED_PATH, default=None,
+                        help='also publish segments and cohorts to the dashboard feed')
+    args = parser.parse_args()
+
+    if args.report:
+        segments = segment_customers(load_export(args.report))
+    else:
+        computed = segment_snapshots(args.store_dir, refresh=args.refresh)
+        if computed:
+            print(f"Segmented snapshots: {', '.join(computed)}")
+        segments = snapshot_segments(args.snapshot_date, args.store_dir)
+        args.snapshot_date = args.snapshot_date or snapshot_dates(args.store_dir)[-1]
+
+    print(f"Customers: {len(segments)}")
+    for name, count in segments['Segment'].value_counts().reindex(SEGMENTS, fill_value=0).items():
+        print(f"  {name}: {count}")
+
+    if args.output:
+        selected = select_segments(segments, args.segment, args.tier, args.cohort)
+        written = write_report(selected, args.output, formats=DEFAULT_FORMATS)
+        print(f"Saved {len(selected)} customers to {', '.join(written)}")
+    if args.cohorts_output:
+        written = write_report(cohort_summary(segments), args.cohorts_output, formats=DEFAULT_FORMATS)
+        print(f"Cohort summary saved to {', '.join(written)}")
+    if args.feed:
+        publish_segments(segments, args.snapshot_date, feed_path=args.feed)
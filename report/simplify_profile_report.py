@@ -1,12 +1,41 @@
 import pandas as pd
 
-def simplify_profile_report():
-    # Read the cleaned profile report
-    input_path = 'consolidated_customer_profiles_clean.csv'
-    output_path = 'simplified_customer_profiles.csv'
+from dashboard_feed import publish_dataset
+from instrumentation import instrumented
+from profile_metrics import compute_profile_metrics, format_summary
+from column_plan import required_columns
+from report_writer import PAGE_FORMATS, write_report
+from schema import load_export
 
+# Final column order
+FINAL_COLUMNS = [
+    'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth',
+    'JoinedDate', 'Completed', 'Cancelled', 'Date joined',
+    'Days since last class', 'Days since package purchase',
+    'Days since membership purchase', 'Profile Total Spent',
+    'Profile Total Attended', 'Average Revenue'
+]
+
+# Computed columns and their inputs; compute_profile_metrics' booking rates (feed
+# and summary) also read Total Booking
+INPUT_SOURCES = {
+    'Average Revenue': ['Profile Total Spent', 'Profile Total Attended'],
+}
+METRIC_COLUMNS = ['Completed', 'Cancelled', 'Total Booking']
+INPUT_COLUMNS = required_columns(FINAL_COLUMNS + METRIC_COLUMNS, INPUT_SOURCES)
+
+@instrumented('simplify_profile_report')
+def simplify_profile_report(df=None,
+                            input_path='consolidated_customer_profiles_clean.csv',
+                            output_path='simplified_customer_profiles.csv',
+                            feed_path=None,
+                            output_formats=PAGE_FORMATS):
+    # Pass an in-memory cleaned report as df to skip the CSV read, and a feed_path
+    # to also publish the profiles (with their tiers) to the dashboard feed
     try:
-        df = pd.read_csv(input_path)
+        if df is None:
+            # Read the cleaned profile report
+            df = load_export(input_path, cache_dir=None, usecols=INPUT_COLUMNS)
         print(f"Loaded {len(df)} records from cleaned profile report")
 
         # Columns to remove
@@ -26,32 +55,26 @@ def simplify_profile_report():
         df_simplified = df.drop(columns=columns_to_remove, errors='ignore')
         print(f"Removed {len(columns_to_remove)} columns")
 
-        # Calculate Average Revenue = Profile Total Spent / Profile Total Attended
-        # Handle division by zero - if no attended classes, average revenue is 0
-        df_simplified['Average Revenue'] = df_simplified.apply(
-            lambda row: row['Profile Total Spent'] / row['Profile Total Attended']
-            if row['Profile Total Attended'] > 0 else 0, axis=1
-        )
-
-        # Define final column order
-        final_columns = [
-            'CustomerName', 'MobileCode', 'Mobile', 'Email', 'DateOfBirth',
-            'JoinedDate', 'Completed', 'Cancelled', 'Date joined',
-            'Days since last class', 'Days since package purchase',
-            'Days since membership purchase', 'Profile Total Spent',
-            'Profile Total Attended', 'Average Revenue'
-        ]
+        # Average Revenue = Profile Total Spent / Profile Total Attended (0 if no attended classes).
+        # Metrics are computed before the drop so rates can use Total Booking.
+        metrics, summary = compute_profile_metrics(df)
+        df_simplified['Average Revenue'] = metrics['Revenue per Class']
 
         # Select only existing columns in the right order
-        existing_columns = [col for col in final_columns if col in df_simplified.columns]
+        existing_columns = [col for col in FINAL_COLUMNS if col in df_simplified.columns]
         df_final = df_simplified[existing_columns].copy()
 
         # Format Average Revenue to 2 decimal places
         df_final['Average Revenue'] = df_final['Average Revenue'].round(2)
 
         # Save the simplified report
-        df_final.to_csv(output_path, index=False)
-        print(f"Simplified profile report saved to {output_path}")
+        written = write_report(df_final, output_path, formats=output_formats)
+        print(f"Simplified profile report saved to {', '.join(written)}")
+
+        if feed_path:
+            publish_dataset('customer_profiles',
+                            df_final.join(metrics[['Completion Rate', 'Cancellation Rate', 'Performance Tier']]),
+                            summary=summary._asdict(), feed_path=feed_path)
 
         # Display column info
         print(f"\nFinal columns ({len(df_final.columns)}):")
@@ -61,26 +84,15 @@ def simplify_profile_report():
         # Show sample data with calculations
         print(f"\nSample data with Average Revenue calculation:")
         print("=" * 80)
-        if len(df_final) > 0:
-            for idx, row in df_final.iterrows():
-                print(f"\nCustomer {idx + 1}: {row['CustomerName']}")
-                print(f"  Profile Total Spent: {row['Profile Total Spent']:,.2f}")
-                print(f"  Profile Total Attended: {row['Profile Total Attended']}")
-                print(f"  Average Revenue: {row['Average Revenue']:,.2f}")
-                if idx >= 2:  # Show only first 3 as examples
-                    break
+        print(df_final[['CustomerName', 'Profile Total Spent', 'Profile Total Attended', 'Average Revenue']]
+              .head(3).to_string(index=False))
 
         # Summary statistics
         print(f"\n" + "=" * 80)
         print("SUMMARY STATISTICS")
         print("=" * 80)
-        print(f"Total Customers: {len(df_final)}")
-        print(f"Total Revenue: {df_final['Profile Total Spent'].sum():,.2f}")
-        print(f"Total Classes Attended: {df_final['Profile Total Attended'].sum()}")
-        print(f"Overall Average Revenue per Class: {(df_final['Profile Total Spent'].sum() / df_final['Profile Total Attended'].sum()):.2f}")
-        print(f"Average Revenue per Customer: {df_final['Average Revenue'].mean():.2f}")
-        print(f"Highest Revenue Customer: {df_final.loc[df_final['Profile Total Spent'].idxmax(), 'CustomerName']}")
-        print(f"Highest Revenue per Class: {df_final.loc[df_final['Average Revenue'].idxmax(), 'CustomerName']}")
+        for line in format_summary(summary):
+            print(line)
 
         return df_final
 
@@ -0,0 +1,251 @@
+import contextlib
+import io
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from batch_consolidate import find_snapshot_pairs
+from consolidate_reports import build_consolidated_rows, load_consolidation_inputs
+from contact_normalization import normalize_emails
+from export_cache import HAS_PYARROW
+
+DEFAULT_STORE_DIR = os.environ.get('BANGCRM_SNAPSHOT_DIR', 'snapshot_store')
+
+# Parquet when pyarrow is installed (columns and customers can be read selectively),
+# pickle otherwise
+PARTITION_FILE = 'part-0.parquet' if HAS_PYARROW else 'part-0.pkl'
+
+# The store keeps its own identity index so customer IDs line up across snapshots
+INDEX_FILE = 'identity_index.pkl'
+
+# Per-customer metrics kept from create_consolidated_report for every snapshot
+IDENTITY_COLUMNS = ['customer_id', 'Name', 'Email', 'Phone Number', 'Date Joined']
+METRIC_COLUMNS = {
+    'Number of Completed Classes': 'Int32',
+    'Number of Late Cancel': 'Int32',
+    'Total': 'Int32',
+    'Revenue': 'float64',
+    'Average Revenue': 'float64',
+    'Days from Last Completed Class': 'Int32',
+    'Days from Last Package Purchase': 'Int32',
+    'Days from Last Drop In Purchase': 'Int32',
+}
+
+# How a customer changed between consecutive snapshots
+STATUS_NEW = 'new'
+STATUS_LOST = 'lost'
+STATUS_CONTINUING = 'continuing'
+
+
+def partition_path(store_dir, table, snapshot_date):
+    return os.path.join(store_dir, table, f'snapshot_date={snapshot_date}', PARTITION_FILE)
+
+
+def snapshot_dates(store_dir=DEFAULT_STORE_DIR, table='metrics'):
+    # Stored snapshot dates (YYYYMMDD), oldest first
+    table_dir = os.path.join(store_dir, table)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(name.split('=', 1)[1] for name in os.listdir(table_dir)
+                  if name.startswith('snapshot_date=')
+                  and os.path.exists(os.path.join(table_dir, name, PARTITION_FILE)))
+
+
+def write_partition(df, store_dir, table, snapshot_date):
+    # Whole-file replace through a temp file - a partition is either complete or absent
+    path = partition_path(store_dir, table, snapshot_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if HAS_PYARROW:
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_partition(store_dir, table, snapshot_date, columns=None, customer_ids=None):
+    path = partition_path(store_dir, table, snapshot_date)
+    if HAS_PYARROW:
+        filters = [('customer_id', 'in', list(customer_ids))] if customer_ids is not None else None
+        return pd.read_parquet(path, columns=columns, filters=filters)
+    df = pd.read_pickle(path)
+    if customer_ids is not None:
+        df = df[df['customer_id'].isin(customer_ids)]
+    return df[columns] if columns else df
+
+
+def snapshot_metrics(consolidated):
+    # The stored columns of one consolidated report; 'N/A' day counts become missing
+    metrics = consolidated[IDENTITY_COLUMNS].copy()
+    for column, dtype in METRIC_COLUMNS.items():
+        metrics[column] = pd.to_numeric(consolidated[column], errors='coerce').astype(dtype)
+    return metrics.reset_index(drop=True)
+
+
+def compute_deltas(previous, current, previous_date, snapshot_date):
+    # Per-customer metric changes from the previous snapshot. Customers only in the
+    # current snapshot are 'new' (their deltas are missing), customers only in the
+    # previous one are 'lost'. days_between lets dormancy drift be compared with the
+    # time that passed: a customer who did not attend drifts by exactly that much.
+    # A customer with several report rows is compared on their first one.
+    previous = previous.drop_duplicates(subset=['customer_id'], keep='first')
+    current = current.drop_duplicates(subset=['customer_id'], keep='first')
+    merged = pd.merge(previous, current, on='customer_id', how='outer', suffixes=('_previous', ''),
+                      indicator=True)
+    deltas = pd.DataFrame({
+        'customer_id': merged['customer_id'],
+        'Name': merged['Name'].fillna(merged['Name_previous']),
+        'status': merged['_merge'].map({'right_only': STATUS_NEW, 'left_only': STATUS_LOST,
+                                        'both': STATUS_CONTINUING}).astype('string'),
+        'previous_snapshot_date': previous_date,
+        'days_between': (datetime.strptime(snapshot_date, '%Y%m%d') -
+                         datetime.strptime(previous_date, '%Y%m%d')).days,
+    })
+    for column in METRIC_COLUMNS:
+        deltas[f'{column} Delta'] = merged[column] - merged[f'{column}_previous']
+    return deltas.sort_values('customer_id', kind='stable').reset_index(drop=True)
+
+
+def refresh_deltas(store_dir, snapshot_date):
+    # (Re)build the deltas of one snapshot against the snapshot stored just before it
+    dates = snapshot_dates(store_dir)
+    position = dates.index(snapshot_date)
+    if position == 0:
+        return None
+    previous_date = dates[position - 1]
+    deltas = compute_deltas(read_partition(store_dir, 'metrics', previous_date),
+                            read_partition(store_dir, 'metrics', snapshot_date),
+                            previous_date, snapshot_date)
+    write_partition(deltas, store_dir, 'deltas', snapshot_date)
+    return deltas
+
+
+def add_snapshot(snapshot_date, customer_report_path, activities_report_path,
+                 store_dir=DEFAULT_STORE_DIR, index_path=None, chunksize=None):
+    # Consolidate one export pair and append its metrics as a new partition. Stored
+    # snapshots are never rewritten; a date that is already stored is skipped.
+    # Customer IDs come from the store's identity index (or index_path) so they line
+    # up across dates.
+    if snapshot_date in snapshot_dates(store_dir):
+        print(f"Snapshot {snapshot_date} already stored - skipped")
+        return None
+
+    index_path = index_path or os.path.join(store_dir, INDEX_FILE)
+    os.makedirs(store_dir, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df1, df2 = load_consolidation_inputs(customer_report_path, activities_report_path,
+                                             chunksize=chunksize, index_path=index_path)
+        consolidated = build_consolidated_rows(df1, df2)
+    metrics = snapshot_metrics(consolidated)
+    write_partition(metrics, store_dir, 'metrics', snapshot_date)
+    print(f"Stored snapshot {snapshot_date}: {len(metrics)} customers")
+
+    # Deltas of this snapshot, and of the next one if this date was inserted in between
+    refresh_deltas(store_dir, snapshot_date)
+    dates = snapshot_dates(store_dir)
+    if dates[-1] != snapshot_date:
+        refresh_deltas(store_dir, dates[dates.index(snapshot_date) + 1])
+
+    return metrics
+
+
+def add_snapshots(source, store_dir=DEFAULT_STORE_DIR, index_path=None, chunksize=None):
+    # Store every customer_report_YYYYMMDD / activities pair found in `source`, oldest first
+    stored = []
+    for pair in find_snapshot_pairs(source):
+        metrics = add_snapshot(pair['snapshot_date'], pair['customer_report_path'], pair['activities_report_path'],
+                               store_dir=store_dir, index_path=index_path, chunksize=chunksize)
+        if metrics is not None:
+            stored.append(pair['snapshot_date'])
+    return stored
+
+
+def load_range(start=None, end=None, table='metrics', columns=None, customer_ids=None,
+               store_dir=DEFAULT_STORE_DIR):
+    # Snapshots (or their deltas) dated start..end inclusive, as one frame with a
+    # snapshot_date column. Partitions outside the range are never opened.
+    start = pd.Timestamp(start).strftime('%Y%m%d') if start else None
+    end = pd.Timestamp(end).strftime('%Y%m%d') if end else None
+    dates = [date for date in snapshot_dates(store_dir, table)
+             if (start is None or date >= start) and (end is None or date <= end)]
+    if columns is not None and 'customer_id' not in columns:
+        columns = ['customer_id'] + list(columns)
+
+    frames = []
+    for date in dates:
+        df = read_partition(store_dir, table, date, columns=columns, customer_ids=customer_ids)
+        df.insert(0, 'snapshot_date', pd.Timestamp(date))
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['snapshot_date'] + (columns or IDENTITY_COLUMNS + list(METRIC_COLUMNS)))
+    return pd.concat(frames, ignore_index=True)
+
+
+def find_customer_ids(email=None, name=None, store_dir=DEFAULT_STORE_DIR):
+    # Customer IDs with this email or (case-insensitive) name in any stored snapshot
+    identities = load_range(columns=['Name', 'Email'], store_dir=store_dir)
+    matches = pd.Series(False, index=identities.index)
+    if email:
+        matches |= (normalize_emails(identities['Email']) == normalize_emails(pd.Series([email]))[0]).fillna(False)
+    if name:
+        matches |= (identities['Name'].str.strip().str.lower() == name.strip().lower()).fillna(False)
+    return sorted(identities.loc[matches, 'customer_id'].dropna().unique())
+
+
+def customer_history(customer_id=None, email=None, name=None, store_dir=DEFAULT_STORE_DIR):
+    # Every stored snapshot of one customer next to the change from the snapshot before
+    customer_ids = [customer_id] if customer_id is not None else find_customer_ids(email, name, store_dir)
+    if not customer_ids:
+        return pd.DataFrame()
+    history = load_range(customer_ids=customer_ids, store_dir=store_dir)
+    deltas = load_range(table='deltas', customer_ids=customer_ids, store_dir=store_dir)
+    if len(deltas):
+        history = history.merge(deltas.drop(columns=['Name']), on=['snapshot_date', 'customer_id'], how='left')
+    return history.sort_values(['customer_id', 'snapshot_date']).reset_index(drop=True)
+
+
+def drop_store(store_dir=DEFAULT_STORE_DIR):
+    # The only way to remove snapshots - the store is otherwise append-only
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Append-only store of per-customer metrics by export date')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = commands.add_parser('add', help='store every snapshot pair found in a directory or glob')
+    add_parser.add_argument('source')
+    add_parser.add_argument('--chunksize', type=int, default=None)
+
+    history_parser = commands.add_parser('history', help='metrics of one customer across snapshots')
+    history_parser.add_argument('--customer-id', type=int, default=None)
+    history_parser.add_argument('--email', default=None)
+    history_parser.add_argument('--name', default=None)
+
+    range_parser = commands.add_parser('range', help='snapshots (or deltas) between two dates')
+    range_parser.add_argument('--start', default=None, help='YYYY-MM-DD or YYYYMMDD')
+    range_parser.add_argument('--end', default=None)
+    range_parser.add_argument('--deltas', action='store_true')
+    range_parser.add_argument('--output', default=None, help='write the result to a CSV file')
+
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        add_snapshots(args.source, store_dir=args.store_dir, chunksize=args.chunksize)
+        print(f"Snapshots in store: {', '.join(snapshot_dates(args.store_dir))}")
+    elif args.command == 'history':
+        print(customer_history(args.customer_id, args.email, args.name, store_dir=args.store_dir).to_string(index=False))
+    else:
+        result = load_range(args.start, args.end, table='deltas' if args.deltas else 'metrics',
+                            store_dir=args.store_dir)
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"Saved {len(result)} rows to {args.output}")
+        else:
+            print(result.to_string(index=False))
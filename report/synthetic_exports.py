@@ -0,0 +1,204 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Templates for the generated files - every column and value distribution comes from
+# bootstrapping the rows of these samples, only the identity columns are synthesized
+SAMPLE_EXPORTS = {
+    'customers': 'customer_report_20240101.csv',
+    'activities': 'customers_activities_20231231to20241231.csv',
+    'profiles': 'customer_profiles.csv',
+    'plans': '../reportcrm/expiringplans.csv',
+}
+
+# Output names follow the real export naming so the scripts' defaults line up
+EXPORT_NAMES = {
+    'customers': 'customer_report_20240101.csv',
+    'activities': 'customers_activities_20231231to20241231.csv',
+    'profiles': 'customer_profiles.csv',
+    'plans': 'expiringplans.csv',
+}
+
+# Rows per file at scale 1 (the size of the samples)
+SAMPLE_ROWS = {'customers': 108, 'activities': 1771, 'profiles': 14, 'plans': 96}
+
+# Identity quality measured on the samples
+SAMPLE_RATES = {
+    'customer_email_missing': 0.037,
+    'customer_mobile_missing': 0.074,
+    'customer_duplicate_email': 0.037,       # customers sharing an email with another record
+    'customers_in_activities': 0.77,         # customers that also appear in the activities export
+    'activity_email_missing': 0.010,
+    'activity_mobile_missing': 0.044,
+    'activity_duplicate_customer': 0.010,    # repeated rows for the same customer
+    'activity_doubled_country_code': 0.002,  # "+ 62 6285..." style mobiles
+    'activity_email_mismatch': 0.012,        # report customers whose activity rows carry another email
+    'activity_mobile_mismatch': 0.014,       # ... or another mobile
+    'profiles_in_customers': 0.64,
+    'plans_in_customers': 0.50,
+}
+
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'icloud.com', 'outlook.com']
+
+
+def read_sample(kind, sample_dir='.'):
+    # Everything as text so bootstrapped values are written back exactly as exported
+    return pd.read_csv(os.path.join(sample_dir, SAMPLE_EXPORTS[kind]), dtype=str, keep_default_na=False)
+
+
+def name_tag(numbers):
+    # Unique letter suffix per person (a, b, ..., z, ba, bb, ...) so generated names
+    # only collide where the rates say they should
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    tags = []
+    for number in numbers:
+        tag = ''
+        while True:
+            number, remainder = divmod(number, 26)
+            tag = letters[remainder] + tag
+            if number == 0:
+                break
+        tags.append(tag.capitalize())
+    return np.array(tags, dtype=object)
+
+
+def build_people(rng, count, samples):
+    # Synthetic population: names from the sample name tokens, unique emails and mobiles
+    names = pd.concat([samples['customers']['CustomerName'], samples['activities']['Customer']])
+    tokens = names.str.strip().str.split()
+    tokens = tokens[tokens.str.len() > 0]
+    first_names = tokens.str[0].str.capitalize().unique().astype(object)
+    last_names = tokens[tokens.str.len() > 1].str[-1].str.capitalize().unique().astype(object)
+
+    first = rng.choice(first_names, count)
+    last = rng.choice(last_names, count) + name_tag(np.arange(count))
+    country_codes = samples['customers']['MobileCode'].replace('', '62')
+    country_codes = country_codes[country_codes != '0']
+
+    numbers = 8110000000 + rng.permutation(count * 3)[:count]
+    return pd.DataFrame({
+        'first': first,
+        'last': last,
+        'name': first + ' ' + last,
+        'email': (pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower() + '@' +
+                  rng.choice(EMAIL_DOMAINS, count)).to_numpy(),
+        'country_code': rng.choice(country_codes.to_numpy(), count),
+        'mobile': numbers.astype(str),
+    })
+
+
+def blank(rng, values, rate):
+    values = values.copy()
+    values[rng.random(len(values)) < rate] = ''
+    return values
+
+
+def mismatch(rng, people, email_rate, mobile_rate):
+    # The same people, some with another email or mobile (a second address, a new
+    # number) - how a customer can look in one export compared to another
+    people = people.copy()
+    other_email = rng.random(len(people)) < email_rate
+    people.loc[other_email, 'email'] = (people.loc[other_email, 'email'].str.split('@').str[0] +
+                                        rng.integers(10, 100, other_email.sum()).astype(str) + '@' +
+                                        rng.choice(EMAIL_DOMAINS, other_email.sum()))
+    other_mobile = rng.random(len(people)) < mobile_rate
+    people.loc[other_mobile, 'mobile'] = (8120000000 + rng.integers(0, 9999999, other_mobile.sum())).astype(str)
+    return people
+
+
+def bootstrap(rng, sample, rows):
+    return sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+
+
+def generate_exports(scale, output_dir, seed=0, sample_dir='.', rates=None):
+    # Write schema-faithful customer report, activities, profiles and expiring plans
+    # exports `scale` times the size of the samples. Returns {kind: (path, rows)}.
+    rates = {**SAMPLE_RATES, **(rates or {})}
+    rng = np.random.default_rng(seed)
+    samples = {kind: read_sample(kind, sample_dir) for kind in SAMPLE_EXPORTS}
+    rows = {kind: SAMPLE_ROWS[kind] * scale for kind in SAMPLE_ROWS}
+
+    # Customers first, then people only known to the activities export or the profiles
+    in_activities = int(rows['customers'] * rates['customers_in_activities'])
+    activity_only = rows['activities'] - in_activities
+    profile_only = rows['profiles'] - int(rows['profiles'] * rates['profiles_in_customers'])
+    people = build_people(rng, rows['customers'] + activity_only + profile_only, samples)
+    customer_people = people.iloc[:rows['customers']]
+
+    # Customer report - mobile without country code, split into MobileCode/Mobile
+    customers = bootstrap(rng, samples['customers'], rows['customers'])
+    customers['CustomerName'] = customer_people['name'].to_numpy()
+    emails = customer_people['email'].to_numpy()
+    shared = np.flatnonzero(rng.random(len(emails)) < rates['customer_duplicate_email'])
+    emails[shared] = emails[rng.integers(0, len(emails), len(shared))]
+    customers['Email'] = blank(rng, emails, rates['customer_email_missing'])
+    customers['MobileCode'] = customer_people['country_code'].to_numpy()
+    customers['Mobile'] = blank(rng, customer_people['mobile'].to_numpy(), rates['customer_mobile_missing'])
+
+    # Activities - shared customers (some with another email or mobile than the report
+    # has) plus activity-only people in random order, a few repeated rows, and mobiles
+    # as "+ <code> <number>"
+    activity_people = pd.concat([
+        mismatch(rng, customer_people.iloc[rng.permutation(rows['customers'])[:in_activities]],
+                 rates['activity_email_mismatch'], rates['activity_mobile_mismatch']),
+        people.iloc[rows['customers']:rows['customers'] + activity_only],
+    ]).iloc[rng.permutation(rows['activities'])].reset_index(drop=True)
+    repeated = np.flatnonzero(rng.random(rows['activities']) < rates['activity_duplicate_customer'])
+    activity_people.iloc[repeated] = activity_people.iloc[rng.integers(0, rows['activities'], len(repeated))].to_numpy()
+
+    activities = bootstrap(rng, samples['activities'], rows['activities'])
+    activities['Customer'] = activity_people['name'].to_numpy()
+    activities['Email'] = blank(rng, activity_people['email'].to_numpy(), rates['activity_email_missing'])
+    doubled = rng.random(rows['activities']) < rates['activity_doubled_country_code']
+    mobiles = np.where(doubled, activity_people['country_code'] + activity_people['mobile'], activity_people['mobile'])
+    activities['Mobile'] = blank(rng, ('+ ' + activity_people['country_code'] + ' ' + mobiles).to_numpy(),
+                                 rates['activity_mobile_missing'])
+
+    # Profiles - mostly customers from the report, the rest only known to the app
+    profile_people = pd.concat([
+        customer_people.iloc[rng.permutation(rows['customers'])[:rows['profiles'] - profile_only]],
+        people.iloc[len(people) - profile_only:],
+    ]).reset_index(drop=True)
+    profiles = bootstrap(rng, samples['profiles'], rows['profiles'])
+    profiles['customerId'] = [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(rows['profiles'])]
+    profiles['name'] = profile_people['name'].to_numpy()
+    profiles['telephone'] = ('+' + profile_people['country_code'] + ' ' + profile_people['mobile']).to_numpy()
+    profiles['email'] = profile_people['email'].to_numpy()
+
+    # Expiring plans - half for report customers, the rest for activity-only people
+    plan_people = pd.concat([
+        customer_people.iloc[rng.integers(0, rows['customers'], int(rows['plans'] * rates['plans_in_customers']))],
+        people.iloc[rng.integers(rows['customers'], rows['customers'] + activity_only,
+                                 rows['plans'] - int(rows['plans'] * rates['plans_in_customers']))],
+    ]).reset_index(drop=True)
+    plans = bootstrap(rng, samples['plans'], rows['plans'])
+    plans['First Name'] = plan_people['first'].to_numpy()
+    plans['Last Name'] = plan_people['last'].to_numpy()
+    plans['Mobile'] = ('+' + plan_people['country_code'] + ' ' + plan_people['mobile']).to_numpy()
+    plans['Email'] = plan_people['email'].to_numpy()
+
+    os.makedirs(output_dir, exist_ok=True)
+    exports = {}
+    for kind, df in (('customers', customers), ('activities', activities), ('profiles', profiles), ('plans', plans)):
+        path = os.path.join(output_dir, EXPORT_NAMES[kind])
+        df[samples[kind].columns].to_csv(path, index=False)
+        exports[kind] = (path, len(df))
+
+    return exports
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate synthetic CRM exports at a multiple of the sample size')
+    parser.add_argument('scale', type=int, nargs='+', help='e.g. 10 100 1000')
+    parser.add_argument('--output-dir', default='synthetic_exports')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        exports = generate_exports(scale, os.path.join(args.output_dir, f'x{scale}'), seed=args.seed)
+        for kind, (path, rows) in exports.items():
+            print(f"x{scale} {kind:<11} {rows:>9} rows -> {path}")
@@ -0,0 +1,40 @@
+from consolidate_reports import load_consolidation_inputs
+
+
+def write_exports(tmp_path):
+    customers = tmp_path / 'customer_report_20240101.csv'
+    customers.write_text('CustomerName,Email,MobileCode,Mobile\n'
+                         'Christo Mualim,,62,81234567890\n'
+                         'Rina Sari,rina@mail.com,62,81311112222\n')
+    activities = tmp_path / 'customers_activities_20231231to20241231.csv'
+    activities.write_text('Customer,Email,Mobile\n'
+                          'Christo Mualimm,,+62 81234567890\n'
+                          'Rina Sari,rina@mail.com,+62 81311112222\n')
+    return str(customers), str(activities)
+
+
+def test_fuzzy_links_are_not_persisted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    customers, activities = write_exports(tmp_path)
+    index_path = str(tmp_path / 'index.pkl')
+
+    df1, df2 = load_consolidation_inputs(customers, activities, index_path=index_path)
+    linked = df1.loc[0, 'customer_id']
+    assert linked == df2.loc[0, 'customer_id']
+
+    # A later exact-only run must not inherit the link from the saved index
+    df1, df2 = load_consolidation_inputs(customers, activities, index_path=index_path, name_threshold=None)
+    assert df1.loc[0, 'customer_id'] not in set(df2['customer_id'])
+    assert df1.loc[1, 'customer_id'] in set(df2['customer_id'])
+
+
+def test_streaming_keeps_every_activity(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    customers, activities = write_exports(tmp_path)
+    with open(activities, 'a') as f:
+        f.write('Rina Sari,rina@mail.com,+62 81311112222\n')
+
+    _, df2 = load_consolidation_inputs(customers, activities, name_threshold=None)
+    _, streamed = load_consolidation_inputs(customers, activities, name_threshold=None, chunksize=1)
+    assert len(streamed) == len(df2) == 3
+    assert streamed['Customer'].tolist() == df2['Customer'].tolist()
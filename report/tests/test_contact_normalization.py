@@ -0,0 +1,26 @@
+import pandas as pd
+
+import contact_normalization
+
+
+def test_cache_overflow_keeps_values_already_cached(monkeypatch):
+    monkeypatch.setattr(contact_normalization, 'MAX_CACHE_ENTRIES', 3)
+    monkeypatch.setattr(contact_normalization, 'email_cache', {})
+
+    contact_normalization.normalize_emails(pd.Series(['A@x', 'B@x']))
+    emails = contact_normalization.normalize_emails(pd.Series(['A@x', 'C@x', 'D@x', None]))
+
+    assert emails.tolist()[:3] == ['a@x', 'c@x', 'd@x']
+    assert emails.isna().tolist() == [False, False, False, True]
+    assert len(contact_normalization.email_cache) <= 3
+
+
+def test_cached_and_new_phones_agree(monkeypatch):
+    monkeypatch.setattr(contact_normalization, 'MAX_CACHE_ENTRIES', 2)
+    monkeypatch.setattr(contact_normalization, 'phone_cache', {})
+
+    first = contact_normalization.normalize_phones(pd.Series(['0811234567', '+62 81298765432']))
+    second = contact_normalization.normalize_phones(pd.Series(['0811234567', '81311112222', '+62 81298765432']))
+
+    assert first.tolist() == ['+62811234567', '+6281298765432']
+    assert second.tolist() == ['+62811234567', '+6281311112222', '+6281298765432']
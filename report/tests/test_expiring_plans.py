@@ -0,0 +1,18 @@
+import pandas as pd
+
+from expiring_plans import prepare_plans
+
+
+def test_two_and_four_digit_years_parse():
+    plans = pd.DataFrame({
+        'First Name': ['Rina', 'Budi', 'Sari'],
+        'Last Name': ['Sari', 'Santoso', None],
+        'Plan Name': ['10 Class Pack', 'Unlimited Monthly', 'Drop In'],
+        'Purchased Date': ['01/02/25', '01/02/2025', '--'],
+        'Start Date': ['01/02/25', '01/02/2025', ''],
+        'End Date': ['31/03/25', '31/03/2025', None],
+    })
+    plans = prepare_plans(plans)
+    assert plans['end_date'].tolist()[:2] == [pd.Timestamp('2025-03-31')] * 2
+    assert plans['start_date'].tolist()[:2] == [pd.Timestamp('2025-02-01')] * 2
+    assert plans['end_date'].isna().tolist() == [False, False, True]
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from identity_index import CustomerIdentityIndex
+
+
+def test_mobile_follows_its_owner_in_the_latest_export(tmp_path):
+    path = str(tmp_path / 'index.pkl')
+    index = CustomerIdentityIndex.load(path)
+    index.register(pd.DataFrame({'email': ['a@x'], 'mobile': ['+62811']}), email='email', mobile='mobile')
+    index.save(path)
+
+    index = CustomerIdentityIndex.load(path)
+    activities = pd.DataFrame({'email': ['b@x'], 'mobile': ['+62811']})
+    activity_ids = index.register(activities, email='email', mobile='mobile')
+    customers = pd.DataFrame({'email': [None], 'mobile': ['+62811']})
+    matches = index.lookup(customers, email='email', mobile='mobile', within=activity_ids)
+
+    assert matches['customer_id'].tolist() == activity_ids.tolist()
+    assert matches['matched_on'].tolist() == ['mobile']
+
+
+def test_first_owner_in_an_export_keeps_the_mobile():
+    index = CustomerIdentityIndex()
+    ids = index.register(pd.DataFrame({'email': ['a@x', 'b@x', None], 'mobile': ['+62811', '+62811', '+62811']}),
+                         email='email', mobile='mobile')
+    assert ids[2] == ids[0]
+
+    # Registering the same export again changes nothing
+    assert index.register(pd.DataFrame({'email': ['a@x', 'b@x', None], 'mobile': ['+62811'] * 3}),
+                          email='email', mobile='mobile').tolist() == ids.tolist()
+
+
+def test_index_is_not_persisted_without_a_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    index = CustomerIdentityIndex.load(None)
+    index.register(pd.DataFrame({'email': ['a@x']}), email='email')
+    index.save(None)
+    assert list(tmp_path.iterdir()) == []
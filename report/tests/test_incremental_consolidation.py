@@ -0,0 +1,31 @@
+import os
+
+import pandas as pd
+
+from incremental_consolidation import create_consolidated_report_incremental
+
+REPORT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_sample(tmp_path, name, name_column):
+    # The first rows of a sample export, the last one without a name
+    df = pd.read_csv(os.path.join(REPORT_DIR, name), dtype=str, keep_default_na=False, nrows=5)
+    df.loc[len(df) - 1, name_column] = ''
+    df.to_csv(tmp_path / name, index=False)
+    return str(tmp_path / name)
+
+
+def test_unchanged_unnamed_rows_are_not_logged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    customers = write_sample(tmp_path, 'customer_report_20240101.csv', 'CustomerName')
+    activities = write_sample(tmp_path, 'customers_activities_20231231to20241231.csv', 'Customer')
+    output = str(tmp_path / 'consolidated.csv')
+
+    _, changelog = create_consolidated_report_incremental(customers, activities, output, output_formats=())
+    first = open(output).read()
+    assert (changelog['change'] == 'inserted').all()
+    assert changelog['Name'].notna().all()
+
+    _, changelog = create_consolidated_report_incremental(customers, activities, output, output_formats=())
+    assert changelog.empty
+    assert open(output).read() == first
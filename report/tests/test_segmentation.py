@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+
+from segmentation import COHORT_UNKNOWN, SEGMENTS_TABLE, join_cohorts, remove_old_segments, segment_customers
+from snapshot_store import write_partition
+
+
+def test_join_cohorts_reads_both_export_date_formats():
+    joined = pd.Series(['30/08/25 10:35', '01 Aug 2024', '07/10/25', None, 'N/A'])
+    assert join_cohorts(joined).tolist() == ['2025-08', '2024-08', '2025-10', COHORT_UNKNOWN, COHORT_UNKNOWN]
+
+
+def test_customers_with_several_rows_are_scored_once():
+    report = pd.DataFrame({
+        'customer_id': [1, 1, 2, None, None],
+        'Name': ['Ana', 'Ana', 'Budi', 'Citra', 'Dewi'],
+        'Days from Last Completed Class': [3, 3, 40, 10, None],
+        'Number of Completed Classes': [10, 10, 2, 5, 0],
+        'Revenue': [500000, 500000, 100000, 250000, 0],
+        'Date Joined': ['01 Aug 2024', '01 Aug 2024', '02/09/24 10:00', None, '05 Sep 2024'],
+    })
+    segments = segment_customers(report)
+
+    assert segments['Name'].tolist() == ['Ana', 'Citra', 'Budi', 'Dewi']
+    assert segments['Revenue Rank'].tolist() == [1, 2, 3, 4]
+    assert segments['Cohort'].tolist() == ['2024-08', COHORT_UNKNOWN, '2024-09', '2024-09']
+
+
+def test_old_segment_tables_are_removed(tmp_path):
+    store_dir = str(tmp_path)
+    for table in ('segments_v1', SEGMENTS_TABLE, 'metrics'):
+        write_partition(pd.DataFrame({'customer_id': [1]}), store_dir, table, '20240101')
+
+    assert remove_old_segments(store_dir) == ['segments_v1']
+    assert sorted(os.listdir(store_dir)) == ['metrics', SEGMENTS_TABLE]